@@ -0,0 +1,126 @@
+"""
+/api/kline 编码基准：旧的 list-of-lists（DataFrame.iterrows）vs 列式 JSON / 二进制 / Arrow。
+
+    python -m benchmarks.bench_kline_codec [--repeat 20]
+
+只测服务端编码（chart JSON -> 响应字节），不含网络；输出每种格式的耗时与 payload 大小。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from server.bar_store import bars_to_api, chart_to_bars
+from server.kline_codec import encode_arrow, encode_binary, encode_columns, pa
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except Exception:  # pragma: no cover
+    jsonable_encoder = None
+
+
+def synthetic_chart(n: int, step_s: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = close + rng.normal(0, 0.2, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    vol = rng.integers(1_000, 5_000_000, n)
+    ts = 1_700_000_000 + step_s * np.arange(n)
+    return {
+        "chart": {
+            "result": [
+                {
+                    "timestamp": ts.tolist(),
+                    "indicators": {
+                        "quote": [
+                            {
+                                "open": open_.round(3).tolist(),
+                                "high": high.round(3).tolist(),
+                                "low": low.round(3).tolist(),
+                                "close": close.round(3).tolist(),
+                                "volume": vol.tolist(),
+                            }
+                        ]
+                    },
+                }
+            ]
+        }
+    }
+
+
+def legacy_rows(cj: dict) -> bytes:
+    """The pre-codec /api/kline path: DataFrame + iterrows + FastAPI's default JSON encoding."""
+    r0 = cj["chart"]["result"][0]
+    q = r0["indicators"]["quote"][0]
+    df = pd.DataFrame(
+        {"Open": q["open"], "High": q["high"], "Low": q["low"], "Close": q["close"], "Volume": q["volume"]},
+        index=pd.to_datetime(r0["timestamp"], unit="s", utc=True),
+    ).dropna(subset=["Open", "High", "Low", "Close"])
+    bars = []
+    for t, row in df.iterrows():
+        bars.append(
+            [
+                int(t.timestamp() * 1000),
+                float(row["Open"]),
+                float(row["Close"]),
+                float(row["Low"]),
+                float(row["High"]),
+                int(row["Volume"]) if pd.notna(row["Volume"]) else 0,
+            ]
+        )
+    body = {"symbol": "0700.HK", "tf": "1d", "range": "max", "bars": bars}
+    if jsonable_encoder is not None:
+        body = jsonable_encoder(body)
+    return json.dumps(body).encode()
+
+
+META = {"symbol": "0700.HK", "tf": "1d", "range": "max"}
+
+CASES = {
+    "legacy rows (iterrows)": legacy_rows,
+    "rows (vectorized)": lambda cj: json.dumps({**META, "bars": bars_to_api(chart_to_bars(cj))}).encode(),
+    "columns json": lambda cj: encode_columns(chart_to_bars(cj), META),
+    "binary": lambda cj: encode_binary(chart_to_bars(cj)),
+}
+if pa is not None:
+    CASES["arrow ipc"] = lambda cj: encode_arrow(chart_to_bars(cj), META)
+
+
+def bench(fn, cj, repeat: int):
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(cj)
+        best = min(best, time.perf_counter() - t0)
+    return best, len(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    datasets = [
+        ("5d x 1m (~1.6k bars)", 5 * 330, 60),
+        ("10y x 1d (~2.5k bars)", 2500, 86400),
+        ("20k bars", 20_000, 60),
+    ]
+    for label, n, step in datasets:
+        cj = synthetic_chart(n, step)
+        print(f"\n{label}")
+        print(f"  {'format':<24}{'encode ms':>12}{'bytes':>12}{'speedup':>10}")
+        base = None
+        for name, fn in CASES.items():
+            t, size = bench(fn, cj, args.repeat)
+            base = base or t
+            print(f"  {name:<24}{t * 1000:>12.2f}{size:>12,}{base / t:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+/api/search 基准：逐行 LIKE 扫描（模拟 db_search_hk 的三段查询）vs 进程内 SearchIndex。
+
+    python -m benchmarks.bench_search_index [--stocks 10000] [--repeat 200]
+
+合成 N 只港股（随机中文名称 + 别名），输出索引构建耗时和各类查询的平均耗时（µs/query）。
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from server.search_index import SearchIndex, lazy_pinyin
+
+# 常见港股名称用字
+_CHARS = "腾讯控股阿里巴巴美团小米集团建设银行工商中国平安保险移动联通石油海洋电力能源地产置业汽车科技医药生物网络电子国际实业发展"
+
+
+def synthetic(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    stocks, aliases = [], []
+    for i in range(n):
+        name = "".join(rng.choice(_CHARS) for _ in range(rng.randint(2, 6)))
+        stocks.append({"stock_code": f"{i + 1:05d}", "stock_name": name, "market": "HK"})
+        if rng.random() < 0.3:
+            aliases.append(("".join(rng.choice(_CHARS) for _ in range(rng.randint(2, 3))), name))
+    return stocks, aliases
+
+
+def naive_search(stocks, aliases, q: str, limit: int = 10):
+    """db_search_hk 的语义在 Python 里逐行扫一遍：code 精确 -> 名称 LIKE -> 别名 LIKE。"""
+    if q.isdigit():
+        code = q.zfill(5)
+        hits = [r for r in stocks if r["stock_code"] == code]
+        if hits:
+            return hits[:limit]
+    ql = q.lower()
+    hits = [r for r in stocks if ql in r["stock_name"].lower()]
+    if hits:
+        return hits[:limit]
+    targets = [t for a, t in aliases if ql in a.lower()]
+    return [r for r in stocks if any(t in r["stock_name"] for t in targets)][:limit]
+
+
+def per_query_us(fn, queries, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - t0) / (repeat * len(queries)) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stocks", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    stocks, aliases = synthetic(args.stocks)
+    t0 = time.perf_counter()
+    idx = SearchIndex(stocks, aliases)
+    print(f"build: {len(stocks):,} stocks / {len(aliases):,} aliases in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    rng = random.Random(1)
+    names = [s["stock_name"] for s in stocks]
+    workloads = {
+        "code exact": [str(rng.randint(1, args.stocks)) for _ in range(50)],
+        "code prefix": [f"{rng.randint(1, 99):02d}" for _ in range(50)],
+        "name substring": [n[: rng.randint(2, len(n))] for n in rng.sample(names, 50)],
+        "alias": [a for a, _ in rng.sample(aliases, min(50, len(aliases)))],
+    }
+    if lazy_pinyin is not None:
+        from server.search_index import pinyin_initials
+
+        workloads["pinyin initials"] = [pinyin_initials(n)[:3] for n in rng.sample(names, 50)]
+
+    print(f"\n  {'query kind':<18}{'scan µs':>12}{'index µs':>12}{'speedup':>10}")
+    for kind, queries in workloads.items():
+        scan = per_query_us(lambda q: naive_search(stocks, aliases, q), queries, max(1, args.repeat // 20))
+        fast = per_query_us(lambda q: idx.search(q, limit=10), queries, args.repeat)
+        print(f"  {kind:<18}{scan:>12.1f}{fast:>12.1f}{scan / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+腾讯数据解析基准：逐行/逐字段的旧解析 vs NumPy 批量解码。
+
+    python -m benchmarks.bench_tencent_decode [--repeat 200]
+
+- 分钟线：整日 minute/query（约 330 行）-> K线；旧实现逐行 split + ZoneInfo datetime + Python 循环算成交量差分。
+- 实时报价：多代码 qt 响应（1 / 60 条记录）-> {code: TencentQuote}；旧实现逐条 split + _safe_float。
+两边结果先做一致性校验，再计时（取最快一次）。
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from server.tencent_finance import (
+    _QT_RECORD_RE,
+    _quote_from_parts,
+    _safe_float,
+    decode_minute_payload,
+    parse_minute_payload,
+    parse_qt_records,
+)
+
+
+def legacy_parse_minute_payload(obj: dict, code: str):
+    """The pre-vectorization parser (per-row split, ZoneInfo datetime, Python volume deltas)."""
+    data0 = ((obj.get("data") or {}).get(code) or {}).get("data") or {}
+    date_str = str(data0.get("date") or "")
+    rows = data0.get("data") or []
+    if not date_str or len(date_str) != 8 or not rows:
+        return []
+    yyyy, mm, dd = int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8])
+    tz = ZoneInfo("Asia/Hong_Kong")
+    bars = []
+    prev_cum_vol = None
+    for line in rows:
+        parts = str(line).strip().split()
+        if len(parts) < 3:
+            continue
+        hhmm = parts[0]
+        if len(hhmm) != 4 or not hhmm.isdigit():
+            continue
+        price = _safe_float(parts[1])
+        cum_vol = _safe_float(parts[2])
+        if price is None:
+            continue
+        ts_ms = datetime(yyyy, mm, dd, int(hhmm[0:2]), int(hhmm[2:4]), 0, tzinfo=tz).timestamp() * 1000.0
+        vol = 0
+        if cum_vol is not None:
+            if prev_cum_vol is not None:
+                vol = int(max(0.0, float(cum_vol - prev_cum_vol)))
+            prev_cum_vol = cum_vol
+        p = float(price)
+        bars.append([ts_ms, p, p, p, p, vol])
+    return bars
+
+
+def legacy_parse_qt_records(text: str):
+    out = {}
+    for m in _QT_RECORD_RE.finditer(text or ""):
+        code, body = m.group(1), m.group(2)
+        if not body or "~" not in body:
+            continue
+        out[code] = _quote_from_parts(body.split("~"), code)
+    return out
+
+
+def hk_session_minutes():
+    out = []
+    for start, end in ((9 * 60 + 30, 12 * 60), (13 * 60, 16 * 60 + 10)):
+        out += [f"{m // 60:02d}{m % 60:02d}" for m in range(start, end + 1)]
+    return out
+
+
+def synthetic_minute_payload(code: str = "hk00700", seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    price, cum, amt, rows = 400.0, 0, 0.0, []
+    for hhmm in hk_session_minutes():
+        price = round(price + rng.gauss(0, 0.3), 3)
+        cum += rng.randint(0, 50_000)
+        amt += price * cum
+        rows.append(f"{hhmm} {price:.3f} {cum} {amt:.2f}")
+    return {"data": {code: {"data": {"date": "20261016", "data": rows}}}}
+
+
+def synthetic_qt(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        code = f"hk{i + 1:05d}"
+        fields = ["100", f"名称{i}", code[2:], f"{rng.uniform(1, 500):.3f}", f"{rng.uniform(1, 500):.3f}"]
+        fields += [f"{rng.uniform(1, 500):.3f}"] * 25 + ["2026/10/16 16:08:00"] + ["0"] * 40 + ["HKD", "", ""]
+        out.append(f'v_{code}="{"~".join(fields)}";')
+    return "\n".join(out)
+
+
+def best_us(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*arg)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    payload = synthetic_minute_payload()
+    assert legacy_parse_minute_payload(payload, "hk00700") == parse_minute_payload(payload, "hk00700")
+    print(f"\nminute/query ({len(payload['data']['hk00700']['data']['data'])} rows)")
+    print(f"  {'decoder':<34}{'µs':>10}{'speedup':>10}")
+    base = None
+    for name, fn in (
+        ("legacy per-row", legacy_parse_minute_payload),
+        ("decode_minute_payload (columns)", decode_minute_payload),
+        ("parse_minute_payload (rows)", parse_minute_payload),
+    ):
+        t = best_us(fn, (payload, "hk00700"), args.repeat)
+        base = base or t
+        print(f"  {name:<34}{t:>10.1f}{base / t:>9.1f}x")
+
+    for n in (1, 60):
+        text = synthetic_qt(n)
+        assert legacy_parse_qt_records(text) == parse_qt_records(text)
+        print(f"\nqt response ({n} records)")
+        print(f"  {'decoder':<34}{'µs':>10}{'speedup':>10}")
+        base = None
+        for name, fn in (("legacy per-record", legacy_parse_qt_records), ("parse_qt_records (bulk)", parse_qt_records)):
+            t = best_us(fn, (text,), args.repeat)
+            base = base or t
+            print(f"  {name:<34}{t:>10.1f}{base / t:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
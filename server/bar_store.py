@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# One record per bar; ts is epoch seconds (Yahoo chart timestamps).
+BAR_DTYPE = np.dtype(
+    [("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")]
+)
+
+_HK_OFFSET_S = 8 * 3600
+_DAY_S = 86400
+
+_RANGE_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_UNIT_S = {"d": _DAY_S, "wk": 7 * _DAY_S, "mo": 31 * _DAY_S, "y": 366 * _DAY_S}
+
+
+def range_to_seconds(range_: str, now: Optional[float] = None) -> Optional[int]:
+    """"4mo" -> seconds covered (generously rounded up); "max" -> None (everything)."""
+    r = (range_ or "").strip().lower()
+    if r == "max":
+        return None
+    if r == "ytd":
+        now = time.time() if now is None else now
+        year = time.gmtime(now + _HK_OFFSET_S).tm_year
+        return int(now - (calendar.timegm((year, 1, 1, 0, 0, 0)) - _HK_OFFSET_S))
+    m = _RANGE_RE.match(r)
+    if not m:
+        raise ValueError(f"unsupported range: {range_}")
+    return int(m.group(1)) * _UNIT_S[m.group(2)]
+
+
+def chart_to_bars(chart_json: dict) -> np.ndarray:
+    """Yahoo chart JSON -> BAR_DTYPE array (rows with missing OHLC dropped)."""
+    r0 = chart_json["chart"]["result"][0]
+    ts = r0.get("timestamp") or []
+    out = np.empty(len(ts), dtype=BAR_DTYPE)
+    if not ts:
+        return out
+    quote = r0["indicators"]["quote"][0]
+    out["ts"] = ts
+    for f in ("open", "high", "low", "close", "volume"):
+        col = quote.get(f) or [None] * len(ts)
+        out[f] = np.array(col, dtype=object).astype(np.float64)  # None -> nan
+    ok = ~np.isnan(out["open"]) & ~np.isnan(out["high"]) & ~np.isnan(out["low"]) & ~np.isnan(out["close"])
+    return out[ok]
+
+
+@dataclass
+class FetchPlan:
+    """What has to come from upstream: nothing, the tail since ``start``, or a full ``range_``."""
+    kind: str  # "fresh" | "tail" | "full"
+    range_: Optional[str] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+
+class BarStore:
+    """
+    Local on-disk bar store keyed by (symbol, interval).
+
+    Each series is one ``.npy`` file (BAR_DTYPE records, memory-mapped on read)
+    plus a small ``.json`` sidecar with its coverage. When a series is already
+    stored only the tail since the last stored bar is fetched (Yahoo
+    ``period1``/``period2``) and merged in; a full download only happens the
+    first time or when a longer range than stored is requested. Tail fetches
+    are skipped entirely for ``tail_ttl_s`` after the last successful refresh.
+    At most ``max_series`` series stay loaded (LRU); evicted ones are re-read
+    from disk. Disk writes run in the default executor, off the event loop.
+    """
+
+    def __init__(self, root: str, tail_ttl_s: float = 60.0, max_series: int = 2000) -> None:
+        self.root = root
+        self.tail_ttl_s = tail_ttl_s
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._checked: Dict[Tuple[str, str], float] = {}
+        self.counts = {"fresh": 0, "tail": 0, "full": 0, "bars_fetched": 0}
+
+    # -------------------------
+    # files
+    # -------------------------
+    def _paths(self, symbol: str, interval: str) -> Tuple[str, str]:
+        d = os.path.join(self.root, interval)
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", symbol)
+        return os.path.join(d, f"{safe}.npy"), os.path.join(d, f"{safe}.json")
+
+    def read(self, symbol: str, interval: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+        key = (symbol, interval)
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key)
+                return hit
+        npy, meta_path = self._paths(symbol, interval)
+        try:
+            arr = np.load(npy, mmap_mode="r")
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            arr, meta = np.empty(0, dtype=BAR_DTYPE), {}
+        self._remember(key, arr, meta)
+        return arr, meta
+
+    def _remember(self, key: Tuple[str, str], arr: np.ndarray, meta: Dict[str, Any]) -> None:
+        with self._lock:
+            self._mem[key] = (arr, meta)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_series:
+                old, _ = self._mem.popitem(last=False)
+                self._checked.pop(old, None)
+
+    def _write(self, symbol: str, interval: str, arr: np.ndarray, meta: Dict[str, Any]) -> None:
+        npy, meta_path = self._paths(symbol, interval)
+        os.makedirs(os.path.dirname(npy), exist_ok=True)
+        tmp = f"{npy}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr, dtype=BAR_DTYPE))
+        os.replace(tmp, npy)
+        tmp_meta = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        self._remember((symbol, interval), np.load(npy, mmap_mode="r"), meta)
+
+    # -------------------------
+    # plan / merge
+    # -------------------------
+    def plan(self, symbol: str, interval: str, range_: str, now: Optional[float] = None) -> FetchPlan:
+        now = time.time() if now is None else now
+        arr, meta = self.read(symbol, interval)
+        span = range_to_seconds(range_, now)
+        covered_from = meta.get("covered_from")
+        if len(arr) == 0 or covered_from is None:
+            return FetchPlan("full", range_=range_)
+        if (span is None and covered_from > 0) or (span is not None and covered_from > now - span):
+            return FetchPlan("full", range_=range_)
+        if now - self._checked.get((symbol, interval), 0.0) < self.tail_ttl_s:
+            return FetchPlan("fresh")
+        # re-fetch from the start of the last stored bar's (HK) day: that bar may still be forming
+        last = int(arr["ts"][-1])
+        start = last - (last + _HK_OFFSET_S) % _DAY_S
+        return FetchPlan("tail", start=start, end=int(now) + _DAY_S)
+
+    def merge(self, symbol: str, interval: str, plan: FetchPlan, new: np.ndarray, now: Optional[float] = None) -> np.ndarray:
+        now = time.time() if now is None else now
+        arr, meta = self.read(symbol, interval)
+        self.counts["bars_fetched"] += len(new)
+        if plan.kind == "full":
+            span = range_to_seconds(plan.range_, now)
+            merged = new
+            meta = {"covered_from": 0 if span is None else int(now - span)}
+        else:
+            cut = plan.start if len(new) == 0 else min(plan.start, int(new["ts"][0]))
+            merged = np.concatenate([np.asarray(arr[arr["ts"] < cut]), new])
+            meta = dict(meta)
+        meta["updated_at"] = int(now)
+        self._write(symbol, interval, merged, meta)
+        self._checked[(symbol, interval)] = now
+        return self.read(symbol, interval)[0]
+
+    def _slice(self, arr: np.ndarray, range_: str, now: float) -> np.ndarray:
+        span = range_to_seconds(range_, now)
+        if span is None:
+            return arr
+        return arr[arr["ts"] >= now - span]
+
+    # -------------------------
+    # get
+    # -------------------------
+    async def aget(self, symbol: str, interval: str, range_: str, fetch_chart: Callable[..., Awaitable[dict]]) -> np.ndarray:
+        """Bars for the last ``range_``; ``fetch_chart`` is ``yahoo_chart_async``-compatible."""
+        now = time.time()
+        p = self.plan(symbol, interval, range_, now)
+        self.counts[p.kind] += 1
+        if p.kind == "fresh":
+            return self._slice(self.read(symbol, interval)[0], range_, now)
+        if p.kind == "full":
+            new = chart_to_bars(await fetch_chart(symbol, interval=interval, range_=range_))
+        else:
+            new = chart_to_bars(await fetch_chart(symbol, interval=interval, start=p.start, end=p.end))
+        # np.save + sidecar + os.replace block; keep them off the event loop
+        merged = await asyncio.get_running_loop().run_in_executor(None, self.merge, symbol, interval, p, new, now)
+        return self._slice(merged, range_, now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            series = len(self._mem)
+        return {"root": self.root, "series_loaded": series, "max_series": self.max_series, **self.counts}
+
+
+def bars_to_api(arr: np.ndarray) -> List[List[float]]:
+    """BAR_DTYPE array -> /api/kline bars: [ms, open, close, low, high, volume]."""
+    vol = np.nan_to_num(arr["volume"], nan=0.0).astype(np.int64)
+    return [
+        list(row)
+        for row in zip(
+            (arr["ts"] * 1000).tolist(),
+            arr["open"].tolist(),
+            arr["close"].tolist(),
+            arr["low"].tolist(),
+            arr["high"].tolist(),
+            vol.tolist(),
+        )
+    ]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def align_closes(series: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BAR_DTYPE arrays -> (shared ts grid, close matrix [len(grid), len(series)]).
+
+    The grid is the union of all bar timestamps. Each column is forward-filled
+    over the grid (halts and missing bars repeat the last close). Cells before a
+    series' first bar are NaN.
+    """
+    if not series:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0))
+    grid = np.unique(np.concatenate([a["ts"] for a in series]))
+    out = np.full((len(grid), len(series)), np.nan)
+    for j, a in enumerate(series):
+        if len(a) == 0:
+            continue
+        pos = np.searchsorted(a["ts"], grid, side="right") - 1
+        ok = pos >= 0
+        out[ok, j] = a["close"][pos[ok]]
+    return grid, out
+
+
+def first_valid(m: np.ndarray) -> np.ndarray:
+    """First non-NaN value of every column (NaN for all-NaN columns)."""
+    if m.size == 0:
+        return np.full(m.shape[1], np.nan)
+    valid = ~np.isnan(m)
+    idx = valid.argmax(axis=0)
+    out = m[idx, np.arange(m.shape[1])]
+    out[~valid.any(axis=0)] = np.nan
+    return out
+
+
+def cumulative_returns(closes: np.ndarray, base: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(percent return, log return) of every cell against its column's ``base``."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = closes / base
+        return (rel - 1.0) * 100.0, np.log(rel)
+
+
+def thin_rows(grid: np.ndarray, m: np.ndarray, max_points: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the last row of each of ``max_points`` equal buckets (the last row always survives)."""
+    n = len(grid)
+    if not max_points or n <= max_points:
+        return grid, m
+    keep = (np.arange(1, max_points + 1) * n) // max_points - 1
+    return grid[keep], m[keep]
+
+
+def _col(v: np.ndarray, ndigits: int) -> List[Optional[float]]:
+    return [x if math.isfinite(x) else None for x in np.round(v, ndigits).tolist()]
+
+
+def compare_payload(
+    symbols: Sequence[str],
+    series: Sequence[np.ndarray],
+    base_on_open: bool = False,
+    max_points: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Columnar compare matrix::
+
+        {"t": [ms..], "symbols": [...], "base": {sym: price},
+         "close": {sym: [..]}, "pct": {sym: [..]}, "log": {sym: [..]}}
+
+    ``pct`` / ``log`` are cumulative returns against each symbol's first bar
+    (its open when ``base_on_open``, else its close). Values before a symbol's
+    first bar are null.
+    """
+    grid, closes = align_closes(series)
+    if base_on_open:
+        base = np.array([a["open"][0] if len(a) else np.nan for a in series], dtype=np.float64)
+    else:
+        base = first_valid(closes)
+    grid, closes = thin_rows(grid, closes, max_points)
+    pct, log = cumulative_returns(closes, base)
+    return {
+        "t": (grid * 1000).tolist(),
+        "symbols": list(symbols),
+        "base": dict(zip(symbols, _col(base, 6))),
+        "close": {s: _col(closes[:, j], 6) for j, s in enumerate(symbols)},
+        "pct": {s: _col(pct[:, j], 4) for j, s in enumerate(symbols)},
+        "log": {s: _col(log[:, j], 6) for j, s in enumerate(symbols)},
+    }
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became available within the pool's checkout timeout."""
+
+
+def _pct(xs: Sequence[float], q: float) -> Optional[float]:
+    if not xs:
+        return None
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def _text(v: Any) -> Any:
+    # the binary protocol hands back VARCHAR as bytearray on some connector versions
+    return v.decode("utf-8") if isinstance(v, (bytes, bytearray)) else v
+
+
+class PooledConnection:
+    """One pooled DB-API connection plus its server-side prepared statements (one cursor per SQL text)."""
+
+    __slots__ = ("conn", "created_at", "last_used", "_stmts")
+
+    def __init__(self, conn: Any) -> None:
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+        self._stmts: Dict[str, Any] = {}
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """
+        Run ``sql`` as a server-side prepared statement and return dict rows.
+        The statement is prepared once per connection and re-executed afterwards.
+        """
+        cur = self._stmts.get(sql)
+        if cur is None:
+            cur = self._stmts[sql] = self.conn.cursor(prepared=True)
+        cur.execute(sql, tuple(params))
+        names = cur.column_names
+        return [dict(zip(names, map(_text, row))) for row in cur.fetchall()]
+
+    def cursor(self, **kw: Any) -> Any:
+        """Plain (text-protocol) cursor for one-off statements."""
+        return self.conn.cursor(**kw)
+
+    def close(self) -> None:
+        for cur in self._stmts.values():
+            try:
+                cur.close()
+            except Exception:
+                pass
+        self._stmts.clear()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool around a ``connect()`` factory.
+
+    At most ``size`` connections are open; a checkout waits up to ``timeout_s``
+    for one to be returned and then raises :class:`PoolTimeout`. On checkout a
+    connection older than ``recycle_s`` is replaced, and one idle for longer than
+    ``ping_after_s`` is pinged first (and replaced if the ping fails). A
+    connection whose user raised and which no longer answers is discarded
+    instead of being returned to the pool.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 8,
+        timeout_s: float = 5.0,
+        recycle_s: float = 3600.0,
+        ping_after_s: float = 30.0,
+    ) -> None:
+        self.connect = connect
+        self.size = size
+        self.timeout_s = timeout_s
+        self.recycle_s = recycle_s
+        self.ping_after_s = ping_after_s
+        self._cond = threading.Condition()
+        self._idle: Deque[PooledConnection] = deque()
+        self._open = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._waits: Deque[float] = deque(maxlen=512)
+        self._holds: Deque[float] = deque(maxlen=512)
+        self.counts = {
+            "checkouts": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "discarded": 0,
+        }
+        self._wait_s_total = 0.0
+        self._wait_s_max = 0.0
+
+    # -------------------------
+    # checkout / return
+    # -------------------------
+    def _acquire(self) -> PooledConnection:
+        t0 = time.monotonic()
+        deadline = t0 + self.timeout_s
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    pc: Optional[PooledConnection] = self._idle.pop()  # LIFO: keep the warm ones warm
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    pc = None
+                    break
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    self.counts["timeouts"] += 1
+                    raise PoolTimeout(f"no DB connection available within {self.timeout_s}s (size={self.size})")
+                waited = True
+                self._cond.wait(left)
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+        try:
+            pc = self._checked(pc)
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait_s = time.monotonic() - t0
+        with self._cond:
+            self.counts["checkouts"] += 1
+            self.counts["waited"] += int(waited)
+            self._wait_s_total += wait_s
+            self._wait_s_max = max(self._wait_s_max, wait_s)
+            self._waits.append(wait_s)
+        return pc
+
+    def _checked(self, pc: Optional[PooledConnection]) -> PooledConnection:
+        """Health-check / recycle an idle connection, or open a new one (runs outside the lock)."""
+        now = time.monotonic()
+        if pc is not None and now - pc.created_at >= self.recycle_s:
+            pc.close()
+            pc = None
+            self._bump("recycled")
+        elif pc is not None and now - pc.last_used >= self.ping_after_s:
+            try:
+                pc.conn.ping(reconnect=False)
+            except Exception:
+                pc.close()
+                pc = None
+                self._bump("ping_failures")
+        if pc is None:
+            pc = PooledConnection(self.connect())
+            self._bump("created")
+        return pc
+
+    def _bump(self, field: str) -> None:
+        with self._cond:
+            self.counts[field] += 1
+
+    def _release(self, pc: PooledConnection, failed: bool, held_s: float) -> None:
+        broken = False
+        if failed:
+            try:
+                broken = not pc.conn.is_connected()
+            except Exception:
+                broken = True
+        if broken:
+            pc.close()
+        with self._cond:
+            self._in_use -= 1
+            self._holds.append(held_s)
+            if broken:
+                self._open -= 1
+                self.counts["discarded"] += 1
+            else:
+                pc.last_used = time.monotonic()
+                self._idle.append(pc)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        pc = self._acquire()
+        t0 = time.monotonic()
+        failed = False
+        try:
+            yield pc
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(pc, failed, time.monotonic() - t0)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for pc in idle:
+            pc.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits, holds = list(self._waits), list(self._holds)
+            out = {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                **self.counts,
+                "wait_s_total": round(self._wait_s_total, 4),
+                "wait_s_max": round(self._wait_s_max, 4),
+            }
+        for name, xs in (("wait", waits), ("hold", holds)):
+            for q in (0.5, 0.95, 0.99):
+                v = _pct(xs, q)
+                out[f"{name}_s_p{int(q * 100)}"] = round(v, 4) if v is not None else None
+        return out
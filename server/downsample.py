@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .resample import aggregate_bars
+
+METHOD_MINMAX = "minmax"  # candles: OHLCV per bucket (keeps every high / low)
+METHOD_LTTB = "lttb"      # line: Largest-Triangle-Three-Buckets on close
+METHODS = (METHOD_MINMAX, METHOD_LTTB)
+
+MIN_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indices of the ``n`` points Largest-Triangle-Three-Buckets keeps.
+
+    First and last points are always kept; the rest are split into ``n - 2``
+    equal buckets and from each the point forming the largest triangle with the
+    previously kept point and the next bucket's mean is chosen. Bucket means
+    come from one ``reduceat``; the per-bucket pick is one vectorized argmax.
+    Points with a NaN ``y`` (gaps) are never kept; ``n == 2`` keeps just the
+    endpoints.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = ~np.isnan(y)
+    if not ok.all():
+        idx = np.flatnonzero(ok)
+        return idx[lttb_indices(x[idx], y[idx], n)]
+    N = len(x)
+    if n >= N or n < 2:
+        return np.arange(N)
+    if n == 2:
+        return np.array([0, N - 1], dtype=np.int64)
+    edges = np.linspace(1, N - 1, n - 1).astype(np.int64)  # bucket i = [edges[i], edges[i + 1])
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # "next bucket" centroid for bucket i; the last bucket looks at the last point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, N - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_buckets(arr: np.ndarray, n: int) -> np.ndarray:
+    """Merge consecutive bars into ``n`` near-equal buckets (open first, close last, max high, min low, summed volume)."""
+    N = len(arr)
+    if n >= N or n < 1:
+        return np.asarray(arr)
+    bucket = np.arange(N, dtype=np.int64) * n // N
+    return aggregate_bars(arr, bucket, arr["ts"])
+
+
+def downsample(arr: np.ndarray, max_points: int, method: str = METHOD_MINMAX) -> np.ndarray:
+    """BAR_DTYPE array -> at most ``max_points`` bars (unchanged when already small enough)."""
+    if not max_points or len(arr) <= max_points:
+        return arr
+    if method == METHOD_LTTB:
+        return np.asarray(arr)[lttb_indices(arr["ts"], arr["close"], max(max_points, MIN_POINTS))]
+    if method == METHOD_MINMAX:
+        return minmax_buckets(arr, max_points)
+    raise ValueError(f"unsupported downsample method: {method}")
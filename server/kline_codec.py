@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .bar_store import BAR_DTYPE
+
+try:  # optional: Arrow IPC output
+    import pyarrow as pa
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+
+# ?format= values
+FORMAT_ROWS = "rows"          # legacy: {"bars": [[ms, o, c, l, h, v], ...]}
+FORMAT_COLUMNS = "columns"    # struct-of-arrays JSON
+FORMAT_BINARY = "binary"      # packed little-endian buffers (see encode_binary)
+FORMAT_ARROW = "arrow"        # Arrow IPC stream (needs pyarrow)
+
+MEDIA_BINARY = "application/vnd.stock.kline"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+MEDIA_COLUMNS = "application/vnd.stock.kline+json"
+
+_BINARY_MAGIC = b"KLB1"
+# magic, n_bars, reserved
+_BINARY_HEADER = struct.Struct("<4sII")
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Explicit ``?format=`` wins; otherwise pick from the Accept header; default is the legacy rows JSON."""
+    f = (fmt or "").strip().lower()
+    if f in ("json", FORMAT_ROWS):
+        return FORMAT_ROWS
+    if f in (FORMAT_COLUMNS, FORMAT_BINARY, FORMAT_ARROW):
+        if f == FORMAT_ARROW and pa is None:
+            raise ValueError("format=arrow requires pyarrow")
+        return f
+    if f:
+        raise ValueError(f"unsupported format: {fmt}")
+    a = (accept or "").lower()
+    if MEDIA_ARROW in a and pa is not None:
+        return FORMAT_ARROW
+    if MEDIA_COLUMNS in a:  # before MEDIA_BINARY, which is a prefix of it
+        return FORMAT_COLUMNS
+    if MEDIA_BINARY in a or "application/octet-stream" in a:
+        return FORMAT_BINARY
+    return FORMAT_ROWS
+
+
+def rows_to_bars(rows: Sequence[Sequence[float]]) -> np.ndarray:
+    """[[ms, o, c, l, h, v], ...] (e.g. Tencent minute bars) -> BAR_DTYPE array."""
+    out = np.empty(len(rows), dtype=BAR_DTYPE)
+    if not len(rows):
+        return out
+    a = np.asarray(rows, dtype=np.float64)
+    out["ts"] = (a[:, 0] // 1000).astype(np.int64)
+    out["open"], out["close"], out["low"], out["high"], out["volume"] = a[:, 1], a[:, 2], a[:, 3], a[:, 4], a[:, 5]
+    return out
+
+
+def _columns(arr: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "t": arr["ts"].astype(np.int64) * 1000,
+        "o": np.ascontiguousarray(arr["open"]),
+        "c": np.ascontiguousarray(arr["close"]),
+        "l": np.ascontiguousarray(arr["low"]),
+        "h": np.ascontiguousarray(arr["high"]),
+        "v": np.nan_to_num(arr["volume"], nan=0.0).astype(np.int64),
+    }
+
+
+def encode_columns(arr: np.ndarray, meta: Dict[str, Any]) -> bytes:
+    """
+    Struct-of-arrays JSON:
+    {..meta, "columns": {"t": [ms..], "o": [..], "c": [..], "l": [..], "h": [..], "v": [..]}}
+    """
+    cols = {k: v.tolist() for k, v in _columns(arr).items()}
+    return json.dumps({**meta, "n": len(arr), "columns": cols}, separators=(",", ":"), allow_nan=False).encode()
+
+
+def encode_binary(arr: np.ndarray) -> bytes:
+    """
+    Packed little-endian layout::
+
+        "KLB1" | uint32 n | uint32 0
+        int64 t_ms[n] | float64 open[n] | float64 close[n] | float64 low[n] | float64 high[n] | int64 volume[n]
+
+    Symbol / tf / range travel in response headers.
+    """
+    cols = _columns(arr)
+    parts = [_BINARY_HEADER.pack(_BINARY_MAGIC, len(arr), 0)]
+    parts += [cols[k].astype(cols[k].dtype.newbyteorder("<"), copy=False).tobytes() for k in ("t", "o", "c", "l", "h", "v")]
+    return b"".join(parts)
+
+
+def encode_arrow(arr: np.ndarray, meta: Dict[str, Any]) -> bytes:
+    if pa is None:
+        raise ValueError("format=arrow requires pyarrow")
+    cols = _columns(arr)
+    table = pa.table(
+        {k: pa.array(v) for k, v in cols.items()},
+        metadata={k: str(v) for k, v in meta.items() if v is not None},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table)
+    return sink.getvalue().to_pybytes()
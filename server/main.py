@@ -1,16 +1,57 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-import time
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Literal
 
 import pandas as pd
-import requests
 import mysql.connector
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-
-from .tencent_finance import fetch_intraday_minute_bars, fetch_quote
+from fastapi.responses import Response, StreamingResponse
+
+from stock_sdk.routing import HedgePolicy, RouteScoreboard
+
+from .bar_store import BarStore, bars_to_api, chart_to_bars, range_to_seconds
+from .compare import compare_payload
+from .db_pool import ConnectionPool
+from .downsample import METHOD_MINMAX, METHODS as DOWNSAMPLE_METHODS, MIN_POINTS, downsample
+from .kline_codec import (
+    FORMAT_ARROW,
+    FORMAT_COLUMNS,
+    FORMAT_ROWS,
+    MEDIA_ARROW,
+    MEDIA_BINARY,
+    encode_arrow,
+    encode_binary,
+    encode_columns,
+    negotiate_format,
+    rows_to_bars,
+)
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    DB_QUERY_SECONDS,
+    REGISTRY as METRICS,
+    TENCENT_FALLBACKS,
+    MetricsMiddleware,
+)
+from .minute_feed import MinuteFeed
+from .quote_stream import QuoteHub
+from .resample import BaseBarCache, base_tf, resample
+from .response_cache import ResponseCache
+from .rolling_extremes import ExtremesRegistry, parse_window
+from .search_index import SearchIndexRefresher
+from .singleflight import SingleFlight
+from .upstream_async import AsyncUpstream
+from .upstream_scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    NORMAL,
+    UpstreamScheduler,
+    upstream_priority,
+)
 
 # -------------------------
 # Load .env (VERY IMPORTANT)
@@ -21,8 +62,44 @@ try:
 except Exception:
     pass
 
-app = FastAPI(title="Stock Project API", version="1.0.2")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    search_index.start()
+    yield
+    search_index.stop()
+    upstream_scheduler.stop()
+    await upstream_async.aclose()
+    db_pool.close()
+
+
+app = FastAPI(title="Stock Project API", version="1.0.2", lifespan=lifespan)
+
+# 上游请求优先级按路由划分：交互（搜索 -> summary / K线 / 对比）优先于监控列表轮询，后台刷新最后
+ROUTE_PRIORITY = {
+    "/api/search": INTERACTIVE,
+    "/api/summary": INTERACTIVE,
+    "/api/kline": INTERACTIVE,
+    "/api/compare": INTERACTIVE,
+    "/api/summaries": NORMAL,
+    "/api/quotes": NORMAL,
+}
+
+
+class UpstreamPriorityMiddleware:
+    """纯 ASGI 中间件：按路径设置本次请求的上游优先级（contextvar，随任务/线程池传递）。"""
 
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with upstream_priority(ROUTE_PRIORITY.get(scope.get("path", ""), NORMAL)):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(UpstreamPriorityMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -48,9 +125,21 @@ def db_conn():
         user=DB_USER,
         password=DB_PASSWORD,
         database=DB_NAME,
+        autocommit=True,  # 池化连接长期存活，避免读到旧快照
     )
 
 
+# 有界连接池：取连接最多等 DB_POOL_TIMEOUT_S；超过 DB_POOL_RECYCLE_S 的连接换新，
+# 空闲超过 DB_POOL_PING_AFTER_S 的连接先 ping 再用
+db_pool = ConnectionPool(
+    db_conn,
+    size=int(os.getenv("DB_POOL_SIZE", "8")),
+    timeout_s=float(os.getenv("DB_POOL_TIMEOUT_S", "5")),
+    recycle_s=float(os.getenv("DB_POOL_RECYCLE_S", "3600")),
+    ping_after_s=float(os.getenv("DB_POOL_PING_AFTER_S", "30")),
+)
+
+
 # -------------------------
 # Yahoo / Proxy (可选：仅在拉K线/summary时用)
 # -------------------------
@@ -73,35 +162,61 @@ def mk_proxy(host: str, port: int) -> str:
     return f"http://{DECODO_USER}:{DECODO_PASS_ENC}@{host}:{port}"
 
 
-def get_json_with_failover(url: str, params: dict, timeout: int = 25) -> dict:
-    last_err = None
-    for host, ports in PROXY_CANDIDATES:
-        for port in ports:
-            if host is None and port is None:
-                # 不使用代理
-                s = requests.Session()
-                s.trust_env = False
-                s.headers.update(YAHOO_HEADERS)
-            else:
-                proxy = mk_proxy(host, port)
-                s = requests.Session()
-                s.trust_env = False  # 不吃环境代理
-                s.proxies.update({"http": proxy, "https": proxy})
-                s.headers.update(YAHOO_HEADERS)
-            try:
-                r = s.get(url, params=params, timeout=timeout)
-                ctype = (r.headers.get("content-type") or "").lower()
-                if r.status_code == 200 and "json" in ctype:
-                    return r.json()
-                last_err = RuntimeError(f"Yahoo HTTP {r.status_code} ctype={ctype}")
-                time.sleep(0.8)
-            except Exception as e:
-                last_err = e
-                time.sleep(1.0)
-    raise RuntimeError(f"all proxies failed, last_err={last_err}")
+# 路由健康度：按成功率/延迟 EWMA 排序，连续失败熔断（半开探测恢复），慢路由对冲
+YAHOO_ROUTES = [(host, port) for host, ports in PROXY_CANDIDATES for port in ports]
+route_board = RouteScoreboard()
+YAHOO_HEDGE_PARALLEL = int(os.getenv("YAHOO_HEDGE_PARALLEL", "2"))  # 1 = 不对冲
+YAHOO_HEDGE = HedgePolicy(max_parallel=YAHOO_HEDGE_PARALLEL) if YAHOO_HEDGE_PARALLEL > 1 else None
+
+# 上游令牌桶：每个 provider 一个总速率，每条代理路由（出口 IP）再各一个；
+# 排队按优先级出队，队列超限或预计等待超过该优先级的预算时立即失败（UpstreamOverloaded）
+upstream_scheduler = UpstreamScheduler(
+    route_rate=float(os.getenv("UPSTREAM_ROUTE_RPS", "2")),
+    route_burst=float(os.getenv("UPSTREAM_ROUTE_BURST", "4")),
+)
+upstream_scheduler.add(
+    "yahoo", float(os.getenv("UPSTREAM_YAHOO_RPS", "8")), float(os.getenv("UPSTREAM_YAHOO_BURST", "16"))
+)
+upstream_scheduler.add(
+    "tencent", float(os.getenv("UPSTREAM_TENCENT_RPS", "20")), float(os.getenv("UPSTREAM_TENCENT_BURST", "40"))
+)
+# Yahoo 429 且没有 Retry-After 时，该路由暂停发请求的秒数
+YAHOO_429_PAUSE_S = float(os.getenv("YAHOO_429_PAUSE_S", "5"))
+
+
+# 同一上游请求并发到达时只发一次（api.log 里 kline/summary 经常成对/成批出现）
+upstream_flight = SingleFlight()
+
+
+# 本地日线/周线库（npy 文件，命中时只补拉尾部）
+BAR_STORE_DIR = os.getenv(
+    "BAR_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bars")
+)
+STORED_TF = ("1d",)
+bar_store = BarStore(
+    BAR_STORE_DIR,
+    tail_ttl_s=float(os.getenv("BAR_STORE_TAIL_TTL_S", "60")),
+    max_series=int(os.getenv("BAR_STORE_MAX_SERIES", "2000")),
+)
 
 
-def yahoo_chart(symbol: str, interval: str, range_: str = None, start: int = None, end: int = None) -> dict:
+# 所有路由共用的非阻塞上游（Yahoo 代理 failover + 腾讯），不占线程池
+# 每条代理路由（及腾讯）一个带连接池的 httpx.AsyncClient，跨请求复用长连接（省掉 TCP/TLS/CONNECT 握手）
+upstream_async = AsyncUpstream(
+    YAHOO_ROUTES,
+    mk_proxy,
+    YAHOO_HEADERS,
+    board=route_board,
+    hedge=YAHOO_HEDGE,
+    scheduler=upstream_scheduler,
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "16")),
+    keepalive_expiry_s=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY_S", "300")),
+    pause_429_s=YAHOO_429_PAUSE_S,
+)
+
+
+def _yahoo_chart_request(symbol: str, interval: str, range_: str = None, start: int = None, end: int = None):
     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
     params = {"interval": interval}
     if range_:
@@ -109,7 +224,33 @@ def yahoo_chart(symbol: str, interval: str, range_: str = None, start: int = Non
     elif start and end:
         params["period1"] = start
         params["period2"] = end
-    return get_json_with_failover(url, params)
+    return url, params
+
+
+async def yahoo_chart_async(symbol: str, interval: str, range_: str = None, start: int = None, end: int = None) -> dict:
+    url, params = _yahoo_chart_request(symbol, interval, range_, start, end)
+    key = ("yahoo_chart", symbol, tuple(sorted(params.items())))
+    return await upstream_flight.do_async(key, upstream_async.get_json_with_failover, url, params)
+
+
+async def tencent_quote_async(symbol: str):
+    return await upstream_flight.do_async(("tencent_quote", symbol), upstream_async.fetch_quote, symbol)
+
+
+async def tencent_quotes_async(symbols: List[str]):
+    return await upstream_flight.do_async(("tencent_quotes", tuple(sorted(symbols))), upstream_async.fetch_quotes, symbols)
+
+
+async def tencent_minute_payload_async(symbol: str):
+    return await upstream_flight.do_async(("tencent_minute", symbol), upstream_async.fetch_minute_payload, symbol)
+
+
+# 当日分钟线：每只股票一个 ring buffer，从腾讯整日数据里只解析新增/最后一分钟
+minute_feed = MinuteFeed(refresh_s=float(os.getenv("MINUTE_FEED_REFRESH_S", "2")))
+
+
+async def tencent_minute_bars_async(symbol: str, since: int = None):
+    return await minute_feed.bars(symbol, tencent_minute_payload_async, since)
 
 
 # -------------------------
@@ -131,6 +272,24 @@ def normalize_yahoo_symbol(symbol: str) -> str:
     return symbol
 
 
+def parse_symbols(symbols: str, limit: int = 200) -> List[str]:
+    """"0700.HK, 9988.HK,0700.HK" -> ["0700.HK", "9988.HK"]（规范化 + 去重，保持顺序）"""
+    out: List[str] = []
+    seen = set()
+    for raw in (symbols or "").split(","):
+        raw = raw.strip()
+        if not raw:
+            continue
+        sym = normalize_yahoo_symbol(raw)
+        if sym in seen:
+            continue
+        seen.add(sym)
+        out.append(sym)
+        if len(out) >= limit:
+            break
+    return out
+
+
 def resolve_stock_alias_columns(cur) -> Dict[str, str]:
     cur.execute(
         """
@@ -161,83 +320,156 @@ def resolve_stock_alias_columns(cur) -> Dict[str, str]:
     return {"alias_col": alias_col, "target_col": target_col}
 
 
+# stock_aliases 列名解析结果缓存：启动时（search index 首次加载）解析一次；
+# schema 签名变化或查询报 unknown column / no such table 时重新解析
+_alias_cols: Dict[str, Any] = {"cols": None, "schema": None}
+_SCHEMA_ERRNOS = (1054, 1146)  # ER_BAD_FIELD_ERROR, ER_NO_SUCH_TABLE
+
+
+def alias_columns(pc, force: bool = False) -> Dict[str, str]:
+    cols = _alias_cols["cols"]
+    if cols is None or force:
+        cur = pc.cursor()
+        try:
+            cols = _alias_cols["cols"] = resolve_stock_alias_columns(cur)
+        finally:
+            cur.close()
+    return cols
+
+
+def alias_schema_signature(pc):
+    """stock_aliases 的列定义（ALTER TABLE 后会变）"""
+    rows = pc.query(
+        """
+        SELECT COLUMN_NAME, ORDINAL_POSITION
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA=%s AND TABLE_NAME='stock_aliases'
+        ORDER BY ORDINAL_POSITION
+        """,
+        (DB_NAME,),
+    )
+    return tuple(r["COLUMN_NAME"] for r in rows)
+
+
+_SQL_SEARCH_CODE = """
+    SELECT stock_code, stock_name, market
+    FROM stock_mapping
+    WHERE market='HK'
+      AND (stock_code=%s OR stock_code=LPAD(%s,5,'0'))
+    LIMIT %s
+"""
+
+_SQL_SEARCH_NAME = """
+    SELECT stock_code, stock_name, market
+    FROM stock_mapping
+    WHERE market='HK' AND stock_name LIKE %s
+    LIMIT %s
+"""
+
+
 def db_search_hk(q: str, limit: int = 10) -> List[Dict[str, Any]]:
     q = (q or "").strip()
     if not q:
         return []
 
-    conn = db_conn()
-    cur = conn.cursor(dictionary=True)
-
-    try:
+    # 三段查询都走服务端 prepared statement（每个连接 prepare 一次，之后只传参数）
+    with DB_QUERY_SECONDS.time("search_hk"), db_pool.connection() as pc:
         # 1) 代码输入：1810 / 01810
         if q.isdigit():
-            cur.execute(
-                """
-                SELECT stock_code, stock_name, market
-                FROM stock_mapping
-                WHERE market='HK'
-                  AND (stock_code=%s OR stock_code=LPAD(%s,5,'0'))
-                LIMIT %s
-                """,
-                (q, q, limit),
-            )
-            rows = cur.fetchall()
+            rows = pc.query(_SQL_SEARCH_CODE, (q, q, limit))
             if rows:
                 return rows
 
         # 2) 中文名模糊
-        cur.execute(
-            """
-            SELECT stock_code, stock_name, market
-            FROM stock_mapping
-            WHERE market='HK' AND stock_name LIKE %s
-            LIMIT %s
-            """,
-            (f"%{q}%", limit),
-        )
-        rows = cur.fetchall()
+        rows = pc.query(_SQL_SEARCH_NAME, (f"%{q}%", limit))
         if rows:
             return rows
 
         # 3) alias 增强
-        cols = resolve_stock_alias_columns(cur)
-        alias_col = cols["alias_col"]
-        target_col = cols["target_col"]
-
-        cur.execute(
-            f"""
-            SELECT DISTINCT {target_col} AS target
-            FROM stock_aliases
-            WHERE {alias_col} LIKE %s
-            LIMIT %s
-            """,
-            (f"%{q}%", limit),
-        )
-        alias_rows = cur.fetchall()
-        targets = [r["target"] for r in alias_rows if r.get("target")]
-        if targets:
-            conds = []
-            params = []
-            for t in targets:
-                conds.append("stock_name LIKE %s")
-                params.append(f"%{t}%")
-            where_like = " OR ".join(conds)
-            cur.execute(
-                f"""
-                SELECT stock_code, stock_name, market
-                FROM stock_mapping
-                WHERE market='HK' AND ({where_like})
-                LIMIT %s
-                """,
-                (*params, limit),
-            )
-            return cur.fetchall()
-
+        try:
+            return _db_search_alias(pc, q, limit, alias_columns(pc))
+        except mysql.connector.Error as e:
+            if e.errno not in _SCHEMA_ERRNOS:
+                raise
+            # 表结构变了：重新解析列名再试一次
+            return _db_search_alias(pc, q, limit, alias_columns(pc, force=True))
+
+
+# alias 命中的 target 名称最多取这么多个
+_ALIAS_TARGET_SLOTS = 10
+
+_SQL_SEARCH_ALIAS_TARGETS = f"""
+    SELECT stock_code, stock_name, market
+    FROM stock_mapping
+    WHERE market='HK' AND ({" OR ".join(["stock_name LIKE %s"] * _ALIAS_TARGET_SLOTS)})
+    LIMIT %s
+"""
+
+
+def _db_search_alias(pc, q: str, limit: int, cols: Dict[str, str]) -> List[Dict[str, Any]]:
+    alias_col = cols["alias_col"]
+    target_col = cols["target_col"]
+
+    alias_rows = pc.query(
+        f"""
+        SELECT DISTINCT {target_col} AS target
+        FROM stock_aliases
+        WHERE {alias_col} LIKE %s
+        LIMIT %s
+        """,
+        (f"%{q}%", min(limit, _ALIAS_TARGET_SLOTS)),
+    )
+    targets = [r["target"] for r in alias_rows if r.get("target")]
+    if not targets:
         return []
-    finally:
-        cur.close()
-        conn.close()
+    # 固定 _ALIAS_TARGET_SLOTS 个条件（不足的用最后一个 target 补齐，重复的 LIKE 不影响结果），
+    # 这样每个连接只 prepare 这一条 SQL
+    targets += targets[-1:] * (_ALIAS_TARGET_SLOTS - len(targets))
+    return pc.query(_SQL_SEARCH_ALIAS_TARGETS, (*[f"%{t}%" for t in targets], limit))
+
+
+def load_search_rows():
+    """search index 数据源：stock_mapping（HK）+ stock_aliases（alias -> 目标名称）"""
+    with DB_QUERY_SECONDS.time("search_index_load"), db_pool.connection() as pc:
+        cur = pc.cursor(dictionary=True)
+        try:
+            cur.execute("SELECT stock_code, stock_name, market FROM stock_mapping WHERE market='HK'")
+            stocks = cur.fetchall()
+            aliases = []
+            try:
+                cols = alias_columns(pc)
+                cur.execute(f"SELECT {cols['alias_col']} AS alias, {cols['target_col']} AS target FROM stock_aliases")
+                aliases = [(r["alias"], r["target"]) for r in cur.fetchall()]
+            except mysql.connector.Error:
+                pass  # 没有 alias 表也能用
+            return stocks, aliases
+        finally:
+            cur.close()
+
+
+def search_tables_signature():
+    """两张表的行数 + 最后更新时间 + stock_aliases 列定义；变化时后台重建索引"""
+    with db_pool.connection() as pc:
+        sig = []
+        for table in ("stock_mapping", "stock_aliases"):
+            try:
+                row = pc.query(f"SELECT COUNT(*) AS n, MAX(updated_at) AS updated FROM {table}")[0]
+                sig.append((row["n"], row["updated"]))
+            except mysql.connector.Error:
+                sig.append(None)
+        schema = alias_schema_signature(pc)
+        if schema != _alias_cols["schema"]:
+            if _alias_cols["schema"] is not None:
+                alias_columns(pc, force=True)
+            _alias_cols["schema"] = schema
+        sig.append(schema)
+        return tuple(sig)
+
+
+# 进程内搜索索引（启动时加载，表变化时后台刷新）；未就绪时回退到 MySQL LIKE 查询
+search_index = SearchIndexRefresher(
+    load_search_rows, search_tables_signature, interval_s=float(os.getenv("SEARCH_INDEX_REFRESH_S", "300"))
+)
 
 
 def chart_to_ohlcv(chart_json: dict) -> pd.DataFrame:
@@ -269,13 +501,12 @@ def _calc_change(price: float | None, prev: float | None) -> tuple[float | None,
     return float(change), float(pct)
 
 
-def latest_price_change_robust(symbol: str) -> dict:
+def price_change_from_chart(cj: dict) -> dict:
     """
-    更稳的 price/change/pctChange：
+    更稳的 price/change/pctChange（输入 5d 日线 chart JSON）：
     1) 优先 meta regularMarketPrice + previousClose
-    2) 若 meta 不完整：用 5d 日线的最后两根 Close 计算（休市也能算）
+    2) 若 meta 不完整：用最后两根 Close 计算（休市也能算）
     """
-    cj = yahoo_chart(symbol, interval="1d", range_="5d")
     r0 = cj["chart"]["result"][0]
     meta = r0.get("meta") or {}
 
@@ -326,25 +557,40 @@ def latest_price_change_robust(symbol: str) -> dict:
     }
 
 
-def high_6m_1y_2y(symbol: str) -> dict:
-    cj = yahoo_chart(symbol, interval="1d", range_="2y")
-    df = chart_to_ohlcv(cj).dropna(subset=["High", "Low"])
-    if df.empty:
-        return {"high6m": None, "low6m": None, "high1y": None, "low1y": None, "high2y": None, "low2y": None}
+# 滚动高低点索引（每个股票一份 sparse table，新日线到来时增量更新）
+extremes = ExtremesRegistry()
+DEFAULT_HIGH_WINDOWS = (("6m", "days", 183), ("1y", "days", 365), ("2y", "days", 730))
 
-    now = pd.Timestamp.utcnow()
-    df6 = df[df.index >= now - pd.Timedelta(days=183)]
-    dfy = df[df.index >= now - pd.Timedelta(days=365)]
-    df2y = df[df.index >= now - pd.Timedelta(days=730)]
 
-    return {
-        "high6m": float(df6["High"].max()) if not df6.empty else None,
-        "low6m": float(df6["Low"].min()) if not df6.empty else None,
-        "high1y": float(dfy["High"].max()) if not dfy.empty else None,
-        "low1y": float(dfy["Low"].min()) if not dfy.empty else None,
-        "high2y": float(df2y["High"].max()) if not df2y.empty else None,
-        "low2y": float(df2y["Low"].min()) if not df2y.empty else None,
-    }
+def parse_windows(windows: str = None) -> List[tuple]:
+    """"20d,52w" -> [("20d", "days", 20), ("52w", "days", 364)]；支持 d/w/m/y 以及 b（最近 N 根K线）"""
+    out = []
+    for w in (windows or "").split(","):
+        w = w.strip().lower()
+        if w:
+            kind, n = parse_window(w)
+            out.append((w, kind, n))
+    return out
+
+
+def store_range_for(windows: List[tuple]) -> str:
+    """日线库至少要覆盖的 range（默认 2y；更长的窗口按年向上取整）"""
+    days = 730
+    for _, kind, n in windows:
+        days = max(days, n if kind == "days" else int(n * 1.5))  # N 根交易日 ≈ 1.5N 自然日
+    return f"{-(-days // 365)}y"
+
+
+def highs_from_bars(symbol: str, arr, extra_windows: List[tuple] = ()) -> dict:
+    """6m/1y/2y 高低点（+ 可选自定义窗口，放在 "windows" 下）"""
+    res = extremes.highs(symbol, arr, [*DEFAULT_HIGH_WINDOWS, *extra_windows])
+    out = {}
+    for label, _, _ in DEFAULT_HIGH_WINDOWS:
+        out[f"high{label}"] = res[label]["high"]
+        out[f"low{label}"] = res[label]["low"]
+    if extra_windows:
+        out["windows"] = {label: res[label] for label, _, _ in extra_windows}
+    return out
 
 
 # -------------------------
@@ -355,9 +601,87 @@ def root():
     return {"ok": True, "docs": "/docs"}
 
 
+@app.get("/api/stats")
+def stats():
+    return {
+        "singleflight": upstream_flight.stats(),
+        "quote_stream": quote_hub.stats(),
+        "sessions": upstream_async.stats(),
+        "routes": route_board.snapshot(),
+        "scheduler": upstream_scheduler.stats(),
+        "bar_store": bar_store.stats(),
+        "search_index": search_index.stats(),
+        "db_pool": db_pool.stats(),
+        "response_cache": response_cache.stats(),
+        "minute_feed": minute_feed.stats(),
+        "base_bars": base_bars.stats(),
+        "kline_arrays": kline_arrays.stats(),
+    }
+
+
+def _cache_metrics():
+    """各级缓存的命中/未命中计数（抓取时从现有 stats() 读取）。"""
+    rc, bb, bs, mf = response_cache.stats(), base_bars.stats(), bar_store.stats(), minute_feed.stats()
+    sf = upstream_flight.stats()
+    return {
+        ("response", "hit"): rc["hits"],
+        ("response", "stale"): rc["stale_hits"],
+        ("response", "miss"): rc["misses"],
+        ("base_bars", "hit"): bb["hits"],
+        ("base_bars", "miss"): bb["misses"],
+        ("bar_store", "hit"): bs["fresh"],
+        ("bar_store", "partial"): bs["tail"],
+        ("bar_store", "miss"): bs["full"],
+        ("minute_feed", "hit"): mf["memory"],
+        ("minute_feed", "miss"): mf["fetches"],
+        ("singleflight", "hit"): sf["coalesced"],
+        ("singleflight", "miss"): sf["executions"],
+    }
+
+
+def _cache_hit_ratios():
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), n in _cache_metrics().items():
+        t = totals.setdefault(cache, [0.0, 0.0])
+        t[1] += n
+        if result != "miss":
+            t[0] += n
+    return {(cache,): hit / n if n else None for cache, (hit, n) in totals.items()}
+
+
+METRICS.callback(
+    "stockapi_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"), _cache_metrics, "counter"
+)
+METRICS.callback(
+    "stockapi_cache_hit_ratio", "Share of lookups served without a full recompute/fetch.", ("cache",), _cache_hit_ratios
+)
+
+
+def _limiter_events():
+    return {
+        (name, ev): st[ev]
+        for name, st in upstream_scheduler.stats().items()
+        for ev in ("immediate", "granted", "rejected", "timed_out", "paused")
+    }
+
+
+METRICS.callback(
+    "stockapi_upstream_limiter_events_total",
+    "Upstream scheduler admissions per limiter (immediate / granted after queueing / rejected / timed_out / paused).",
+    ("limiter", "event"),
+    _limiter_events,
+    "counter",
+)
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/api/search")
 def search(q: str = Query(..., min_length=1)):
-    rows = db_search_hk(q, limit=10)
+    rows = search_index.search(q, limit=10) if search_index.ready else db_search_hk(q, limit=10)
     items = []
     for r in rows:
         items.append(
@@ -374,83 +698,395 @@ def search(q: str = Query(..., min_length=1)):
     return {"items": items}
 
 
+# 响应缓存（LRU，按字节数限额）：新鲜期按周期区分，过期后在 stale 窗口内先返回旧响应、后台刷新
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(float(os.getenv("RESPONSE_CACHE_MAX_MB", "64")) * (1 << 20)),
+    stale_factor=float(os.getenv("RESPONSE_CACHE_STALE_FACTOR", "10")),
+    stale_cap_s=float(os.getenv("RESPONSE_CACHE_STALE_CAP_S", "10")),  # 过期后最多再返回 10s 旧响应
+    refresh_context=lambda: upstream_priority(BACKGROUND),  # 后台刷新不和用户请求抢上游配额
+)
+KLINE_CACHE_TTL_S = {
+    "1m": 5,
+    "2m": 10,
+    "5m": 20,
+    "15m": 30,
+    "30m": 60,
+    "60m": 60,
+    "90m": 60,
+    "1d": 300,
+    "1wk": 3600,
+    "1mo": 3600,
+}
+SUMMARY_CACHE_TTL_S = float(os.getenv("SUMMARY_CACHE_TTL_S", "5"))
+
+
 TF = Literal["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1d", "1wk", "1mo"]
 
 
 @app.get("/api/kline")
-def kline(symbol: str, tf: TF = "1d", range_: str = Query(None, alias="range"), start: int = None, end: int = None):
+async def kline(
+    request: Request,
+    symbol: str,
+    tf: TF = "1d",
+    range_: str = Query(None, alias="range"),
+    start: int = None,
+    end: int = None,
+    fmt: str = Query(None, alias="format"),
+    since: int = None,
+    max_points: int = Query(None, ge=MIN_POINTS),
+    downsample_: str = Query(METHOD_MINMAX, alias="downsample"),
+):
     symbol = normalize_yahoo_symbol(symbol)
     try:
-        # Tencent: intraday minute bars (real-time) for the most common case
-        if tf == "1m" and (range_ or "").lower() == "1d" and not (start or end):
-            try:
-                bars = fetch_intraday_minute_bars(symbol)
-                return {"symbol": symbol, "tf": tf, "range": range_, "bars": bars}
-            except Exception:
-                # fallback to Yahoo below
-                pass
-
-        if range_:
-            cj = yahoo_chart(symbol, interval=tf, range_=range_)
-        elif start and end:
-            cj = yahoo_chart(symbol, interval=tf, start=start, end=end)
-        else:
-            cj = yahoo_chart(symbol, interval=tf, range_="3mo")
-        df = chart_to_ohlcv(cj).dropna(subset=["Open", "High", "Low", "Close"])
-
-        bars = []
-        for t, row in df.iterrows():
-            bars.append(
-                [
-                    int(t.timestamp() * 1000),
-                    float(row["Open"]),
-                    float(row["Close"]),
-                    float(row["Low"]),
-                    float(row["High"]),
-                    int(row["Volume"]) if pd.notna(row["Volume"]) else 0,
-                ]
-            )
-        return {"symbol": symbol, "tf": tf, "range": range_, "bars": bars}
+        # rows（默认，兼容旧前端）/ columns / binary / arrow：?format= 优先，其次 Accept
+        fmt = negotiate_format(fmt, request.headers.get("accept"))
+    except ValueError as e:
+        return {"symbol": symbol, "tf": tf, "range": range_, "bars": [], "error": str(e)}
+
+    if downsample_ not in DOWNSAMPLE_METHODS:
+        return {"symbol": symbol, "tf": tf, "range": range_, "bars": [], "error": f"unsupported downsample: {downsample_}"}
+    # max_points：长区间按桶降采样（minmax 适合蜡烛图，lttb 适合收盘价折线）
+    ds = (max_points, downsample_) if max_points else None
+
+    if since:
+        # since 轮询：每个客户端的 since 都不一样，不进响应缓存；整段K线缓存一份（kline_arrays），按 since 切片
+        return await compute_kline(symbol, tf, range_, start, end, fmt, since, ds)
+    key = ("kline", symbol, tf, range_, start, end, fmt, ds)
+    return await response_cache.respond(
+        request, key, KLINE_CACHE_TTL_S.get(tf, 60), lambda: compute_kline(symbol, tf, range_, start, end, fmt, None, ds)
+    )
+
+
+# Yahoo 1m 只提供最近 7 天；更长的分钟级 range 直接向 Yahoo 请求对应周期
+YAHOO_1M_MAX_S = 7 * 86400
+# 1m 基础序列的短期缓存：同一 range 下切换 1m/5m/15m... 只做本地聚合
+base_bars = BaseBarCache(ttl_s=float(os.getenv("BASE_BARS_TTL_S", "30")))
+# /api/kline 的整段K线（按周期的 KLINE_CACHE_TTL_S），完整响应和 since 增量请求共用
+kline_arrays = BaseBarCache(max_entries=int(os.getenv("KLINE_ARRAYS_MAX_ENTRIES", "1024")))
+
+
+async def _yahoo_1m_bars(symbol: str, range_: str):
+    return chart_to_bars(await yahoo_chart_async(symbol, interval="1m", range_=range_))
+
+
+async def intraday_base_bars(symbol: str, range_: str):
+    """range 内的 1m K线；当日优先腾讯 ring buffer。None 表示超出 1m 可得范围。"""
+    r = range_.lower()
+    if r == "1d":
+        try:
+            return await tencent_minute_bars_async(symbol)
+        except Exception:
+            TENCENT_FALLBACKS.inc("minute")  # fallback to Yahoo 1m below
+    try:
+        span = range_to_seconds(r)
+    except ValueError:
+        return None
+    if span is None or span > YAHOO_1M_MAX_S:
+        return None
+    return await base_bars.get((symbol, r), lambda: _yahoo_1m_bars(symbol, r))
+
+
+async def kline_bars(symbol: str, tf: str, range_: str, start: int = None, end: int = None):
+    """/api/kline 与 /api/compare 共用的数据路径，返回 BAR_DTYPE 数组。"""
+    # 分钟级：1m 及其派生周期（2m–90m）都从 1m 基础序列本地聚合（午休不跨桶）
+    if base_tf(tf) == "1m" and not (start or end):
+        base = await intraday_base_bars(symbol, range_ or "1d")
+        if base is not None:
+            return resample(base, tf)
+
+    # 日K 走本地 bar store（命中时只补拉尾部）；周K/月K 由日K聚合
+    if base_tf(tf) in STORED_TF and not (start or end):
+        try:
+            return resample(await bar_store.aget(symbol, "1d", range_ or "3mo", yahoo_chart_async), tf)
+        except ValueError:
+            # range 格式不认识：直接走 Yahoo
+            pass
+
+    if range_:
+        cj = await yahoo_chart_async(symbol, interval=tf, range_=range_)
+    elif start and end:
+        cj = await yahoo_chart_async(symbol, interval=tf, start=start, end=end)
+    else:
+        cj = await yahoo_chart_async(symbol, interval=tf, range_="3mo")
+    return chart_to_bars(cj)
+
+
+async def compute_kline(
+    symbol: str, tf: str, range_: str, start: int, end: int, fmt: str, since: int = None, ds: tuple = None
+):
+    try:
+        arr = await kline_arrays.get(
+            (symbol, tf, range_, start, end),
+            lambda: kline_bars(symbol, tf, range_, start, end),
+            ttl_s=KLINE_CACHE_TTL_S.get(tf, 60),
+        )
+        if since:
+            # since=<ms>：只返回该时间（含）之后的K线，即客户端最后一根（可能被修正）及新增
+            arr = arr[arr["ts"] >= since // 1000]
+        return kline_response(symbol, tf, range_, fmt, arr=arr, since=since, ds=ds)
     except Exception as e:
         # 如果Yahoo API失败，返回空数据而不是500错误
         return {"symbol": symbol, "tf": tf, "range": range_, "bars": [], "error": str(e)}
 
 
+def kline_response(
+    symbol: str, tf: str, range_: str, fmt: str, arr=None, rows=None, since: int = None, ds: tuple = None
+):
+    """按协商的格式输出K线；arr 为 BAR_DTYPE 数组，rows 为已是 [ms,o,c,l,h,v] 的列表；ds = (max_points, method)。"""
+    meta = {"symbol": symbol, "tf": tf, "range": range_}
+    if since:
+        meta["since"] = since
+    if ds is not None:
+        if arr is None:
+            arr, rows = rows_to_bars(rows), None
+        meta["downsample"] = {"method": ds[1], "max_points": ds[0], "source_points": len(arr)}
+        arr = downsample(arr, *ds)
+    if fmt == FORMAT_ROWS:
+        # 直接 json.dumps，跳过 FastAPI 对每个元素的 jsonable_encoder
+        body = {**meta, "bars": rows if rows is not None else bars_to_api(arr)}
+        return Response(json.dumps(body, separators=(",", ":")), media_type="application/json")
+
+    if arr is None:
+        arr = rows_to_bars(rows)
+    if fmt == FORMAT_COLUMNS:
+        return Response(encode_columns(arr, meta), media_type="application/json")
+    headers = {"X-Kline-Symbol": symbol, "X-Kline-Tf": tf, "X-Kline-Range": range_ or ""}
+    if since:
+        headers["X-Kline-Since"] = str(since)
+    if ds is not None:
+        headers["X-Kline-Source-Points"] = str(meta["downsample"]["source_points"])
+    if fmt == FORMAT_ARROW:
+        return Response(encode_arrow(arr, meta), media_type=MEDIA_ARROW, headers=headers)
+    return Response(encode_binary(arr), media_type=MEDIA_BINARY, headers=headers)
+
+
+# /api/compare：同时拉取的股票数上限
+COMPARE_CONCURRENCY = int(os.getenv("COMPARE_CONCURRENCY", "8"))
+
+
+@app.get("/api/compare")
+async def compare(
+    request: Request,
+    symbols: str = Query(..., min_length=1),
+    tf: TF = "1d",
+    range_: str = Query(None, alias="range"),
+    start: int = None,
+    end: int = None,
+    max_points: int = Query(None, ge=MIN_POINTS),
+):
+    """
+    多股对比：并发拉取各自K线，对齐到共同时间轴（停牌/缺失 forward-fill），
+    服务端算好相对首根K线的累计收益（pct / log），一次返回列式 JSON。
+    分钟级以首根开盘为基准（当日涨跌幅），其余以首根收盘为基准。
+    """
+    syms = parse_symbols(symbols, limit=20)
+    key = ("compare", tuple(syms), tf, range_, start, end, max_points)
+
+    async def compute():
+        sem = asyncio.Semaphore(max(1, COMPARE_CONCURRENCY))
+
+        async def one(sym: str):
+            async with sem:
+                return await kline_bars(sym, tf, range_, start, end)
+
+        results = await asyncio.gather(*(one(sym) for sym in syms), return_exceptions=True)
+        ok = [(sym, arr) for sym, arr in zip(syms, results) if not isinstance(arr, BaseException)]
+        errors = {sym: str(e) for sym, e in zip(syms, results) if isinstance(e, BaseException)}
+        if not ok:
+            return {"symbols": syms, "tf": tf, "range": range_, "t": [], "errors": errors, "error": "no data"}
+        body = compare_payload(
+            [sym for sym, _ in ok],
+            [arr for _, arr in ok],
+            base_on_open=base_tf(tf) == "1m",
+            max_points=max_points,
+        )
+        body = {"tf": tf, "range": range_, **body, "errors": errors}
+        if errors:
+            return body  # 部分失败：照常返回，但不进响应缓存
+        return Response(json.dumps(body, separators=(",", ":")), media_type="application/json")
+
+    return await response_cache.respond(request, key, KLINE_CACHE_TTL_S.get(tf, 60), compute)
+
+
+def _quote_info(q) -> dict:
+    info = q.to_api_dict()
+    # Frontend uses both naming variants in different places.
+    info["previousClose"] = info.get("prevClose")
+    return info
+
+
+def summary_error(symbol: str, e: Exception) -> dict:
+    # 如果Yahoo API失败，返回默认数据而不是500错误
+    return {
+        "symbol": symbol,
+        "price": None,
+        "prevClose": None,
+        "previousClose": None,
+        "change": None,
+        "pctChange": None,
+        "currency": None,
+        "exchangeName": None,
+        "regularMarketTime": None,
+        "calcSource": "error",
+        "high6m": None,
+        "low6m": None,
+        "high1y": None,
+        "low1y": None,
+        "high2y": None,
+        "low2y": None,
+        "error": str(e)
+    }
+
+
+async def build_summary(symbol: str, extra_windows: List[tuple], quote=None) -> dict:
+    """单只股票的 summary；``quote`` 为批量腾讯报价里已拿到的结果（没有则单独拉）。"""
+    # Prefer Tencent for real-time latest price; use Yahoo for the rest.
+    info = None
+    try:
+        info = _quote_info(quote if quote is not None else await tencent_quote_async(symbol))
+    except Exception:
+        TENCENT_FALLBACKS.inc("quote")
+        info = price_change_from_chart(await yahoo_chart_async(symbol, interval="1d", range_="5d"))
+        info["previousClose"] = info.get("prevClose")
+
+    await bar_store.aget(symbol, "1d", store_range_for(extra_windows), yahoo_chart_async)
+    # 索引基于库里完整的日线序列（头部稳定，才能增量更新）
+    highs = highs_from_bars(symbol, bar_store.read(symbol, "1d")[0], extra_windows)
+    return {"symbol": symbol, **info, **highs}
+
+
 @app.get("/api/summary")
-def summary(symbol: str):
+async def summary(request: Request, symbol: str, windows: str = None):
     symbol = normalize_yahoo_symbol(symbol)
-    try:
-        # Prefer Tencent for real-time latest price; use Yahoo for the rest.
-        info = None
+
+    async def compute():
         try:
-            q = fetch_quote(symbol)
-            info = q.to_api_dict()
-            # Frontend uses both naming variants in different places.
-            info["previousClose"] = info.get("prevClose")
-        except Exception:
-            info = latest_price_change_robust(symbol)
-            info["previousClose"] = info.get("prevClose")
+            body = await build_summary(symbol, parse_windows(windows))
+        except Exception as e:
+            return summary_error(symbol, e)
+        return Response(json.dumps(body, separators=(",", ":")), media_type="application/json")
+
+    return await response_cache.respond(request, ("summary", symbol, windows or ""), SUMMARY_CACHE_TTL_S, compute)
+
 
-        highs = high_6m_1y_2y(symbol)
-        return {"symbol": symbol, **info, **highs}
+# /api/summaries：同时在跑的单股 summary（Yahoo 补拉日线）上限
+SUMMARIES_CONCURRENCY = int(os.getenv("SUMMARIES_CONCURRENCY", "8"))
+
+
+@app.get("/api/summaries")
+async def summaries(symbols: str = Query(..., min_length=1), windows: str = None):
+    """
+    批量 summary：实时价一次腾讯批量请求拿齐，高低点按 SUMMARIES_CONCURRENCY 并发拉取；
+    每只股票单独成功/失败（失败项同 /api/summary 的 error 结构），整体耗时约等于最慢的一只。
+    """
+    syms = parse_symbols(symbols)
+    try:
+        extra_windows = parse_windows(windows)
     except Exception as e:
-        # 如果Yahoo API失败，返回默认数据而不是500错误
-        return {
-            "symbol": symbol,
-            "price": None,
-            "prevClose": None,
-            "previousClose": None,
-            "change": None,
-            "pctChange": None,
-            "currency": None,
-            "exchangeName": None,
-            "regularMarketTime": None,
-            "calcSource": "error",
-            "high6m": None,
-            "low6m": None,
-            "high1y": None,
-            "low1y": None,
-            "high2y": None,
-            "low2y": None,
-            "error": str(e)
-        }
+        return {"items": {}, "error": str(e)}
+
+    try:
+        qmap = await tencent_quotes_async(syms)
+    except Exception:
+        qmap = {}  # 逐只回退（腾讯单查 -> Yahoo 5d）
+
+    sem = asyncio.Semaphore(max(1, SUMMARIES_CONCURRENCY))
+
+    async def one(sym: str) -> dict:
+        async with sem:
+            try:
+                return await build_summary(sym, extra_windows, qmap.get(sym))
+            except Exception as e:
+                return summary_error(sym, e)
+
+    results = await asyncio.gather(*(one(sym) for sym in syms))
+    return {"items": dict(zip(syms, results))}
+
+
+@app.get("/api/quotes")
+async def quotes(symbols: str = Query(..., min_length=1)):
+    """批量实时报价：一次（或少数几次）Tencent qt 请求覆盖整个监控列表。"""
+    syms = parse_symbols(symbols)
+    try:
+        qmap = await tencent_quotes_async(syms)
+    except Exception as e:
+        return {"items": {}, "error": str(e)}
+
+    items = {}
+    for sym in syms:
+        q = qmap.get(sym)
+        if q is None:
+            items[sym] = {"symbol": sym, "price": None, "error": "no quote"}
+            continue
+        items[sym] = {"symbol": sym, **_quote_info(q)}
+    return {"items": items}
+
+
+# -------------------------
+# Quote stream（服务端统一轮询 + 推送变化字段）
+# -------------------------
+QUOTE_STREAM_INTERVAL_S = float(os.getenv("QUOTE_STREAM_INTERVAL_S", "5"))
+
+
+async def _poll_quotes(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    with upstream_priority(BACKGROUND):
+        qmap = await tencent_quotes_async(symbols)
+    for sym, q in qmap.items():
+        out[sym] = _quote_info(q)
+    return out
+
+
+quote_hub = QuoteHub(_poll_quotes, interval_s=QUOTE_STREAM_INTERVAL_S)
+
+
+@app.get("/api/stream/quotes")
+async def stream_quotes(request: Request, symbols: str = Query(..., min_length=1)):
+    """SSE：订阅一组股票，首条为当前快照，之后只推送变化的字段。"""
+    sub = quote_hub.subscribe(parse_symbols(symbols))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    msg = await asyncio.wait_for(sub.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(msg, ensure_ascii=False)}\n\n"
+        finally:
+            quote_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/api/stream/quotes/ws")
+async def stream_quotes_ws(ws: WebSocket):
+    """WebSocket：?symbols= 初始订阅；之后可发送 {"subscribe": [...], "unsubscribe": [...]} 调整。"""
+    await ws.accept()
+    sub = quote_hub.subscribe(parse_symbols(ws.query_params.get("symbols", "")))
+
+    async def pump():
+        while True:
+            await ws.send_json(await sub.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            msg = await ws.receive_json()
+            quote_hub.update(
+                sub,
+                add=parse_symbols(",".join(msg.get("subscribe") or [])),
+                remove=parse_symbols(",".join(msg.get("unsubscribe") or [])),
+            )
+    except (WebSocketDisconnect, ValueError, AttributeError):
+        pass
+    finally:
+        sender.cancel()
+        quote_hub.unsubscribe(sub)
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16)
+
+Labels = Tuple[str, ...]
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_esc(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labelvalues: Sequence[Any]) -> Labels:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labelvalues: Any, n: float = 1.0) -> None:
+        k = self._key(labelvalues)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + n
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        k = self._key(labelvalues)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            v = self._values.get(k)
+            if v is None:
+                v = self._values[k] = ([0] * (len(self.buckets) + 1), [0.0])
+            v[0][i] += 1
+            v[1][0] += value
+
+    @contextmanager
+    def time(self, *labelvalues: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labelvalues)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._values.items())
+        out = []
+        for k, (counts, total) in items:
+            cum = 0
+            for le, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le_label = 'le="%s"' % _fmt(float(le))
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le_label)} {cum}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {cum}")
+        return out
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter read at scrape time from ``fn() -> {labelvalues: value}`` (e.g. existing ``stats()`` dicts)."""
+
+    def __init__(
+        self, name: str, help_: str, labelnames: Sequence[str], fn: Callable[[], Dict[Labels, Optional[float]]], kind: str
+    ) -> None:
+        super().__init__(name, help_, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        return [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(float(v))}"
+            for k, v in sorted(values.items())
+            if v is not None
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, m: _Metric) -> Any:
+        if m.name in self._metrics:
+            raise ValueError(f"duplicate metric {m.name}")
+        self._metrics[m.name] = m
+        return m
+
+    def counter(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_, labelnames))
+
+    def histogram(
+        self, name: str, help_: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help_, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help_: str,
+        labelnames: Sequence[str],
+        fn: Callable[[], Dict[Labels, Optional[float]]],
+        kind: str = "gauge",
+    ) -> CallbackMetric:
+        return self._add(CallbackMetric(name, help_, labelnames, fn, kind))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for m in self._metrics.values():
+            samples = m.samples()
+            if samples:
+                lines += m.header() + samples
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# -------------------------
+# shared instruments (server/* modules record into these)
+# -------------------------
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "stockapi_http_request_duration_seconds", "API request latency by route template, method and status.",
+    ("route", "method", "status"),
+)
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "stockapi_upstream_request_duration_seconds",
+    "Latency of single upstream HTTP requests by provider, proxy route and outcome.",
+    ("provider", "route", "outcome"),
+)
+FAILOVER_ATTEMPTS = REGISTRY.histogram(
+    "stockapi_upstream_failover_attempts",
+    "Route attempts launched per Yahoo failover call (including hedges).",
+    ("outcome",),
+    buckets=ATTEMPT_BUCKETS,
+)
+TENCENT_FALLBACKS = REGISTRY.counter(
+    "stockapi_tencent_fallback_total", "Tencent lookups that failed and fell back to Yahoo.", ("kind",)
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "stockapi_db_query_duration_seconds", "DB query time (including pool checkout) by query.", ("query",)
+)
+
+
+@contextmanager
+def time_upstream(provider: str, route: str) -> Iterator[None]:
+    """Record one upstream request into :data:`UPSTREAM_REQUEST_SECONDS`; outcome is ok / error / cancelled (hedge loser)."""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - t0, provider, route, outcome)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding :data:`HTTP_REQUEST_SECONDS`. Requests are
+    labelled with the matched route template (``/api/kline``, not the raw URL),
+    so the label cardinality stays bounded. Streams are not request latencies
+    and are left out: WebSockets never reach the timer and
+    ``text/event-stream`` responses (SSE) are not observed.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for k, v in message.get("headers") or ():
+                    if k.lower() == b"content-type" and v.lower().startswith(b"text/event-stream"):
+                        streaming = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not streaming:
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - t0,
+                    getattr(scope.get("route"), "path", "<unmatched>"),
+                    scope.get("method", ""),
+                    status,
+                )
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .bar_store import BAR_DTYPE
+from .tencent_finance import hk_day_epoch, parse_minute_rows
+
+
+def _minute_rows(obj: Dict[str, Any], code: str) -> Tuple[str, List[Any]]:
+    data0 = ((obj.get("data") or {}).get(code) or {}).get("data") or {}
+    return str(data0.get("date") or ""), data0.get("data") or []
+
+
+def _known(cum: float) -> Optional[float]:
+    return None if np.isnan(cum) else float(cum)
+
+
+class MinuteRing:
+    """
+    Fixed-capacity ring of one symbol's minute bars (BAR_DTYPE, ts in epoch seconds).
+
+    :meth:`apply` folds a full Tencent ``minute/query`` payload in incrementally:
+    only payload rows from the last stored minute onwards are parsed (that
+    minute may still be forming); everything before is kept as is. A new
+    trading date resets the ring.
+    """
+
+    def __init__(self, capacity: int = 512) -> None:
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=BAR_DTYPE)
+        self._n = 0  # total bars appended today (slot = i % capacity)
+        self.date = ""
+        self._day0 = 0
+        self._rows_seen = 0  # payload rows consumed (incl. skipped ones)
+        self._row_of_last = -1  # payload row index of the last stored bar
+        self._cum_before_last: Optional[float] = None  # cumulative volume before the last stored bar
+        self._cum_last: Optional[float] = None
+        self.updated_at = 0.0
+        self.rows_parsed = 0
+
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+
+    def _reset(self, date_str: str) -> None:
+        self._n = 0
+        self.date = date_str
+        self._day0 = hk_day_epoch(date_str)
+        self._rows_seen = 0
+        self._row_of_last = -1
+        self._cum_before_last = self._cum_last = None
+
+    def apply(self, obj: Dict[str, Any], code: str) -> int:
+        """Merge a payload; returns how many bars were appended or rewritten."""
+        date_str, rows = _minute_rows(obj, code)
+        if len(date_str) != 8 or not rows:
+            return 0
+        if date_str != self.date or len(rows) < self._rows_seen:
+            self._reset(date_str)
+
+        # re-parse the last stored minute (amendment) plus everything new
+        first = self._row_of_last if self._row_of_last >= 0 else self._rows_seen
+        if self._row_of_last >= 0:
+            self._n -= 1
+            self._cum_last = self._cum_before_last
+
+        new, cum, idx = parse_minute_rows(rows[first:], self._day0, self._cum_last)
+        changed = len(new)
+        if changed:
+            self._buf[np.arange(self._n, self._n + changed) % self.capacity] = new
+            self._n += changed
+            self._row_of_last = first + int(idx[-1])
+            self._cum_before_last = _known(cum[-2]) if changed > 1 else self._cum_last
+            self._cum_last = _known(cum[-1])
+        else:
+            self._row_of_last = -1  # the re-sent last minute turned malformed: it is gone
+        self._rows_seen = len(rows)
+        self.rows_parsed += len(rows) - first
+        self.updated_at = time.time()
+        return changed
+
+    def bars(self, since_s: Optional[int] = None) -> np.ndarray:
+        """Bars in time order; with ``since_s`` only those at or after it."""
+        n = len(self)
+        start = self._n - n
+        idx = (np.arange(start, self._n) % self.capacity) if n else np.empty(0, dtype=np.int64)
+        out = self._buf[idx]
+        if since_s is not None:
+            out = out[int(np.searchsorted(out["ts"], since_s, side="left")):]
+        return out
+
+
+class MinuteFeed:
+    """
+    Per-symbol :class:`MinuteRing` objects (LRU-bounded).
+
+    A ring younger than ``refresh_s`` is answered from memory; otherwise the
+    caller-supplied async ``fetch_payload(symbol) -> (code, payload)`` is called
+    and its result folded in.
+    """
+
+    def __init__(self, refresh_s: float = 2.0, capacity: int = 512, max_symbols: int = 500) -> None:
+        self.refresh_s = refresh_s
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._rings: "OrderedDict[str, MinuteRing]" = OrderedDict()
+        self.counts = {"memory": 0, "fetches": 0, "bars_changed": 0}
+
+    def _ring(self, symbol: str) -> MinuteRing:
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                ring = self._rings[symbol] = MinuteRing(self.capacity)
+            self._rings.move_to_end(symbol)
+            while len(self._rings) > self.max_symbols:
+                self._rings.popitem(last=False)
+            return ring
+
+    async def bars(self, symbol: str, fetch_payload, since_ms: Optional[int] = None) -> np.ndarray:
+        ring = self._ring(symbol)
+        if time.time() - ring.updated_at >= self.refresh_s or not len(ring):
+            code, obj = await fetch_payload(symbol)
+            with self._lock:
+                self.counts["fetches"] += 1
+                self.counts["bars_changed"] += ring.apply(obj, code)
+        else:
+            with self._lock:
+                self.counts["memory"] += 1
+        if not len(ring):
+            raise ValueError(f"no intraday minute data for {symbol}")
+        return ring.bars(None if since_ms is None else int(since_ms) // 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rings = list(self._rings.values())
+            c = dict(self.counts)
+        return {
+            "symbols": len(rings),
+            "bars": sum(len(r) for r in rings),
+            "rows_parsed": sum(r.rows_parsed for r in rings),
+            **c,
+        }
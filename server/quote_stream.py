@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One connected client (SSE stream or WebSocket) and the symbols it watches.
+
+    Messages are field-level diffs, so none may be dropped. Pending messages are
+    kept merged per symbol instead: a slow consumer gets one up-to-date message
+    per changed symbol, and the backlog never exceeds the number of symbols
+    watched.
+    """
+
+    def __init__(self, sid: int) -> None:
+        self.id = sid
+        self.symbols: Set[str] = set()
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def push(self, msg: Dict[str, Any]) -> None:
+        cur = self._pending.get(msg["symbol"])
+        if cur is None:
+            self._pending[msg["symbol"]] = dict(msg)
+        else:
+            cur.update(msg)  # later fields win; the symbol keeps its place in line
+        self._ready.set()
+
+    def discard(self, symbols: Iterable[str]) -> None:
+        for sym in symbols:
+            self._pending.pop(sym, None)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def get(self) -> Dict[str, Any]:
+        """Next message (oldest changed symbol first, all of its changes merged)."""
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pending.popitem(last=False)[1]
+
+
+class QuoteHub:
+    """Shared server-side quote poller.
+
+    All subscriptions share one background task that polls upstream once per
+    ``interval_s`` for the union of subscribed symbols and pushes only the fields
+    that changed since the previous poll. Upstream load scales with distinct
+    symbols, not with open tabs x symbols.
+
+    ``fetch`` is a coroutine function ``symbols -> {symbol: api_dict}`` (the
+    async Tencent client), awaited on the poller task.
+    """
+
+    def __init__(
+        self, fetch: Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]], interval_s: float = 5.0
+    ) -> None:
+        self.fetch = fetch
+        self.interval_s = interval_s
+        self._subs: Dict[int, Subscription] = {}
+        self._ids = itertools.count(1)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.polls = 0
+        self.errors = 0
+
+    # -------------------------
+    # subscriptions
+    # -------------------------
+    def subscribe(self, symbols: Iterable[str] = ()) -> Subscription:
+        sub = Subscription(next(self._ids))
+        self._subs[sub.id] = sub
+        self.update(sub, add=symbols)
+        self._ensure_task()
+        return sub
+
+    def update(self, sub: Subscription, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        new = set(add) - sub.symbols
+        sub.symbols |= new
+        gone = set(remove)
+        sub.symbols -= gone
+        sub.discard(gone)
+        # late joiners get the current snapshot right away
+        for sym in new:
+            snap = self._last.get(sym)
+            if snap is not None:
+                sub.push({"symbol": sym, **snap})
+        if new and self._wakeup is not None:
+            self._wakeup.set()
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subs.pop(sub.id, None)
+        wanted = self.symbols()
+        for sym in list(self._last):
+            if sym not in wanted:
+                self._last.pop(sym, None)
+
+    def symbols(self) -> Set[str]:
+        out: Set[str] = set()
+        for sub in self._subs.values():
+            out |= sub.symbols
+        return out
+
+    # -------------------------
+    # poller
+    # -------------------------
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._subs:
+            symbols = sorted(self.symbols())
+            if symbols:
+                try:
+                    snapshot = await self.fetch(symbols)
+                    self.polls += 1
+                    self._publish(snapshot)
+                except Exception as e:  # keep polling; next tick may succeed
+                    self.errors += 1
+                    logger.warning("quote poll failed: %s", e)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_s)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+    def _publish(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        for sym, cur in snapshot.items():
+            prev = self._last.get(sym) or {}
+            changed = {k: v for k, v in cur.items() if prev.get(k) != v or k not in prev}
+            self._last[sym] = cur
+            if not changed:
+                continue
+            msg = {"symbol": sym, **changed}
+            for sub in self._subs.values():
+                if sym in sub.symbols:
+                    sub.push(msg)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subs),
+            "symbols": len(self.symbols()),
+            "polls": self.polls,
+            "errors": self.errors,
+            "running": self._task is not None and not self._task.done(),
+        }
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .bar_store import BAR_DTYPE
+from .singleflight import SingleFlight
+
+_HK_OFFSET_S = 8 * 3600
+_DAY_S = 86400
+
+# HK continuous sessions, minutes after local midnight
+_AM_OPEN, _PM_OPEN, _PM_CLOSE = 9 * 60 + 30, 13 * 60, 16 * 60
+
+# tf -> bucket size in minutes (derived from 1m)
+INTRADAY_MINUTES = {"2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90}
+# tf -> derived from 1d
+CALENDAR_TF = ("1wk", "1mo")
+
+
+def aggregate_bars(arr: np.ndarray, bucket: np.ndarray, ts: np.ndarray) -> np.ndarray:
+    """OHLCV per run of equal ``bucket`` values (``arr`` sorted by time); bar time = ``ts`` of the group."""
+    if len(arr) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.concatenate((starts[1:], [len(arr)])) - 1
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    out["ts"] = ts[starts]
+    out["open"] = arr["open"][starts]
+    out["close"] = arr["close"][ends]
+    # fmax / fmin skip NaN (a bucket is NaN only when all of it is)
+    out["high"] = np.fmax.reduceat(arr["high"], starts)
+    out["low"] = np.fmin.reduceat(arr["low"], starts)
+    out["volume"] = np.add.reduceat(np.nan_to_num(arr["volume"], nan=0.0), starts)
+    return out
+
+
+def resample_intraday(arr: np.ndarray, minutes: int) -> np.ndarray:
+    """
+    1m bars -> N-minute bars aligned to the HK session opens.
+
+    Buckets start at 09:30 and again at 13:00, so no bar spans the 12:00-13:00
+    lunch break; minutes from 16:00 on (closing auction) fold into the last
+    afternoon bucket. Each bar is stamped with its bucket start.
+    """
+    if minutes <= 1 or len(arr) == 0:
+        return np.asarray(arr)
+    local = arr["ts"] + _HK_OFFSET_S
+    day = local // _DAY_S
+    mod = np.minimum((local % _DAY_S) // 60, _PM_CLOSE - 1)
+    open_ = np.where(mod >= _PM_OPEN, _PM_OPEN, _AM_OPEN)
+    slot = open_ + np.maximum(mod - open_, 0) // minutes * minutes
+    bucket = day * 1440 + slot
+    return aggregate_bars(arr, bucket, bucket * 60 - _HK_OFFSET_S)
+
+
+def resample_calendar(arr: np.ndarray, tf: str) -> np.ndarray:
+    """1d bars -> weekly (Monday-based) or monthly bars by HK calendar date; stamped with the group's first daily bar."""
+    if len(arr) == 0:
+        return np.asarray(arr)
+    day = (arr["ts"] + _HK_OFFSET_S) // _DAY_S
+    if tf == "1wk":
+        bucket = day - (day + 3) % 7  # 1970-01-01 was a Thursday
+    elif tf == "1mo":
+        bucket = day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    else:
+        raise ValueError(f"unsupported calendar timeframe: {tf}")
+    return aggregate_bars(arr, bucket, arr["ts"])
+
+
+def resample(arr: np.ndarray, tf: str) -> np.ndarray:
+    if tf in INTRADAY_MINUTES:
+        return resample_intraday(arr, INTRADAY_MINUTES[tf])
+    if tf in CALENDAR_TF:
+        return resample_calendar(arr, tf)
+    return np.asarray(arr)
+
+
+def base_tf(tf: str) -> str:
+    """The series ``tf`` is derived from."""
+    if tf in INTRADAY_MINUTES:
+        return "1m"
+    if tf in CALENDAR_TF:
+        return "1d"
+    return tf
+
+
+class BaseBarCache:
+    """
+    Short-lived LRU of base (1m) bar arrays keyed by (symbol, range), so switching
+    between derived timeframes re-aggregates in memory instead of going upstream.
+    Concurrent misses for one key share a single fetch.
+    """
+
+    def __init__(self, ttl_s: float = 30.0, max_entries: int = 256) -> None:
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._flight = SingleFlight()
+        self.counts = {"hits": 0, "misses": 0}
+
+    async def get(
+        self, key: Hashable, fetch: Callable[[], Awaitable[np.ndarray]], ttl_s: Optional[float] = None
+    ) -> np.ndarray:
+        """``ttl_s`` overrides the cache-wide TTL for this lookup."""
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and time.time() - hit[0] < ttl:
+                self._data.move_to_end(key)
+                self.counts["hits"] += 1
+                return hit[1]
+            self.counts["misses"] += 1
+
+        async def load() -> np.ndarray:
+            arr = await fetch()
+            with self._lock:
+                self._data[key] = (time.time(), arr)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+            return arr
+
+        return await self._flight.do_async(("base_bars", key), load)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._data), **self.counts}
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, ContextManager, Dict, Hashable, Optional, Set, Union
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .singleflight import SingleFlight
+
+# per-entry bookkeeping (key tuple, dict slot, timestamps) on top of the body
+_ENTRY_OVERHEAD = 400
+
+Computed = Union[Response, Any]
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    media_type: str
+    headers: Dict[str, str]
+    etag: str
+    created: float
+    ttl_s: float
+    stale_s: float
+    nbytes: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.nbytes = len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items()) + _ENTRY_OVERHEAD
+
+    def age(self, now: float) -> float:
+        return now - self.created
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of encoded API responses with stale-while-revalidate.
+
+    An entry is fresh for ``ttl_s``; for a further
+    ``min(ttl_s * stale_factor, stale_cap_s)`` it is still served (so nothing
+    older than ``ttl_s + stale_cap_s`` goes out), but the first such hit
+    schedules one background refresh.
+    Only ``200`` :class:`Response` objects are stored. Anything else the compute
+    function returns (the routes' ``{"error": ...}`` dicts) is passed through
+    uncached. Every cached response carries a strong ``ETag``, and
+    ``Cache-Control`` follows the remaining TTL. A matching ``If-None-Match``
+    gets a ``304``. Eviction is LRU, bounded by both ``max_entries`` and
+    ``max_bytes``. Background refreshes run inside ``refresh_context()`` when
+    one is given (e.g. to lower their upstream priority).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 64 << 20,
+        stale_factor: float = 10.0,
+        stale_cap_s: float = 10.0,
+        refresh_context: Optional[Callable[[], ContextManager[Any]]] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.refresh_context = refresh_context
+        self.max_bytes = max_bytes
+        self.stale_factor = stale_factor
+        self.stale_cap_s = stale_cap_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self.counts = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "uncacheable": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    # -------------------------
+    # storage
+    # -------------------------
+    def _get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None:
+                self._entries.move_to_end(key)
+            return e
+
+    def _put(self, key: Hashable, e: CacheEntry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = e
+            self._bytes += e.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, ev = self._entries.popitem(last=False)
+                self._bytes -= ev.nbytes
+                self.counts["evictions"] += 1
+
+    def _bump(self, field_: str) -> None:
+        with self._lock:
+            self.counts[field_] += 1
+
+    def _entry(self, res: Response, ttl_s: float) -> CacheEntry:
+        body = bytes(res.body)
+        headers = {k: v for k, v in res.headers.items() if k.lower() not in ("content-length", "content-type")}
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return CacheEntry(
+            body=body,
+            media_type=res.media_type or res.headers.get("content-type", "application/octet-stream"),
+            headers=headers,
+            etag=etag,
+            created=time.time(),
+            ttl_s=ttl_s,
+            stale_s=min(ttl_s * self.stale_factor, self.stale_cap_s),
+        )
+
+    async def _compute(self, key: Hashable, ttl_s: float, compute: Callable[[], Awaitable[Computed]]) -> Union[CacheEntry, Any]:
+        async def run() -> Union[CacheEntry, Any]:
+            res = await compute()
+            if not isinstance(res, Response) or res.status_code != 200:
+                self._bump("uncacheable")
+                return res
+            e = self._entry(res, ttl_s)
+            self._put(key, e)
+            return e
+
+        # concurrent misses for one key compute once
+        return await self._flight.do_async(("response", key), run)
+
+    def _refresh_later(self, key: Hashable, ttl_s: float, compute: Callable[[], Awaitable[Computed]]) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh() -> None:
+            try:
+                if self.refresh_context is not None:
+                    with self.refresh_context():
+                        out = await self._compute(key, ttl_s, compute)
+                else:
+                    out = await self._compute(key, ttl_s, compute)
+                self._bump("refreshes" if isinstance(out, CacheEntry) else "refresh_errors")
+            except Exception:
+                self._bump("refresh_errors")
+            finally:
+                self._refreshing.discard(key)
+
+        t = asyncio.ensure_future(refresh())
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+
+    # -------------------------
+    # request path
+    # -------------------------
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        ttl_s: float,
+        compute: Callable[[], Awaitable[Computed]],
+    ) -> Computed:
+        now = time.time()
+        e = self._get(key)
+        status = "miss"
+        if e is not None and e.age(now) < e.ttl_s:
+            status = "hit"
+        elif e is not None and e.age(now) < e.ttl_s + e.stale_s:
+            status = "stale"
+            self._refresh_later(key, ttl_s, compute)
+        else:
+            out = await self._compute(key, ttl_s, compute)
+            if not isinstance(out, CacheEntry):
+                self._bump("misses")
+                return out
+            e, now = out, time.time()
+        self._bump({"hit": "hits", "stale": "stale_hits", "miss": "misses"}[status])
+        return self._to_response(request, e, status, now)
+
+    def _to_response(self, request: Request, e: CacheEntry, status: str, now: float) -> Response:
+        max_age = max(0, int(e.ttl_s - e.age(now)))
+        headers = {
+            **e.headers,
+            "ETag": e.etag,
+            "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={int(e.stale_s)}",
+            "Vary": "Accept",
+            "X-Cache": status.upper(),
+        }
+        inm = request.headers.get("if-none-match")
+        if inm and e.etag in {t.strip() for t in inm.split(",")}:
+            self._bump("not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(e.body, media_type=e.media_type, headers=headers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counts)
+            entries, nbytes = len(self._entries), self._bytes
+        served = c["hits"] + c["stale_hits"] + c["misses"]
+        return {
+            "entries": entries,
+            "bytes": nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **c,
+            "hit_ratio": round((c["hits"] + c["stale_hits"]) / served, 4) if served else None,
+            "refreshing": len(self._refreshing),
+        }
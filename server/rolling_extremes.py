@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WINDOW_RE = re.compile(r"^(\d+)(b|d|w|m|y)$")
+
+# Calendar spans, consistent with the historic 6m=183d / 1y=365d / 2y=730d windows.
+_UNIT_DAYS = {"d": 1.0, "w": 7.0, "m": 30.5, "y": 365.0}
+
+
+def parse_window(w: str) -> Tuple[str, int]:
+    """
+    "20d" / "52w" / "6m" / "2y" -> ("days", n_days); "20b" -> ("bars", 20) (last N trading bars).
+    """
+    m = _WINDOW_RE.match((w or "").strip().lower())
+    if not m:
+        raise ValueError(f"unsupported window: {w}")
+    n, unit = int(m.group(1)), m.group(2)
+    if n <= 0:
+        raise ValueError(f"unsupported window: {w}")
+    if unit == "b":
+        return "bars", n
+    return "days", int(math.ceil(n * _UNIT_DAYS[unit]))
+
+
+class _SparseTable:
+    """Append/amend-at-tail sparse table: O(1) range max (or min) over any [i, j]."""
+
+    def __init__(self, op) -> None:
+        self.op = op
+        self.levels: List[List[float]] = [[]]
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def truncate(self, n: int) -> None:
+        for k, lv in enumerate(self.levels):
+            del lv[max(0, n - (1 << k) + 1):]
+        while len(self.levels) > 1 and not self.levels[-1]:
+            self.levels.pop()
+
+    def append(self, v: float) -> None:
+        self.levels[0].append(v)
+        n = len(self.levels[0])
+        k = 1
+        while (1 << k) <= n:
+            if k == len(self.levels):
+                self.levels.append([])
+            prev, half = self.levels[k - 1], 1 << (k - 1)
+            i = n - (1 << k)  # the one new entry at this level
+            self.levels[k].append(self.op(prev[i], prev[i + half]))
+            k += 1
+
+    def query(self, i: int, j: int) -> float:
+        k = (j - i + 1).bit_length() - 1
+        lv = self.levels[k]
+        return self.op(lv[i], lv[j - (1 << k) + 1])
+
+
+class ExtremesIndex:
+    """
+    Rolling high/low index over one symbol's daily bars.
+
+    Windows are suffixes ending at the latest bar: the window start is found
+    by binary search on the bar timestamps (so windows roll forward with the
+    clock), then max(High)/min(Low) is answered in O(1) by two sparse tables.
+    :meth:`sync` applies a newer bar array incrementally: only the amended last
+    bar and newly appended bars are (re)inserted.
+    """
+
+    def __init__(self) -> None:
+        self.ts: List[int] = []
+        self._hi = _SparseTable(max)
+        self._lo = _SparseTable(min)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def sync(self, arr: np.ndarray) -> None:
+        n = len(arr)
+        same_head = self.ts and n and int(arr["ts"][0]) == self.ts[0] and n >= len(self.ts)
+        keep = len(self.ts) - 1 if same_head else 0  # the last stored bar may have been amended
+        if same_head and int(arr["ts"][keep]) != self.ts[keep]:
+            keep = 0
+        keep = max(keep, 0)
+        del self.ts[keep:]
+        self._hi.truncate(keep)
+        self._lo.truncate(keep)
+        tail = arr[keep:]
+        for t, h, l in zip(tail["ts"].tolist(), tail["high"].tolist(), tail["low"].tolist()):
+            self.ts.append(t)
+            self._hi.append(h)
+            self._lo.append(l)
+
+    def window(self, kind: str, n: int, now: Optional[float] = None) -> Tuple[Optional[float], Optional[float]]:
+        if not self.ts:
+            return None, None
+        last = len(self.ts) - 1
+        if kind == "bars":
+            start = max(0, len(self.ts) - n)
+        else:
+            now = time.time() if now is None else now
+            start = int(np.searchsorted(self.ts, now - n * 86400, side="left"))
+        if start > last:
+            return None, None
+        return float(self._hi.query(start, last)), float(self._lo.query(start, last))
+
+
+class ExtremesRegistry:
+    """Per-symbol :class:`ExtremesIndex` objects, LRU-bounded."""
+
+    def __init__(self, max_symbols: int = 2000) -> None:
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._idx: "OrderedDict[str, ExtremesIndex]" = OrderedDict()
+
+    def highs(self, symbol: str, arr: np.ndarray, windows: Sequence[Tuple[str, str, int]]) -> Dict[str, Dict[str, Optional[float]]]:
+        """``windows`` = [(label, kind, n)] -> {label: {"high": .., "low": ..}}."""
+        with self._lock:
+            idx = self._idx.get(symbol)
+            if idx is None:
+                idx = self._idx[symbol] = ExtremesIndex()
+            self._idx.move_to_end(symbol)
+            while len(self._idx) > self.max_symbols:
+                self._idx.popitem(last=False)
+            idx.sync(arr)
+            now = time.time()
+            out = {}
+            for label, kind, n in windows:
+                hi, lo = idx.window(kind, n, now)
+                out[label] = {"high": hi, "low": lo}
+            return out
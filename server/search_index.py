@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:  # optional: pinyin initials ("腾讯控股" -> "txkg")
+    from pypinyin import Style, lazy_pinyin
+except Exception:  # pragma: no cover
+    lazy_pinyin = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_MAX_INITIALS_PREFIX = 8
+
+# rank buckets (lower is better)
+_R_CODE_EXACT, _R_CODE_PREFIX = 0, 1
+_R_NAME_EXACT, _R_NAME_PREFIX, _R_NAME_SUB = 2, 3, 4
+_R_ALIAS_EXACT, _R_ALIAS_SUB = 5, 6
+_R_PINYIN = 7
+
+
+def pinyin_initials(text: str) -> str:
+    if lazy_pinyin is None or not text:
+        return ""
+    return "".join(p[:1] for p in lazy_pinyin(text, style=Style.FIRST_LETTER) if p).lower()
+
+
+def _grams(text: str) -> Set[str]:
+    """Character unigrams + bigrams."""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SearchIndex:
+    """
+    Immutable in-memory index over ``stock_mapping`` (+ ``stock_aliases``).
+
+    - code prefix map: "018" / "18" -> stocks whose code (with or without leading zeros) starts with it
+    - character n-gram inverted index over names and aliases, verified by substring
+      match (same semantics as ``LIKE '%q%'``)
+    - pinyin-initials prefix map (only when ``pypinyin`` is installed)
+
+    :meth:`search` returns ranked top-k rows shaped like ``db_search_hk`` rows.
+    """
+
+    def __init__(self, stocks: Sequence[Dict[str, Any]], aliases: Iterable[Tuple[str, str]] = ()) -> None:
+        self.rows: List[Dict[str, Any]] = [
+            {"stock_code": str(r["stock_code"]), "stock_name": str(r["stock_name"]), "market": r["market"]} for r in stocks
+        ]
+        self.names: List[str] = [r["stock_name"].lower() for r in self.rows]
+        self.aliases: List[List[str]] = [[] for _ in self.rows]
+        self.code_prefix: Dict[str, List[int]] = {}
+        self.code_exact: Dict[str, List[int]] = {}
+        self.grams: Dict[str, List[int]] = {}
+        self.initials: Dict[str, List[int]] = {}
+
+        for i, r in enumerate(self.rows):
+            code = r["stock_code"]
+            for c in {code, code.lstrip("0") or "0"}:
+                self.code_exact.setdefault(c, []).append(i)
+                for k in range(1, len(c) + 1):
+                    self.code_prefix.setdefault(c[:k], []).append(i)
+            self._add_grams(self.names[i], i)
+            ini = pinyin_initials(r["stock_name"])
+            for k in range(1, min(len(ini), _MAX_INITIALS_PREFIX) + 1):
+                self.initials.setdefault(ini[:k], []).append(i)
+
+        # alias -> target name; like the SQL path, an alias hits every stock whose name contains the target
+        for alias, target in aliases:
+            if not alias or not target:
+                continue
+            a = str(alias).lower()
+            for i in self._substring_ids(str(target).lower(), self.names):
+                self.aliases[i].append(a)
+                self._add_grams(a, i)
+
+        self.size = len(self.rows)
+
+    def _add_grams(self, text: str, i: int) -> None:
+        for g in _grams(text):
+            lst = self.grams.setdefault(g, [])
+            if not lst or lst[-1] != i:
+                lst.append(i)
+
+    def _candidates(self, q: str) -> Set[int]:
+        keys = [q] if len(q) == 1 else [q[i:i + 2] for i in range(len(q) - 1)]
+        lists = sorted((self.grams.get(k, ()) for k in keys), key=len)
+        if not lists or not lists[0]:
+            return set()
+        out = set(lists[0])
+        for lst in lists[1:]:
+            out.intersection_update(lst)
+            if not out:
+                break
+        return out
+
+    def _substring_ids(self, q: str, texts: List[str]) -> List[int]:
+        if not q:
+            return []
+        return [i for i in self._candidates(q) if q in texts[i]]
+
+    def search(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        q = (q or "").strip()
+        if not q:
+            return []
+        ql = q.lower()
+        best: Dict[int, int] = {}
+
+        def hit(i: int, rank: int) -> None:
+            if rank < best.get(i, 99):
+                best[i] = rank
+
+        if q.isdigit():
+            for c in {q, q.zfill(5), q.lstrip("0") or "0"}:
+                for i in self.code_exact.get(c, ()):
+                    hit(i, _R_CODE_EXACT)
+            for c in {q, q.lstrip("0") or "0"}:
+                for i in self.code_prefix.get(c, ()):
+                    hit(i, _R_CODE_PREFIX)
+
+        for i in self._candidates(ql):
+            name = self.names[i]
+            if ql in name:
+                hit(i, _R_NAME_EXACT if name == ql else _R_NAME_PREFIX if name.startswith(ql) else _R_NAME_SUB)
+            for a in self.aliases[i]:
+                if ql in a:
+                    hit(i, _R_ALIAS_EXACT if a == ql else _R_ALIAS_SUB)
+
+        if ql.isascii() and ql.isalpha():
+            for i in self.initials.get(ql[:_MAX_INITIALS_PREFIX], ()):
+                hit(i, _R_PINYIN)
+
+        top = heapq.nsmallest(limit, best.items(), key=lambda kv: (kv[1], len(self.names[kv[0]]), self.rows[kv[0]]["stock_code"]))
+        return [dict(self.rows[i]) for i, _ in top]
+
+
+class SearchIndexRefresher:
+    """
+    Holds the current :class:`SearchIndex` and rebuilds it in a background
+    thread whenever ``signature()`` (e.g. row counts + MAX(updated_at)) changes.
+    The swap is a single reference assignment, so searches never block on a rebuild.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Tuple[Sequence[Dict[str, Any]], Iterable[Tuple[str, str]]]],
+        signature: Callable[[], Any],
+        interval_s: float = 300.0,
+    ) -> None:
+        self.load = load
+        self.signature = signature
+        self.interval_s = interval_s
+        self.index: Optional[SearchIndex] = None
+        self.loaded_at: Optional[float] = None
+        self.build_s: Optional[float] = None
+        self.refreshes = 0
+        self.errors = 0
+        self._sig: Any = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def refresh(self, force: bool = False) -> bool:
+        try:
+            sig = self.signature()
+            if not force and self.index is not None and sig == self._sig:
+                return False
+            t0 = time.perf_counter()
+            stocks, aliases = self.load()
+            idx = SearchIndex(stocks, aliases)
+            self.index, self._sig = idx, sig
+            self.build_s = time.perf_counter() - t0
+            self.loaded_at = time.time()
+            self.refreshes += 1
+            logger.info("search index rebuilt: %d stocks in %.3fs", idx.size, self.build_s)
+            return True
+        except Exception as e:
+            self.errors += 1
+            logger.warning("search index refresh failed: %s", e)
+            return False
+
+    def search(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.index.search(q, limit) if self.index is not None else []
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop.wait(self.interval_s):
+            self.refresh()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "stocks": self.index.size if self.index is not None else 0,
+            "pinyin": lazy_pinyin is not None,
+            "build_s": round(self.build_s, 4) if self.build_s is not None else None,
+            "loaded_at": self.loaded_at,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce identical in-flight upstream requests.
+
+    The first caller for a key runs ``fn``; callers arriving with the same key
+    while it is running wait for and share its result (or exception) instead of
+    hitting Tencent / Yahoo / the proxies again. Nothing is cached once the call
+    finishes — this only collapses concurrent duplicates.
+
+    Keys are tuples whose first element is the upstream kind (e.g. ``"yahoo_chart"``),
+    used to break the counters down per upstream.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._async_calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _bump(self, kind: str, field: str) -> None:
+        c = self._counts.setdefault(kind, {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0})
+        c[field] += 1
+
+    @staticmethod
+    def _kind(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else "default"
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """Run ``await fn(*args, **kwargs)`` once per key among concurrent callers.
+
+        The shared call runs in its own task and every caller, the first one
+        included, awaits it through :func:`asyncio.shield`: a caller that is
+        cancelled (client disconnect) only stops waiting, the others still get
+        the result.
+        """
+        kind = self._kind(key)
+        with self._lock:
+            self._bump(kind, "calls")
+            fut = self._async_calls.get(key)
+            if fut is None:
+                fut = asyncio.ensure_future(fn(*args, **kwargs))
+                self._async_calls[key] = fut
+                self._bump(kind, "executions")
+                fut.add_done_callback(lambda t: self._finish_async(key, kind, t))
+            else:
+                self._bump(kind, "coalesced")
+        return await asyncio.shield(fut)
+
+    def _finish_async(self, key: Hashable, kind: str, fut: "asyncio.Future[Any]") -> None:
+        # also marks the exception retrieved when every caller had gone away
+        failed = not fut.cancelled() and fut.exception() is not None
+        with self._lock:
+            if self._async_calls.get(key) is fut:
+                del self._async_calls[key]
+            if failed:
+                self._bump(kind, "errors")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_kind = {k: dict(v) for k, v in self._counts.items()}
+            inflight = len(self._async_calls)
+        totals = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        for v in by_kind.values():
+            for f in totals:
+                totals[f] += v[f]
+        return {**totals, "inflight": inflight, "by_kind": by_kind}
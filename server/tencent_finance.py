@@ -1,16 +1,14 @@
 from __future__ import annotations
 
+import calendar
 import re
+import warnings
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import requests
+import numpy as np
 
-try:
-    from zoneinfo import ZoneInfo  # py>=3.9
-except Exception:  # pragma: no cover
-    ZoneInfo = None  # type: ignore
+from .bar_store import BAR_DTYPE, bars_to_api
 
 
 _TENCENT_QT_URL = "https://qt.gtimg.cn/q="
@@ -45,14 +43,6 @@ class TencentQuote:
         }
 
 
-def _session(timeout_s: int) -> Tuple[requests.Session, int]:
-    s = requests.Session()
-    # IMPORTANT: avoid any environment proxy vars breaking outbound calls
-    s.trust_env = False
-    s.headers.update(_DEFAULT_HEADERS)
-    return s, timeout_s
-
-
 def to_tencent_code(symbol: str) -> Optional[str]:
     """Convert symbol into Tencent code.
 
@@ -104,25 +94,7 @@ def _calc_change(price: Optional[float], prev: Optional[float]) -> Tuple[Optiona
     return float(change), float(pct)
 
 
-def fetch_quote(symbol: str, timeout_s: int = 10) -> TencentQuote:
-    """Fetch real-time quote using Tencent qt endpoint."""
-
-    code = to_tencent_code(symbol)
-    if not code:
-        raise ValueError(f"Unsupported symbol for Tencent: {symbol}")
-
-    s, timeout_s = _session(timeout_s)
-    url = f"{_TENCENT_QT_URL}{code}"
-    r = s.get(url, timeout=timeout_s)
-    # Response is GBK text like: v_hk00700="100~name~00700~price~prev~open~...~date time~...~HKD~...";
-    text = r.text
-
-    m = re.search(r"=\"(.*)\";?", text)
-    if not m:
-        raise ValueError(f"Unexpected qt response: {text[:200]}")
-
-    parts = m.group(1).split("~")
-
+def _quote_from_parts(parts: List[str], code: str) -> TencentQuote:
     name = parts[1] if len(parts) > 1 else ""
     raw_code = parts[2] if len(parts) > 2 else ""
     price = _safe_float(parts[3]) if len(parts) > 3 else None
@@ -151,74 +123,207 @@ def fetch_quote(symbol: str, timeout_s: int = 10) -> TencentQuote:
     )
 
 
-def fetch_intraday_minute_bars(symbol: str, timeout_s: int = 12) -> List[List[float]]:
-    """Fetch intraday minute data and convert into bars format used by /api/kline.
+def parse_qt_response(text: str, code: str) -> TencentQuote:
+    """Parse a single-code qt response."""
 
-    Returns bars: [ms, open, close, low, high, volume]
+    # Response is GBK text like: v_hk00700="100~name~00700~price~prev~open~...~date time~...~HKD~...";
+    m = re.search(r"=\"(.*)\";?", text)
+    if not m:
+        raise ValueError(f"Unexpected qt response: {text[:200]}")
 
-    Tencent minute/query returns cumulative volume/amount at each minute.
-    We convert to per-minute volume by delta.
-    """
+    return _quote_from_parts(m.group(1).split("~"), code)
 
-    code = to_tencent_code(symbol)
-    if not code:
-        raise ValueError(f"Unsupported symbol for Tencent: {symbol}")
 
-    s, timeout_s = _session(timeout_s)
-    r = s.get(_TENCENT_MINUTE_URL, params={"code": code}, timeout=timeout_s)
-    obj = r.json()
+# One qt record per code: v_hk00700="...~...";  (unknown codes come back as v_pv_none_match="1";)
+_QT_RECORD_RE = re.compile(r"v_([A-Za-z0-9_]+)=\"([^\"]*)\"")
 
-    data0 = ((obj.get("data") or {}).get(code) or {}).get("data") or {}
-    date_str = str(data0.get("date") or "")  # yyyymmdd
-    rows = data0.get("data") or []
+# qt accepts comma-separated codes; keep each URL well under common 2k limits.
+_QT_MAX_URL_LEN = 1500
+_QT_MAX_CODES_PER_REQUEST = 60
+
+
+def _chunk_codes(codes: List[str]) -> List[List[str]]:
+    chunks: List[List[str]] = []
+    cur: List[str] = []
+    cur_len = len(_TENCENT_QT_URL)
+    for c in codes:
+        add = len(c) + (1 if cur else 0)
+        if cur and (cur_len + add > _QT_MAX_URL_LEN or len(cur) >= _QT_MAX_CODES_PER_REQUEST):
+            chunks.append(cur)
+            cur, cur_len, add = [], len(_TENCENT_QT_URL), len(c)
+        cur.append(c)
+        cur_len += add
+    if cur:
+        chunks.append(cur)
+    return chunks
 
-    if not date_str or len(date_str) != 8 or not rows:
-        return []
 
-    yyyy = int(date_str[0:4])
-    mm = int(date_str[4:6])
-    dd = int(date_str[6:8])
+_QT_CURRENCIES = ("HKD", "USD", "CNY")
 
-    tz = None
-    if ZoneInfo is not None:
-        try:
-            tz = ZoneInfo("Asia/Hong_Kong")
-        except Exception:
-            tz = None
 
-    bars: List[List[float]] = []
-    prev_cum_vol: Optional[float] = None
+def parse_qt_records(text: str) -> Dict[str, TencentQuote]:
+    """Parse every v_<code>="..." record of a (multi-code) qt response.
 
-    for line in rows:
+    One ``findall`` pass over the whole response; each record is only split as
+    far as the fields we read (name .. prev close, quote time) plus a bounded
+    right split for the currency tail, instead of all ~70 fields.
+    Returns {tencent_code: TencentQuote}; empty / unknown records are skipped.
+    """
+
+    out: Dict[str, TencentQuote] = {}
+    for code, body in _QT_RECORD_RE.findall(text or ""):
+        if "~" not in body:
+            continue
+        parts = body.split("~", 31)
+        n = len(parts)
+        price = _safe_float(parts[3]) if n > 3 else None
+        prev_close = _safe_float(parts[4]) if n > 4 else None
+        change, pct = _calc_change(price, prev_close)
+        currency = None
+        # tail often contains HKD
+        for p in reversed(body.rsplit("~", 6)[-6:]):
+            if p in _QT_CURRENCIES:
+                currency = p
+                break
+        out[code] = TencentQuote(
+            code=(parts[2] if n > 2 else "") or code,
+            name=parts[1] if n > 1 else "",
+            price=price,
+            prev_close=prev_close,
+            change=change,
+            pct_change=pct,
+            quote_time=parts[30] if n > 30 else None,
+            currency=currency,
+        )
+    return out
+
+
+_HK_OFFSET_S = 8 * 3600
+
+# HHMM (as an integer, e.g. 930) -> seconds after 00:00 HK; -1 for impossible minutes (mm >= 60)
+_hh, _mm = np.divmod(np.arange(2400), 100)
+_HHMM_OFFSET_S = np.where(_mm < 60, _hh * 3600 + _mm * 60, -1).astype(np.int64)
+del _hh, _mm
+
+
+def hk_day_epoch(date_str: str) -> int:
+    """"20261016" -> epoch seconds of 00:00 Asia/Hong_Kong (no DST, fixed UTC+8)."""
+    return calendar.timegm((int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]), 0, 0, 0)) - _HK_OFFSET_S
+
+
+def decode_minute_rows(
+    rows: Sequence[Any], day0: int, prev_cum: Optional[float] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Bulk-decode ``"HHMM price cumVol [cumAmount]"`` rows.
+
+    The rows are joined and parsed by one ``np.fromstring`` call, timestamps come
+    from the HHMM offset table and per-minute volume is ``np.diff`` of the
+    cumulative volume (``prev_cum`` is the cumulative volume before the first row;
+    without it the first bar gets 0, as before). Returns (BAR_DTYPE bars,
+    cumulative volume), or None when the rows are not uniform numeric records,
+    in which case callers fall back to the per-row parser.
+    """
+
+    n = len(rows)
+    if n == 0:
+        return np.empty(0, dtype=BAR_DTYPE), np.empty(0)
+    ncols = len(str(rows[0]).split())
+    if ncols < 3:
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)  # older NumPy: partial parse + warning
+            vals = np.fromstring(" ".join(map(str, rows)), sep=" ")
+    except ValueError:  # newer NumPy raises on unparsable text
+        return None
+    if vals.size != n * ncols:
+        return None
+    vals = vals.reshape(n, ncols)
+
+    hhmm = vals[:, 0]
+    if not ((hhmm >= 0) & (hhmm < 2400) & (hhmm == np.floor(hhmm))).all():
+        return None
+    off = _HHMM_OFFSET_S[hhmm.astype(np.int64)]
+    price, cum = vals[:, 1], vals[:, 2]
+    if (off < 0).any() or np.isnan(price).any() or np.isnan(cum).any():
+        return None
+
+    out = np.empty(n, dtype=BAR_DTYPE)
+    out["ts"] = day0 + off
+    # We only have a single price point per minute; represent as flat bar.
+    out["open"] = out["high"] = out["low"] = out["close"] = price
+    out["volume"] = np.floor(np.maximum(np.diff(cum, prepend=cum[0] if prev_cum is None else prev_cum), 0.0))
+    return out, cum
+
+
+def _parse_minute_rows_slow(
+    rows: Sequence[Any], day0: int, prev_cum: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-row fallback for irregular payloads (skips malformed lines)."""
+
+    recs: List[Tuple[int, float, float, float, int]] = []
+    prev_cum_vol = prev_cum
+    for idx, line in enumerate(rows):
         # format: "HHMM price cumVol cumAmount"
         parts = str(line).strip().split()
         if len(parts) < 3:
             continue
-
         hhmm = parts[0]
-        if len(hhmm) != 4 or not hhmm.isdigit():
+        if len(hhmm) != 4 or not hhmm.isdigit() or _HHMM_OFFSET_S[int(hhmm)] < 0:
             continue
-        hh = int(hhmm[0:2])
-        mi = int(hhmm[2:4])
-
         price = _safe_float(parts[1])
         cum_vol = _safe_float(parts[2])
-
         if price is None:
             continue
-
-        # convert to epoch ms
-        dt = datetime(yyyy, mm, dd, hh, mi, 0, tzinfo=tz) if tz else datetime(yyyy, mm, dd, hh, mi, 0)
-        ts_ms = dt.timestamp() * 1000.0
-
-        vol = 0
+        vol = 0.0
         if cum_vol is not None:
             if prev_cum_vol is not None:
-                vol = int(max(0.0, float(cum_vol - prev_cum_vol)))
+                vol = float(int(max(0.0, cum_vol - prev_cum_vol)))
             prev_cum_vol = cum_vol
+        cum = np.nan if prev_cum_vol is None else prev_cum_vol
+        recs.append((day0 + int(_HHMM_OFFSET_S[int(hhmm)]), price, vol, cum, idx))
+
+    out = np.empty(len(recs), dtype=BAR_DTYPE)
+    if not recs:
+        return out, np.empty(0), np.empty(0, dtype=np.int64)
+    a = np.array(recs, dtype=np.float64)
+    out["ts"] = a[:, 0].astype(np.int64)
+    out["open"] = out["high"] = out["low"] = out["close"] = a[:, 1]
+    out["volume"] = a[:, 2]
+    return out, a[:, 3], a[:, 4].astype(np.int64)
+
+
+def parse_minute_rows(
+    rows: Sequence[Any], day0: int, prev_cum: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """:func:`decode_minute_rows` with the per-row fallback for irregular rows.
+
+    Returns (BAR_DTYPE bars, cumulative volume after each bar — NaN while none
+    is known yet —, index in ``rows`` of each bar); malformed rows (bad HHMM such
+    as "0975", unparsable price) produce no bar.
+    """
+
+    fast = decode_minute_rows(rows, day0, prev_cum)
+    if fast is not None:
+        return fast[0], fast[1], np.arange(len(rows))
+    return _parse_minute_rows_slow(rows, day0, prev_cum)
+
+
+def decode_minute_payload(obj: Dict[str, Any], code: str) -> np.ndarray:
+    """minute/query JSON payload -> BAR_DTYPE array (ts in epoch seconds)."""
+
+    data0 = ((obj.get("data") or {}).get(code) or {}).get("data") or {}
+    date_str = str(data0.get("date") or "")  # yyyymmdd
+    rows = data0.get("data") or []
+
+    if not date_str or len(date_str) != 8 or not date_str.isdigit() or not rows:
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    day0 = hk_day_epoch(date_str)
+    return parse_minute_rows(rows, day0)[0]
+
 
-        # We only have a single price point per minute; represent as flat bar.
-        o = c = l = h = float(price)
-        bars.append([ts_ms, o, c, l, h, vol])
+def parse_minute_payload(obj: Dict[str, Any], code: str) -> List[List[float]]:
+    """Convert a minute/query JSON payload into bars: [ms, open, close, low, high, volume]."""
 
-    return bars
+    return bars_to_api(decode_minute_payload(obj, code))
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from stock_sdk.routing import HedgePolicy, RouteScoreboard, run_hedged_async
+
+from .tencent_finance import (
+    _DEFAULT_HEADERS,
+    _TENCENT_MINUTE_URL,
+    _TENCENT_QT_URL,
+    TencentQuote,
+    _chunk_codes,
+    parse_qt_records,
+    parse_qt_response,
+    to_tencent_code,
+)
+from .metrics import FAILOVER_ATTEMPTS, time_upstream
+from .upstream_scheduler import UpstreamScheduler
+
+Route = Tuple[Optional[str], Optional[int]]
+
+
+def _route_label(route: Route) -> str:
+    host, port = route
+    return f"{host}:{port}" if host is not None else "direct"
+
+
+def _retry_after_s(value: Optional[str], default: float) -> float:
+    try:
+        return max(0.0, min(float(value), 120.0)) if value else default
+    except ValueError:
+        return default  # HTTP-date form; not worth parsing
+
+
+class AsyncUpstream:
+    """Non-blocking upstream client behind every server route.
+
+    Scoreboard-ordered, optionally hedged proxy failover for Yahoo and direct
+    Tencent calls, without holding a threadpool worker; losing hedged attempts
+    are cancelled. One
+    ``httpx.AsyncClient`` is kept per proxy route so connections are reused
+    between requests. With a ``scheduler`` every call first takes a token from
+    its provider limiter and every Yahoo attempt one from its route limiter;
+    a Yahoo 429 pauses that route for its Retry-After (``pause_429_s`` when
+    the header is missing) and throttled routes are tried last.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[Route],
+        mk_proxy: Callable[[str, int], str],
+        yahoo_headers: Dict[str, str],
+        timeout_s: float = 25,
+        board: Optional[RouteScoreboard] = None,
+        hedge: Optional[HedgePolicy] = None,
+        scheduler: Optional[UpstreamScheduler] = None,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry_s: float = 300.0,
+        pause_429_s: float = 5.0,
+    ) -> None:
+        self.routes = list(routes)
+        self.pause_429_s = pause_429_s
+        self.scheduler = scheduler
+        self.board = board or RouteScoreboard()
+        self.hedge = hedge
+        self.mk_proxy = mk_proxy
+        self.yahoo_headers = yahoo_headers
+        self.timeout_s = timeout_s
+        self._yahoo_clients: Dict[Tuple[Optional[str], Optional[int]], httpx.AsyncClient] = {}
+        self._tencent: Optional[httpx.AsyncClient] = None
+        # per client (= per proxy route, plus one for Tencent); idle keep-alive
+        # connections are dropped by httpx after keepalive_expiry
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_s,
+        )
+        self._route_counts: Dict[str, Dict[str, int]] = {}
+
+    def _yahoo_client(self, host: Optional[str], port: Optional[int]) -> httpx.AsyncClient:
+        key = (host, port)
+        c = self._yahoo_clients.get(key)
+        if c is None:
+            proxy = self.mk_proxy(host, port) if host is not None else None
+            c = httpx.AsyncClient(
+                proxy=proxy,
+                headers=self.yahoo_headers,
+                trust_env=False,  # 不吃环境代理
+                timeout=self.timeout_s,
+                limits=self._limits,
+            )
+            self._yahoo_clients[key] = c
+        return c
+
+    def _tencent_client(self) -> httpx.AsyncClient:
+        if self._tencent is None:
+            # qt responses are GBK; minute/query is JSON (decoded from bytes)
+            self._tencent = httpx.AsyncClient(
+                headers=_DEFAULT_HEADERS, trust_env=False, default_encoding="gbk", limits=self._limits
+            )
+        return self._tencent
+
+    async def aclose(self) -> None:
+        clients: List[httpx.AsyncClient] = list(self._yahoo_clients.values())
+        if self._tencent is not None:
+            clients.append(self._tencent)
+        self._yahoo_clients.clear()
+        self._tencent = None
+        await asyncio.gather(*(c.aclose() for c in clients), return_exceptions=True)
+
+    def _count(self, label: str, field: str) -> None:
+        c = self._route_counts.setdefault(label, {"requests": 0, "errors": 0, "new_connections": 0})
+        c[field] += 1
+
+    def _trace(self, label: str) -> Callable[[str, dict], Awaitable[None]]:
+        """httpcore trace hook: a TCP connect means the pool had no idle connection to reuse."""
+
+        async def trace(event: str, info: dict) -> None:
+            if event == "connection.connect_tcp.complete":
+                self._count(label, "new_connections")
+
+        return trace
+
+    def _get(self, c: httpx.AsyncClient, label: str, url: str, **kw) -> Awaitable[httpx.Response]:
+        self._count(label, "requests")
+        return c.get(url, extensions={"trace": self._trace(label)}, **kw)
+
+    async def _tencent_get(self, c: httpx.AsyncClient, url: str, **kw) -> httpx.Response:
+        with time_upstream("tencent", "direct"):
+            try:
+                return await self._get(c, "tencent", url, **kw)
+            except Exception:
+                self._count("tencent", "errors")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-client request / error / new-connection counts and connection reuse rate."""
+        routes = {}
+        for k, v in self._route_counts.items():
+            d = dict(v)
+            d["reuse_rate"] = round(1 - v["new_connections"] / v["requests"], 4) if v["requests"] else None
+            routes[k] = d
+        return {
+            "limits": {
+                "max_connections": self._limits.max_connections,
+                "max_keepalive_connections": self._limits.max_keepalive_connections,
+                "keepalive_expiry_s": self._limits.keepalive_expiry,
+            },
+            "clients": len(self._yahoo_clients) + (self._tencent is not None),
+            "routes": routes,
+        }
+
+    async def _admit(self, name: str) -> None:
+        if self.scheduler is not None:
+            await self.scheduler.acquire_async(name)
+
+    # -------------------------
+    # Yahoo
+    # -------------------------
+    async def get_json_with_failover(self, url: str, params: dict, timeout: Optional[float] = None) -> dict:
+        attempt_timeout = self.board.attempt_timeout(timeout or self.timeout_s)
+        sched = self.scheduler
+        attempts = 0
+
+        async def attempt(route: Route) -> dict:
+            nonlocal attempts
+            host, port = route
+            attempts += 1
+            label = _route_label(route)
+            c = self._yahoo_client(host, port)
+            with time_upstream("yahoo", label):
+                try:
+                    r = await self._get(c, label, url, params=params, timeout=attempt_timeout)
+                except Exception:
+                    self._count(label, "errors")
+                    raise
+                ctype = (r.headers.get("content-type") or "").lower()
+                if r.status_code == 200 and "json" in ctype:
+                    return r.json()
+                if r.status_code == 429 and sched is not None:
+                    sched.pause(sched.route_name("yahoo", route), _retry_after_s(r.headers.get("retry-after"), self.pause_429_s))
+                raise RuntimeError(f"Yahoo HTTP {r.status_code} ctype={ctype}")
+
+        async def admit(route: Route) -> None:
+            # route token: taken outside the attempt's timing, a rejection is no verdict on the route
+            await sched.acquire_async(sched.route_name("yahoo", route))
+
+        await self._admit("yahoo")
+        routes = self.board.order(self.routes)
+        if sched is not None:
+            routes = sched.ready_routes("yahoo", routes)
+        try:
+            out = await run_hedged_async(
+                attempt, routes, self.board, self.hedge, ordered=True, admit=admit if sched is not None else None
+            )
+        except Exception as e:
+            FAILOVER_ATTEMPTS.observe(attempts, "error")
+            raise RuntimeError(f"all proxies failed, last_err={e}") from e
+        FAILOVER_ATTEMPTS.observe(attempts, "ok")
+        return out
+
+    # -------------------------
+    # Tencent
+    # -------------------------
+    async def fetch_quote(self, symbol: str, timeout_s: float = 10) -> TencentQuote:
+        code = to_tencent_code(symbol)
+        if not code:
+            raise ValueError(f"Unsupported symbol for Tencent: {symbol}")
+        await self._admit("tencent")
+        r = await self._tencent_get(self._tencent_client(), f"{_TENCENT_QT_URL}{code}", timeout=timeout_s)
+        return parse_qt_response(r.text, code)
+
+    async def fetch_quotes(self, symbols: Sequence[str], timeout_s: float = 10) -> Dict[str, TencentQuote]:
+        """Real-time quotes for many symbols, packed into as few ``q=hk00700,hk09988,...``
+        requests as the URL length allows; the (rare) extra chunks are fetched concurrently.
+
+        Returns {symbol: TencentQuote} keyed by the symbols passed in; unsupported
+        symbols and codes missing from the response are simply absent.
+        """
+        by_code: Dict[str, List[str]] = {}
+        for sym in symbols:
+            code = to_tencent_code(sym)
+            if code:
+                by_code.setdefault(code, []).append(sym)
+        if not by_code:
+            return {}
+        c = self._tencent_client()
+
+        async def get(chunk: List[str]) -> httpx.Response:
+            await self._admit("tencent")
+            return await self._tencent_get(c, f"{_TENCENT_QT_URL}{','.join(chunk)}", timeout=timeout_s)
+
+        resps = await asyncio.gather(*(get(chunk) for chunk in _chunk_codes(list(by_code))))
+        out: Dict[str, TencentQuote] = {}
+        for r in resps:
+            for code, q in parse_qt_records(r.text).items():
+                for sym in by_code.get(code, ()):
+                    out[sym] = q
+        return out
+
+    async def fetch_minute_payload(self, symbol: str, timeout_s: float = 12) -> Tuple[str, dict]:
+        """Raw ``minute/query`` JSON for the whole trading day, plus the Tencent code it is keyed by."""
+        code = to_tencent_code(symbol)
+        if not code:
+            raise ValueError(f"Unsupported symbol for Tencent: {symbol}")
+        await self._admit("tencent")
+        r = await self._tencent_get(self._tencent_client(), _TENCENT_MINUTE_URL, params={"code": code}, timeout=timeout_s)
+        return code, r.json()
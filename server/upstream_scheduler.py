@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# priority classes (lower = served first)
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# per-class admission limits: waiters queued per limiter / longest acceptable wait
+DEFAULT_MAX_QUEUE = {INTERACTIVE: 64, NORMAL: 128, BACKGROUND: 32}
+DEFAULT_MAX_WAIT_S = {INTERACTIVE: 5.0, NORMAL: 10.0, BACKGROUND: 30.0}
+
+_priority: "contextvars.ContextVar[int]" = contextvars.ContextVar("upstream_priority", default=NORMAL)
+
+_QUEUED, _GRANTED, _ABANDONED = 0, 1, 2
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def upstream_priority(priority: int) -> Iterator[None]:
+    """Upstream calls made inside the block (and tasks spawned from it) use ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class UpstreamOverloaded(RuntimeError):
+    """A limiter's queue for this priority is full, or the expected wait exceeds the class's budget."""
+
+
+def _pct(xs: Sequence[float], q: float) -> Optional[float]:
+    if not xs:
+        return None
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``. Not locked; the scheduler serialises access."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1.0))
+        self.tokens = self.burst
+        self._t = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_s(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float, now: float) -> None:
+        """Drain the bucket so nothing is granted for ``seconds`` (upstream said 429)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1.0 - seconds * self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "loop", "future", "event", "state", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.state = _QUEUED
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def grant(self) -> None:
+        self.state = _GRANTED
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class _Limiter:
+    def __init__(self, name: str, rate: float, burst: float) -> None:
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.heap: List[_Waiter] = []
+        self.queued = {p: 0 for p in PRIORITY_NAMES}
+        self.waits = {p: deque(maxlen=512) for p in PRIORITY_NAMES}  # type: Dict[int, Deque[float]]
+        self.counts = {"immediate": 0, "granted": 0, "rejected": 0, "timed_out": 0, "paused": 0}
+
+
+class UpstreamScheduler:
+    """
+    Central admission control for upstream HTTP calls.
+
+    Every provider (``yahoo``, ``tencent``) and every proxy route gets its own
+    token bucket. A caller takes a token from the limiter before it sends a
+    request. When the bucket is empty, the caller queues by priority class
+    (:data:`INTERACTIVE` < :data:`NORMAL` < :data:`BACKGROUND`), FIFO within a
+    class, and a dispatcher thread hands out tokens as they refill. A request
+    fails fast with :class:`UpstreamOverloaded` instead of piling up when:
+
+    - its class already has ``max_queue[p]`` waiters on that limiter, or
+    - the expected wait exceeds ``max_wait_s[p]``.
+
+    Route limiters are created on first use with ``route_rate`` / ``route_burst``.
+    The priority comes from the ``upstream_priority`` context variable unless
+    it is given explicitly. Works from threads and from coroutines.
+    """
+
+    def __init__(
+        self,
+        route_rate: float = 2.0,
+        route_burst: float = 4.0,
+        max_queue: Optional[Dict[int, int]] = None,
+        max_wait_s: Optional[Dict[int, float]] = None,
+    ) -> None:
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.max_queue = {**DEFAULT_MAX_QUEUE, **(max_queue or {})}
+        self.max_wait_s = {**DEFAULT_MAX_WAIT_S, **(max_wait_s or {})}
+        self._cond = threading.Condition()
+        self._limiters: Dict[str, _Limiter] = {}
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    # -------------------------
+    # limiters
+    # -------------------------
+    def add(self, name: str, rate: float, burst: float) -> None:
+        with self._cond:
+            self._limiters[name] = _Limiter(name, rate, burst)
+
+    @staticmethod
+    def route_name(provider: str, route: Tuple[Optional[str], Optional[int]]) -> str:
+        host, port = route
+        return f"{provider}@direct" if host is None else f"{provider}@{host}:{port}"
+
+    def _limiter(self, name: str) -> _Limiter:
+        lim = self._limiters.get(name)
+        if lim is None:
+            lim = self._limiters[name] = _Limiter(name, self.route_rate, self.route_burst)
+        return lim
+
+    def has_capacity(self, name: str) -> bool:
+        """A token is available right now and nobody is queued for it."""
+        with self._cond:
+            lim = self._limiter(name)
+            return not lim.heap and lim.bucket.wait_s(time.monotonic()) == 0.0
+
+    def ready_routes(self, provider: str, routes: Sequence[Tuple[Optional[str], Optional[int]]]) -> List[Any]:
+        """``routes`` with limiter capacity first, then the throttled ones (each group keeps the given order)."""
+        ready, throttled = [], []
+        for r in routes:
+            (ready if self.has_capacity(self.route_name(provider, r)) else throttled).append(r)
+        return ready + throttled
+
+    def pause(self, name: str, seconds: float) -> None:
+        with self._cond:
+            lim = self._limiter(name)
+            lim.bucket.pause(seconds, time.monotonic())
+            lim.counts["paused"] += 1
+
+    # -------------------------
+    # admission
+    # -------------------------
+    def _enqueue(self, name: str, priority: int, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """None when a token was taken immediately, else the queued waiter."""
+        now = time.monotonic()
+        with self._cond:
+            lim = self._limiter(name)
+            if not lim.heap and lim.bucket.try_take(now):
+                lim.counts["immediate"] += 1
+                lim.waits[priority].append(0.0)
+                return None
+            if lim.queued[priority] >= self.max_queue[priority]:
+                lim.counts["rejected"] += 1
+                raise UpstreamOverloaded(f"{name}: {PRIORITY_NAMES[priority]} queue full ({lim.queued[priority]})")
+            ahead = sum(n for p, n in lim.queued.items() if p <= priority)
+            est = lim.bucket.wait_s(now) + ahead / lim.bucket.rate
+            if est > self.max_wait_s[priority]:
+                lim.counts["rejected"] += 1
+                raise UpstreamOverloaded(f"{name}: expected wait {est:.1f}s exceeds {self.max_wait_s[priority]}s")
+            w = _Waiter(priority, next(self._seq), loop)
+            heapq.heappush(lim.heap, w)
+            lim.queued[priority] += 1
+            self._ensure_thread()
+            self._cond.notify()
+            return w
+
+    def _abandon(self, name: str, w: _Waiter) -> bool:
+        """Give up on a queued waiter; False if it was granted in the meantime."""
+        with self._cond:
+            if w.state != _QUEUED:
+                return False
+            lim = self._limiters[name]
+            w.state = _ABANDONED
+            lim.queued[w.priority] -= 1
+            lim.counts["timed_out"] += 1
+            return True
+
+    def acquire(self, name: str, priority: Optional[int] = None) -> None:
+        """Blocking: take one token from ``name`` (waiting in line if needed)."""
+        p = current_priority() if priority is None else priority
+        w = self._enqueue(name, p, None)
+        if w is None:
+            return
+        if not w.event.wait(self.max_wait_s[p]) and self._abandon(name, w):
+            raise UpstreamOverloaded(f"{name}: no token within {self.max_wait_s[p]}s")
+
+    async def acquire_async(self, name: str, priority: Optional[int] = None) -> None:
+        """Coroutine flavour of :meth:`acquire`."""
+        p = current_priority() if priority is None else priority
+        w = self._enqueue(name, p, asyncio.get_running_loop())
+        if w is None:
+            return
+        try:
+            await asyncio.wait_for(w.future, self.max_wait_s[p])
+        except asyncio.TimeoutError:
+            if self._abandon(name, w):
+                raise UpstreamOverloaded(f"{name}: no token within {self.max_wait_s[p]}s")
+        except asyncio.CancelledError:
+            self._abandon(name, w)
+            raise
+
+    # -------------------------
+    # dispatcher
+    # -------------------------
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="upstream-scheduler", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """Grant whatever the buckets allow; returns seconds until the next grant is possible."""
+        next_s: Optional[float] = None
+        for lim in self._limiters.values():
+            while lim.heap:
+                w = lim.heap[0]
+                if w.state == _ABANDONED:
+                    heapq.heappop(lim.heap)
+                    continue
+                if not lim.bucket.try_take(now):
+                    d = lim.bucket.wait_s(now)
+                    next_s = d if next_s is None else min(next_s, d)
+                    break
+                heapq.heappop(lim.heap)
+                lim.queued[w.priority] -= 1
+                lim.counts["granted"] += 1
+                lim.waits[w.priority].append(now - w.enqueued_at)
+                w.grant()
+        return next_s
+
+    def _run(self) -> None:
+        with self._cond:
+            while not self._stopped:
+                self._cond.wait(self._dispatch(time.monotonic()))
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        out: Dict[str, Any] = {}
+        with self._cond:
+            for name, lim in self._limiters.items():
+                lim.bucket._refill(now)
+                d: Dict[str, Any] = {
+                    "rate": lim.bucket.rate,
+                    "burst": lim.bucket.burst,
+                    "tokens": round(lim.bucket.tokens, 2),
+                    "queued": {PRIORITY_NAMES[p]: n for p, n in lim.queued.items()},
+                    **lim.counts,
+                }
+                for p, xs in lim.waits.items():
+                    v = _pct(list(xs), 0.95)
+                    d[f"wait_s_p95_{PRIORITY_NAMES[p]}"] = round(v, 4) if v is not None else None
+                out[name] = d
+        return out
@@ -1,9 +1,14 @@
+from .async_client import AsyncStockClient
+from .bulk import BulkResult
+from .cache import MemoryCache, SQLiteCache, TieredCache
 from .client import StockClient
 from .config import SDKConfig, DecodoAuth, ProxyPool, RetryPolicy, YahooChartConfig
-from .errors import StockSDKError, ProxyAllFailed, UpstreamBlocked, UpstreamBadGateway
+from .errors import StockSDKError, ProxyAllFailed, UpstreamBlocked, UpstreamBadGateway, DeadlineExceeded
+from .pool import SessionPool
 
 __all__ = [
-    "StockClient",
+    "StockClient", "AsyncStockClient", "BulkResult",
     "SDKConfig", "DecodoAuth", "ProxyPool", "RetryPolicy", "YahooChartConfig",
-    "StockSDKError", "ProxyAllFailed", "UpstreamBlocked", "UpstreamBadGateway",
+    "StockSDKError", "ProxyAllFailed", "UpstreamBlocked", "UpstreamBadGateway", "DeadlineExceeded",
+    "SessionPool", "MemoryCache", "SQLiteCache", "TieredCache",
 ]
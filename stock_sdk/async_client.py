@@ -0,0 +1,113 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .async_http import AsyncProxyRotator
+from .bulk import BulkResult, expired, remaining_s, run_bulk_async
+from .cache import make_cache
+from .config import SDKConfig
+from .providers.yahoo_chart import AsyncYahooChartProvider
+from .providers.yahoo_spark import AsyncYahooSparkProvider, collect_closes
+
+
+class AsyncStockClient:
+    """
+    asyncio counterpart of :class:`stock_sdk.StockClient` (same config, same
+    methods, awaitable). Needs ``httpx``. Close it with :meth:`aclose` or use
+    it as ``async with AsyncStockClient(cfg) as c: ...``.
+    """
+
+    def __init__(self, cfg: SDKConfig, max_connections_per_route: int = 64):
+        self.cfg = cfg
+        self._http = AsyncProxyRotator(
+            auth=cfg.decodo,
+            pools=cfg.proxy_pools,
+            retry=cfg.retry,
+            headers_cfg=cfg.yahoo,
+            remember_last_good=cfg.remember_last_good,
+            cache_ttl_s=cfg.cache_ttl_s,
+            cache=make_cache(cfg.cache_ttl_s, cfg.cache_max_entries, cfg.cache_max_bytes, cfg.cache_path),
+            max_connections_per_route=max_connections_per_route,
+        )
+        self.hk = AsyncYahooChartProvider(self._http)
+        self.hk_spark = AsyncYahooSparkProvider(self._http, chunk_size=cfg.yahoo.spark_chunk_size)
+
+    async def __aenter__(self) -> "AsyncStockClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    # convenience wrappers
+    async def hk_latest_close(self, symbol: str, timeout_s: Optional[float] = None) -> float:
+        return await self.hk.latest_close(symbol, interval="1d", range_="10d", timeout_s=timeout_s)
+
+    async def hk_latest_closes(self, symbols: List[str], max_concurrency: int = 64) -> Dict[str, float]:
+        """Raises the first (in input order) symbol's error, like :meth:`StockClient.hk_latest_closes`."""
+        res = await self.hk_latest_closes_bulk(symbols, max_concurrency=max_concurrency)
+        res.raise_first(symbols)
+        return {s: res.values[s] for s in symbols}
+
+    async def hk_latest_closes_bulk(
+        self, symbols: List[str], max_concurrency: int = 64, timeout_s: Optional[float] = None
+    ) -> BulkResult[str, float]:
+        """
+        Spark chunks first, per-symbol chart fallback; see :meth:`StockClient.hk_latest_closes_bulk`.
+        ``timeout_s`` is one deadline for the whole call, shared by the chunks and the fallback.
+        """
+        t0 = time.monotonic()
+        chunks = self.hk_spark.chunks(symbols)
+        res = await run_bulk_async(
+            lambda c, t: self.hk_spark.fetch_spark_chunk(c, timeout_s=t),
+            chunks,
+            max_concurrency=max_concurrency,
+            timeout_s=timeout_s,
+            overall=True,
+        )
+        out, missing = collect_closes(chunks, res)
+        if missing:
+            left = remaining_s(timeout_s, t0)
+            fb = (
+                expired(missing, timeout_s)
+                if left == 0.0
+                else await run_bulk_async(
+                    self.hk_latest_close, missing, max_concurrency=max_concurrency, timeout_s=left, overall=True
+                )
+            )
+            out.values.update(fb.values)
+            out.errors.update(fb.errors)
+        out.elapsed_s = time.monotonic() - t0
+        return out
+
+    async def hk_kline(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> pd.DataFrame:
+        cj = await self.hk.fetch_chart(symbol, interval=interval, range_=range_, timeout_s=timeout_s)
+        return self.hk.to_dataframe(cj)
+
+    async def hk_klines(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        range_: str = "10d",
+        max_concurrency: int = 64,
+        timeout_s: Optional[float] = None,
+    ) -> BulkResult[str, pd.DataFrame]:
+        return await run_bulk_async(
+            lambda s, t: self.hk_kline(s, interval=interval, range_=range_, timeout_s=t),
+            symbols,
+            max_concurrency=max_concurrency,
+            timeout_s=timeout_s,
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Chart cache counters: ``{"memory": {...hits, misses, evictions, bytes...}, "persistent": {...} | None}``."""
+        return self._http.cache_stats()
+
+    def route_stats(self) -> Dict[str, dict]:
+        """Per-proxy-route success / latency EWMAs and circuit state (they order routes when hedging)."""
+        return self._http.route_stats()
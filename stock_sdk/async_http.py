@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:  # optional: only the async client needs it (pip install stock-sdk[async])
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
+from .cache import TieredCache
+from .config import DecodoAuth, RetryPolicy, YahooChartConfig, ProxyPool
+from .errors import DeadlineExceeded, ProxyAllFailed, StockSDKError, UpstreamBlocked, UpstreamBadGateway
+from .http import _RotatorBase, check_response
+from .routing import RouteSkipped, run_hedged_async
+
+
+class AsyncProxyRotator(_RotatorBase):
+    """
+    Coroutine flavour of :class:`stock_sdk.http.ProxyRotator`.
+
+    Same candidate order, ``RetryPolicy`` (timeouts, attempts per port, backoff
+    and between-port sleeps, now ``asyncio.sleep``), remember-last-good and
+    cache semantics, including hedging (where losing requests are cancelled).
+    One pooled ``httpx.AsyncClient`` is kept per proxy route, so thousands of
+    concurrent fetches share a few keep-alive connections per route. Waiting for a free pooled connection does not count
+    against ``timeout_s``; only connect/read do.
+    """
+
+    def __init__(
+        self,
+        auth: DecodoAuth,
+        pools: list[ProxyPool],
+        retry: RetryPolicy,
+        headers_cfg: YahooChartConfig,
+        remember_last_good: bool = True,
+        cache_ttl_s: int = 120,
+        max_connections_per_route: int = 64,
+        cache: Optional[TieredCache] = None,
+    ):
+        if httpx is None:
+            raise StockSDKError("AsyncProxyRotator requires httpx (pip install 'stock-sdk[async]')")
+        super().__init__(auth, pools, retry, headers_cfg, remember_last_good, cache_ttl_s, cache)
+        self._limits = httpx.Limits(
+            max_connections=max_connections_per_route,
+            max_keepalive_connections=max_connections_per_route,
+            keepalive_expiry=300.0,
+        )
+        self._clients: Dict[Tuple[str, int], "httpx.AsyncClient"] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _client(self, host: str, port: int) -> "httpx.AsyncClient":
+        c = self._clients.get((host, port))
+        if c is None:
+            c = self._clients[(host, port)] = httpx.AsyncClient(
+                proxy=self._proxy_url(host, port),
+                headers=self.headers,
+                timeout=httpx.Timeout(self.retry.timeout_s, pool=None),
+                limits=self._limits,
+            )
+        return c
+
+    def _count(self, host: str, port: int, field: str) -> None:
+        c = self._counts.setdefault(f"{host}:{port}", {"requests": 0, "errors": 0})
+        c[field] += 1
+
+    def session_stats(self) -> dict:
+        """Per-route request / error counts."""
+        return {"routes": {k: dict(v) for k, v in self._counts.items()}}
+
+    async def aclose(self) -> None:
+        clients: List["httpx.AsyncClient"] = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(c.aclose() for c in clients), return_exceptions=True)
+
+    async def _get_once(self, host: str, port: int, url: str, params: dict, timeout: float) -> dict:
+        c = self._client(host, port)
+        self._count(host, port, "requests")
+        try:
+            r = await c.get(
+                url,
+                params=params,
+                timeout=httpx.Timeout(timeout, pool=None),
+            )
+        except httpx.TransportError:
+            self._count(host, port, "errors")
+            raise
+        check_response(r.status_code, (r.headers.get("content-type") or "").lower())
+        return r.json()
+
+    async def get_json(self, url: str, params: dict, timeout_s: Optional[float] = None) -> dict:
+        """See :meth:`stock_sdk.http.ProxyRotator.get_json`."""
+        key = self._cache_key(url, params)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        deadline = self._deadline(timeout_s)
+        if self._hedge is not None:
+            return await self._get_json_hedged(url, params, key, deadline, timeout_s)
+        last_err: Optional[Exception] = None
+
+        for host, port in self._routes():
+            for _attempt in range(self.retry.max_attempts_per_port):
+                timeout = self._left(self.retry.timeout_s, deadline)
+                if timeout <= 0:
+                    raise DeadlineExceeded(f"No route answered within {timeout_s}s. last_err={last_err}")
+                t0 = time.monotonic()
+                try:
+                    data = await self._get_once(host, port, url, params, timeout)
+                    self._board.record_success((host, port), time.monotonic() - t0)
+                    self._succeeded(host, port, key, data)
+                    return data
+
+                except (httpx.TransportError, UpstreamBlocked, UpstreamBadGateway, ValueError) as e:
+                    # proxy tunnel errors / disconnects / timeouts / blocked or non-JSON answers
+                    last_err = e
+                    self._board.record_failure((host, port), time.monotonic() - t0)
+                    await asyncio.sleep(self._left(self.retry.backoff_on_error_s, deadline))
+
+            await asyncio.sleep(self._left(self.retry.sleep_between_ports_s, deadline))
+
+        raise ProxyAllFailed(f"All routes failed. last_err={last_err}")
+
+    async def _get_json_hedged(
+        self, url: str, params: dict, key, deadline: Optional[float], timeout_s: Optional[float]
+    ) -> dict:
+        """See :meth:`stock_sdk.http.ProxyRotator._get_json_hedged`; here the losing requests are cancelled."""
+
+        async def attempt(route: Tuple[str, int]):
+            host, port = route
+            err: Optional[Exception] = None
+            for i in range(self.retry.max_attempts_per_port):
+                if i:
+                    await asyncio.sleep(self._left(self.retry.backoff_on_error_s, deadline))
+                timeout = self._left(self.retry.timeout_s, deadline)
+                if timeout <= 0:
+                    raise err or RouteSkipped()
+                try:
+                    return route, await self._get_once(host, port, url, params, timeout)
+                except (httpx.TransportError, UpstreamBlocked, UpstreamBadGateway, ValueError) as e:
+                    err = e
+            raise err
+
+        try:
+            (host, port), data = await run_hedged_async(
+                attempt, self._hedged_routes(), self._board, self._hedge, ordered=True
+            )
+        except RouteSkipped:
+            raise DeadlineExceeded(f"No route answered within {timeout_s}s.")
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceeded(f"No route answered within {timeout_s}s. last_err={e}") from e
+            raise ProxyAllFailed(f"All routes failed. last_err={e}") from e
+        self._succeeded(host, port, key, data)
+        return data
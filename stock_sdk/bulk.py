@@ -0,0 +1,144 @@
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Sequence, TypeVar
+
+from .errors import DeadlineExceeded
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class BulkResult(Generic[K, V]):
+    """Per-key outcome of a bulk call: every requested key ends up in exactly one of ``values`` / ``errors``."""
+    values: Dict[K, V] = field(default_factory=dict)
+    errors: Dict[K, Exception] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def raise_first(self, order: Sequence[K]) -> None:
+        """Re-raise the error of the first failed key in ``order`` (the old fail-fast behaviour)."""
+        for k in order:
+            if k in self.errors:
+                raise self.errors[k]
+
+
+def remaining_s(timeout_s: Optional[float], t0: float) -> Optional[float]:
+    """What is left of a ``timeout_s`` budget started at monotonic ``t0`` (None: unbounded; never negative)."""
+    if timeout_s is None:
+        return None
+    return max(0.0, timeout_s - (time.monotonic() - t0))
+
+
+def expired(keys: Sequence[K], timeout_s: Optional[float]) -> BulkResult[K, V]:
+    """A :class:`BulkResult` failing every key with :class:`DeadlineExceeded` (budget spent before they ran)."""
+    out: BulkResult[K, V] = BulkResult()
+    for k in dict.fromkeys(keys):
+        out.errors[k] = DeadlineExceeded(f"{k}: no time left of the {timeout_s}s budget")
+    return out
+
+
+def run_bulk(
+    fn: Callable[[K, Optional[float]], V],
+    keys: Sequence[K],
+    max_workers: int = 8,
+    timeout_s: Optional[float] = None,
+    overall: bool = False,
+) -> BulkResult[K, V]:
+    """
+    ``fn(key, timeout_s)`` for every distinct key on at most ``max_workers`` threads.
+
+    ``timeout_s`` is a per-key budget counted from when that key's call
+    starts; with ``overall`` it is one budget for the whole batch, counted from
+    this call, and a key that starts late gets only what is left of it (keys
+    still queued when it runs out fail without being called). The budget is
+    passed on to ``fn`` (so failover stops trying new routes). As a backstop,
+    a call still running past its deadline is recorded as
+    :class:`DeadlineExceeded` and left to finish in the background.
+    One key failing never affects the others.
+    """
+    t0 = time.monotonic()
+    out: BulkResult[K, V] = BulkResult()
+    uniq = list(dict.fromkeys(keys))
+    if not uniq:
+        return out
+    started: Dict[K, float] = {}
+
+    def deadline(k: K) -> Optional[float]:
+        if timeout_s is None:
+            return None
+        if overall:
+            return t0 + timeout_s
+        return started[k] + timeout_s if k in started else None
+
+    def call(k: K) -> V:
+        started[k] = time.monotonic()
+        t = remaining_s(timeout_s, t0) if overall else timeout_s
+        if t == 0.0:
+            raise DeadlineExceeded(f"{k}: no time left of the {timeout_s}s budget")
+        return fn(k, t)
+
+    ex = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uniq))), thread_name_prefix="stock-sdk-bulk")
+    try:
+        pending = {ex.submit(call, k): k for k in uniq}
+        while pending:
+            wait_s = None
+            if timeout_s is not None:
+                ends = [d for d in map(deadline, pending.values()) if d is not None]
+                wait_s = max(0.0, min(ends) - time.monotonic()) + 0.05 if ends else timeout_s
+            done, _ = wait(list(pending), timeout=wait_s, return_when=FIRST_COMPLETED)
+            for f in done:
+                k = pending.pop(f)
+                try:
+                    out.values[k] = f.result()
+                except Exception as e:
+                    out.errors[k] = e
+            if timeout_s is not None:
+                now = time.monotonic()
+                for f, k in list(pending.items()):
+                    d = deadline(k)
+                    if d is not None and now > d + 0.05:
+                        f.cancel()
+                        pending.pop(f)
+                        out.errors[k] = DeadlineExceeded(f"{k}: no result within {timeout_s}s")
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    out.elapsed_s = time.monotonic() - t0
+    return out
+
+
+async def run_bulk_async(
+    fn: Callable[[K, Optional[float]], Awaitable[V]],
+    keys: Sequence[K],
+    max_concurrency: int = 64,
+    timeout_s: Optional[float] = None,
+    overall: bool = False,
+) -> BulkResult[K, V]:
+    """Coroutine flavour of :func:`run_bulk`; an overrunning call is cancelled instead of abandoned."""
+    t0 = time.monotonic()
+    out: BulkResult[K, V] = BulkResult()
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def one(k: K) -> None:
+        async with sem:
+            t = remaining_s(timeout_s, t0) if overall else timeout_s
+            try:
+                if t is None:
+                    out.values[k] = await fn(k, None)
+                elif t == 0.0:
+                    out.errors[k] = DeadlineExceeded(f"{k}: no time left of the {timeout_s}s budget")
+                else:
+                    out.values[k] = await asyncio.wait_for(fn(k, t), t + 0.05)
+            except asyncio.TimeoutError:
+                out.errors[k] = DeadlineExceeded(f"{k}: no result within {timeout_s}s")
+            except Exception as e:
+                out.errors[k] = e
+
+    await asyncio.gather(*(one(k) for k in dict.fromkeys(keys)))
+    out.elapsed_s = time.monotonic() - t0
+    return out
@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# per-entry bookkeeping (key tuple, dict slot, timestamps) on top of the encoded body
+_ENTRY_OVERHEAD = 200
+
+
+def _encode(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+class MemoryCache:
+    """
+    Thread-safe LRU + TTL cache of JSON-able values.
+
+    An entry expires ``ttl_s`` after it was created. Eviction is LRU, bounded by
+    both ``max_entries`` and ``max_bytes``. Bytes are measured as the compact
+    JSON encoding plus a fixed per-entry overhead. Expired entries are dropped
+    when they are read and whenever the cache is over its bounds.
+    """
+
+    def __init__(self, ttl_s: float = 120, max_entries: int = 2048, max_bytes: int = 64 << 20):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()  # key -> (created, value, nbytes)
+        self._bytes = 0
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "sets": 0}
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, n = self._data.pop(key)
+        self._bytes -= n
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            v = self._data.get(key)
+            if v is None:
+                self.counts["misses"] += 1
+                return None
+            if now - v[0] > self.ttl_s:
+                self._drop(key)
+                self.counts["expired"] += 1
+                self.counts["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.counts["hits"] += 1
+            return v[1]
+
+    def set(self, key: Hashable, data: Any, created: Optional[float] = None, nbytes: Optional[int] = None) -> None:
+        n = (nbytes if nbytes is not None else len(_encode(data))) + _ENTRY_OVERHEAD
+        if n > self.max_bytes:
+            return  # would evict everything else
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (created if created is not None else time.time(), data, n)
+            self._bytes += n
+            self.counts["sets"] += 1
+            if len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._shrink(time.time())
+
+    def _shrink(self, now: float) -> None:
+        for k in [k for k, v in self._data.items() if now - v[0] > self.ttl_s]:
+            self._drop(k)
+            self.counts["expired"] += 1
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            k = next(iter(self._data))
+            self._drop(k)
+            self.counts["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counts)
+            entries, nbytes = len(self._data), self._bytes
+        looked = c["hits"] + c["misses"]
+        return {
+            "entries": entries,
+            "bytes": nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **c,
+            "hit_ratio": round(c["hits"] / looked, 4) if looked else None,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent cache tier in one SQLite file, shared by every process on the host.
+
+    Values are stored as zlib-compressed JSON together with their creation
+    time, so a hit keeps its original age. The database runs in WAL mode,
+    which lets readers proceed while another process writes. Each thread uses
+    its own connection. Expired rows are pruned about every ``prune_every``
+    writes. Errors (locked or corrupt file, full disk) are counted and
+    treated as misses, so the cache never fails a fetch.
+    """
+
+    def __init__(self, path: str, ttl_s: float = 120, prune_every: int = 256):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counts = {"hits": 0, "misses": 0, "sets": 0, "errors": 0, "pruned": 0}
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, created REAL NOT NULL, body BLOB NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"), default=str)
+
+    def _bump(self, field: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[field] += n
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any, int]]:
+        """(created, value, encoded size) or None."""
+        try:
+            row = self._conn().execute(
+                "SELECT created, body FROM cache WHERE k = ? AND created > ?", (self._key(key), time.time() - self.ttl_s)
+            ).fetchone()
+            if row is None:
+                self._bump("misses")
+                return None
+            raw = zlib.decompress(row[1])
+            self._bump("hits")
+            return row[0], json.loads(raw), len(raw)
+        except (sqlite3.Error, zlib.error, ValueError):
+            self._bump("errors")
+            return None
+
+    def set(self, key: Hashable, data: Any, created: Optional[float] = None, raw: Optional[bytes] = None) -> None:
+        try:
+            body = zlib.compress(raw if raw is not None else _encode(data), 3)
+            c = self._conn()
+            c.execute(
+                "INSERT OR REPLACE INTO cache (k, created, body) VALUES (?, ?, ?)",
+                (self._key(key), created if created is not None else time.time(), body),
+            )
+            with self._lock:
+                self.counts["sets"] += 1
+                self._writes += 1
+                prune = self._writes % self.prune_every == 0
+            if prune:
+                n = c.execute("DELETE FROM cache WHERE created <= ?", (time.time() - self.ttl_s,)).rowcount
+                self._bump("pruned", max(n, 0))
+        except sqlite3.Error:
+            self._bump("errors")
+
+    def clear(self) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache")
+        except sqlite3.Error:
+            self._bump("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counts)
+        return {"path": self.path, **c}
+
+
+class TieredCache:
+    """
+    :class:`MemoryCache` in front of an optional :class:`SQLiteCache`.
+
+    A memory miss falls through to the persistent tier, and a hit there is
+    promoted into memory with its original creation time. Writes go to both
+    tiers. Drop-in for the old per-rotator ``_TTLCache`` (``get`` / ``set``).
+    """
+
+    def __init__(self, memory: MemoryCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        v = self.memory.get(key)
+        if v is not None or self.persistent is None:
+            return v
+        hit = self.persistent.get(key)
+        if hit is None:
+            return None
+        created, data, n = hit
+        self.memory.set(key, data, created=created, nbytes=n)
+        return data
+
+    def set(self, key: Hashable, data: Any) -> None:
+        raw = _encode(data)
+        now = time.time()
+        self.memory.set(key, data, created=now, nbytes=len(raw))
+        if self.persistent is not None:
+            self.persistent.set(key, data, created=now, raw=raw)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
+
+
+def make_cache(
+    ttl_s: float, max_entries: int = 2048, max_bytes: int = 64 << 20, path: Optional[str] = None
+) -> TieredCache:
+    return TieredCache(
+        MemoryCache(ttl_s=ttl_s, max_entries=max_entries, max_bytes=max_bytes),
+        SQLiteCache(path, ttl_s=ttl_s) if path else None,
+    )
@@ -1,10 +1,14 @@
-from typing import Dict, List
+import time
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from .bulk import BulkResult, expired, remaining_s, run_bulk
+from .cache import make_cache
 from .config import SDKConfig
 from .http import ProxyRotator
 from .providers.yahoo_chart import YahooChartProvider
+from .providers.yahoo_spark import YahooSparkProvider, collect_closes
 
 
 class StockClient:
@@ -23,19 +27,82 @@ class StockClient:
             headers_cfg=cfg.yahoo,
             remember_last_good=cfg.remember_last_good,
             cache_ttl_s=cfg.cache_ttl_s,
+            cache=make_cache(cfg.cache_ttl_s, cfg.cache_max_entries, cfg.cache_max_bytes, cfg.cache_path),
         )
         self.hk = YahooChartProvider(self._http)
+        self.hk_spark = YahooSparkProvider(self._http, chunk_size=cfg.yahoo.spark_chunk_size)
 
     # convenience wrappers
-    def hk_latest_close(self, symbol: str) -> float:
-        return self.hk.latest_close(symbol, interval="1d", range_="10d")
+    def hk_latest_close(self, symbol: str, timeout_s: Optional[float] = None) -> float:
+        return self.hk.latest_close(symbol, interval="1d", range_="10d", timeout_s=timeout_s)
 
-    def hk_latest_closes(self, symbols: List[str]) -> Dict[str, float]:
-        out = {}
-        for s in symbols:
-            out[s] = self.hk_latest_close(s)
+    def hk_latest_closes(self, symbols: List[str], max_workers: int = 8) -> Dict[str, float]:
+        """Concurrent; raises the first (in input order) symbol's error like the old sequential loop did."""
+        res = self.hk_latest_closes_bulk(symbols, max_workers=max_workers)
+        res.raise_first(symbols)
+        return {s: res.values[s] for s in symbols}
+
+    def hk_latest_closes_bulk(
+        self, symbols: List[str], max_workers: int = 8, timeout_s: Optional[float] = None
+    ) -> BulkResult[str, float]:
+        """
+        Latest close for many symbols: one spark request per chunk of
+        ``cfg.yahoo.spark_chunk_size`` symbols, ``max_workers`` chunks at a time.
+        Symbols of failed chunks and symbols the spark answer lacks fall back
+        to a per-symbol chart fetch. ``timeout_s`` is one deadline for the whole
+        call, counted from when it starts: a chunk that waited for a worker and
+        the chart fallback both get only what is left of it. Failures
+        (``ProxyAllFailed``, ``DeadlineExceeded``, missing data) land in
+        ``.errors`` and never abort the batch.
+        """
+        t0 = time.monotonic()
+        chunks = self.hk_spark.chunks(symbols)
+        res = run_bulk(
+            lambda c, t: self.hk_spark.fetch_spark_chunk(c, timeout_s=t),
+            chunks,
+            max_workers=max_workers,
+            timeout_s=timeout_s,
+            overall=True,
+        )
+        out, missing = collect_closes(chunks, res)
+        if missing:
+            left = remaining_s(timeout_s, t0)
+            fb = (
+                expired(missing, timeout_s)
+                if left == 0.0
+                else run_bulk(self.hk_latest_close, missing, max_workers=max_workers, timeout_s=left, overall=True)
+            )
+            out.values.update(fb.values)
+            out.errors.update(fb.errors)
+        out.elapsed_s = time.monotonic() - t0
         return out
 
-    def hk_kline(self, symbol: str, interval: str = "1d", range_: str = "10d") -> pd.DataFrame:
-        cj = self.hk.fetch_chart(symbol, interval=interval, range_=range_)
+    def hk_kline(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> pd.DataFrame:
+        cj = self.hk.fetch_chart(symbol, interval=interval, range_=range_, timeout_s=timeout_s)
         return self.hk.to_dataframe(cj)
+
+    def hk_klines(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        range_: str = "10d",
+        max_workers: int = 8,
+        timeout_s: Optional[float] = None,
+    ) -> BulkResult[str, pd.DataFrame]:
+        """Bulk :meth:`hk_kline`: one DataFrame per symbol in ``.values``, per-symbol failures in ``.errors``."""
+        return run_bulk(
+            lambda s, t: self.hk_kline(s, interval=interval, range_=range_, timeout_s=t),
+            symbols,
+            max_workers=max_workers,
+            timeout_s=timeout_s,
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Chart cache counters: ``{"memory": {...hits, misses, evictions, bytes...}, "persistent": {...} | None}``."""
+        return self._http.cache_stats()
+
+    def route_stats(self) -> Dict[str, dict]:
+        """Per-proxy-route success / latency EWMAs and circuit state (they order routes when hedging)."""
+        return self._http.route_stats()
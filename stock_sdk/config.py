@@ -21,12 +21,22 @@ class RetryPolicy:
     max_attempts_per_port: int = 1
     sleep_between_ports_s: float = 0.8
     backoff_on_error_s: float = 2.0
+    # hedging (> 1 enables): when the running routes have not answered within the
+    # hedge delay, launch the next-best one, up to this many in flight; routes are
+    # ordered by their observed latency / failure rate instead of the pool order
+    hedge_max_parallel: int = 1
+    # hedge delay until enough latencies are seen; then the p90 of recent successes
+    hedge_delay_s: float = 1.0
 
 
 @dataclass(frozen=True)
 class YahooChartConfig:
     user_agent: str = "Mozilla/5.0"
     accept: str = "application/json,text/plain,*/*"
+    # override to point the providers at a mirror or a local fake upstream
+    base_url: str = "https://query1.finance.yahoo.com"
+    # symbols per spark request (Yahoo rejects much larger batches)
+    spark_chunk_size: int = 20
 
 
 @dataclass(frozen=True)
@@ -36,5 +46,9 @@ class SDKConfig:
     retry: RetryPolicy = RetryPolicy()
     yahoo: YahooChartConfig = YahooChartConfig()
     remember_last_good: bool = True
-    # simple in-memory ttl cache for chart JSON
+    # chart JSON cache: bounded in-memory LRU + TTL ...
     cache_ttl_s: int = 120
+    cache_max_entries: int = 2048
+    cache_max_bytes: int = 64 << 20
+    # ... optionally backed by a SQLite file shared by every process on the host
+    cache_path: Optional[str] = None
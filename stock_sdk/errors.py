@@ -12,3 +12,7 @@ class UpstreamBlocked(StockSDKError):
 
 class UpstreamBadGateway(StockSDKError):
     """Proxy / gateway issues like 502, disconnects."""
+
+
+class DeadlineExceeded(ProxyAllFailed):
+    """The call's time budget ran out before any route answered."""
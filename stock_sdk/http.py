@@ -1,37 +1,30 @@
+import threading
 import time
-from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
+from .cache import TieredCache, make_cache
 from .config import DecodoAuth, RetryPolicy, YahooChartConfig, ProxyPool
-from .errors import ProxyAllFailed, UpstreamBlocked, UpstreamBadGateway
-
-
-@dataclass
-class _TTLCache:
-    ttl_s: int
-    store: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[float, dict]]
-
-    def get(self, key):
-        v = self.store.get(key)
-        if not v:
-            return None
-        ts, data = v
-        if time.time() - ts > self.ttl_s:
-            self.store.pop(key, None)
-            return None
-        return data
+from .errors import DeadlineExceeded, ProxyAllFailed, UpstreamBlocked, UpstreamBadGateway
+from .pool import SessionPool
+from .routing import HedgePolicy, RouteScoreboard, RouteSkipped, run_hedged
 
-    def set(self, key, data):
-        self.store[key] = (time.time(), data)
 
+def check_response(status: int, ctype: str) -> None:
+    """Raise for anything but a JSON 200 (shared by the sync and async rotators)."""
+    # common blocked patterns: 429, html, empty
+    if status == 429 or "text/html" in ctype:
+        raise UpstreamBlocked(f"{status} {ctype}")
+    if status >= 500:
+        raise UpstreamBadGateway(f"{status} {ctype}")
+    if status != 200 or "json" not in ctype:
+        raise UpstreamBlocked(f"{status} {ctype}")
 
-class ProxyRotator:
-    """
-    Try (host,port) candidates until upstream returns JSON 200.
-    Remembers last good route if enabled.
-    """
+
+class _RotatorBase:
+    """Route order, last-good memory, chart cache and deadlines shared by :class:`ProxyRotator` and the async rotator."""
 
     def __init__(
         self,
@@ -41,6 +34,7 @@ class ProxyRotator:
         headers_cfg: YahooChartConfig,
         remember_last_good: bool = True,
         cache_ttl_s: int = 120,
+        cache: Optional[TieredCache] = None,
     ):
         self.auth = auth
         self.pools = pools
@@ -48,72 +42,206 @@ class ProxyRotator:
         self.headers_cfg = headers_cfg
         self.remember_last_good = remember_last_good
         self._last_good: Optional[Tuple[str, int]] = None
-        self._cache = _TTLCache(ttl_s=cache_ttl_s, store={})
+        self._cache = cache if cache is not None else make_cache(cache_ttl_s)
+        # per-route latency / failure stats; in hedging mode they also decide the try order
+        self._board = RouteScoreboard(default_latency_s=retry.hedge_delay_s)
+        self._hedge: Optional[HedgePolicy] = None
+        if retry.hedge_max_parallel > 1:
+            self._hedge = HedgePolicy(
+                max_parallel=retry.hedge_max_parallel,
+                default_delay_s=retry.hedge_delay_s,
+                min_delay_s=min(0.3, retry.hedge_delay_s),
+            )
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"User-Agent": self.headers_cfg.user_agent, "Accept": self.headers_cfg.accept}
 
     def _proxy_url(self, host: str, port: int) -> str:
         return f"http://{self.auth.username}:{self.auth.password_urlencoded}@{host}:{port}"
 
-    def _session(self, host: str, port: int) -> requests.Session:
-        p = self._proxy_url(host, port)
-        s = requests.Session()
-        s.proxies.update({"http": p, "https": p})
-        s.headers.update({
-            "User-Agent": self.headers_cfg.user_agent,
-            "Accept": self.headers_cfg.accept,
-        })
-        return s
-
-    def get_json(self, url: str, params: dict) -> dict:
-        # cache key: url + sorted params
-        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
-        cached = self._cache.get(key)
-        if cached is not None:
-            return cached
+    @staticmethod
+    def _cache_key(url: str, params: dict):
+        # url + sorted params
+        return (url, tuple(sorted((k, str(v)) for k, v in params.items())))
 
-        ordered: list[Tuple[str, list[int]]] = []
+    def _routes(self) -> List[Tuple[str, int]]:
+        """Candidates in try order: last good first (if remembered), then every pool's ports."""
+        ordered: List[Tuple[str, int]] = []
         if self.remember_last_good and self._last_good:
-            h, p = self._last_good
-            ordered.append((h, [p]))
+            ordered.append(self._last_good)
         for pool in self.pools:
-            ordered.append((pool.host, pool.ports))
+            ordered.extend((pool.host, port) for port in pool.ports)
+        return ordered
+
+    def _pool_routes(self) -> List[Tuple[str, int]]:
+        return list(dict.fromkeys((pool.host, port) for pool in self.pools for port in pool.ports))
 
+    def _hedged_routes(self) -> List[Tuple[str, int]]:
+        """Scoreboard order, with the last good route (if remembered and healthy) moved to the front."""
+        routes = self._board.order(self._pool_routes())
+        last = self._last_good if self.remember_last_good else None
+        if last in routes and self._board.is_closed(last):
+            routes.remove(last)
+            routes.insert(0, last)
+        return routes
+
+    def _succeeded(self, host: str, port: int, key, data: dict) -> None:
+        if self.remember_last_good:
+            self._last_good = (host, port)
+        self._cache.set(key, data)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def route_stats(self) -> Dict[str, dict]:
+        """Per-route success / latency EWMAs and circuit state."""
+        return self._board.snapshot()
+
+    @staticmethod
+    def _deadline(timeout_s: Optional[float]) -> Optional[float]:
+        return time.monotonic() + timeout_s if timeout_s is not None else None
+
+    @staticmethod
+    def _left(budget: float, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return budget
+        return max(0.0, min(budget, deadline - time.monotonic()))
+
+
+class ProxyRotator(_RotatorBase):
+    """
+    Try (host,port) candidates until upstream returns JSON 200.
+    Remembers last good route if enabled, or races the best-scoring routes
+    when ``RetryPolicy.hedge_max_parallel`` > 1.
+    """
+
+    def __init__(
+        self,
+        auth: DecodoAuth,
+        pools: list[ProxyPool],
+        retry: RetryPolicy,
+        headers_cfg: YahooChartConfig,
+        remember_last_good: bool = True,
+        cache_ttl_s: int = 120,
+        cache: Optional[TieredCache] = None,
+    ):
+        super().__init__(auth, pools, retry, headers_cfg, remember_last_good, cache_ttl_s, cache)
+        self._pool = SessionPool(headers=self.headers, trust_env=True)
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_pool_lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # created on first hedged call; shared by concurrent get_json calls
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="stock-sdk-route")
+            return self._hedge_pool
+
+    def _session(self, host: str, port: int) -> requests.Session:
+        # pooled keep-alive session per route (reused across calls)
+        return self._pool.get(host, port, self._proxy_url(host, port))
+
+    def session_stats(self) -> dict:
+        """Per-route connection reuse statistics of the session pool."""
+        return self._pool.stats()
+
+    def _get_once(self, host: str, port: int, url: str, params: dict, timeout: float) -> dict:
+        s = self._session(host, port)
+        try:
+            r = s.get(url, params=params, timeout=timeout)
+        except requests.exceptions.RequestException:
+            self._pool.mark_error(host, port, self._proxy_url(host, port))
+            raise
+        check_response(r.status_code, (r.headers.get("content-type") or "").lower())
+        return r.json()
+
+    def get_json(self, url: str, params: dict, timeout_s: Optional[float] = None) -> dict:
+        """
+        ``timeout_s`` bounds the whole call: request timeouts and backoff sleeps
+        are clipped to what is left, and no new route is tried once it is spent
+        (raises :class:`DeadlineExceeded`).
+
+        With ``RetryPolicy.hedge_max_parallel`` > 1 the routes are raced instead
+        of tried one by one (see :meth:`_get_json_hedged`).
+        """
+        key = self._cache_key(url, params)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        deadline = self._deadline(timeout_s)
+        if self._hedge is not None:
+            return self._get_json_hedged(url, params, key, deadline, timeout_s)
         last_err: Optional[Exception] = None
 
-        for host, ports in ordered:
-            for port in ports:
-                for _attempt in range(self.retry.max_attempts_per_port):
-                    s = self._session(host, port)
-                    try:
-                        r = s.get(url, params=params, timeout=self.retry.timeout_s)
-                        ctype = (r.headers.get("content-type") or "").lower()
-
-                        # common blocked patterns: 429, html, empty
-                        if r.status_code == 429 or "text/html" in ctype:
-                            raise UpstreamBlocked(f"{r.status_code} {ctype}")
-                        if r.status_code >= 500:
-                            raise UpstreamBadGateway(f"{r.status_code} {ctype}")
-                        if r.status_code != 200 or "json" not in ctype:
-                            raise UpstreamBlocked(f"{r.status_code} {ctype}")
-
-                        data = r.json()
-
-                        if self.remember_last_good:
-                            self._last_good = (host, port)
-
-                        self._cache.set(key, data)
-                        return data
-
-                    except (requests.exceptions.ProxyError,
-                            requests.exceptions.SSLError,
-                            requests.exceptions.ConnectionError,
-                            requests.exceptions.Timeout) as e:
-                        # proxy tunnel errors / disconnects
-                        last_err = e
-                        time.sleep(self.retry.backoff_on_error_s)
-                    except (UpstreamBlocked, UpstreamBadGateway, ValueError) as e:
-                        last_err = e
-                        time.sleep(self.retry.backoff_on_error_s)
-
-                time.sleep(self.retry.sleep_between_ports_s)
+        for host, port in self._routes():
+            for _attempt in range(self.retry.max_attempts_per_port):
+                # checked here, not just by the clock: requests rejects timeout=0
+                timeout = self._left(self.retry.timeout_s, deadline)
+                if timeout <= 0:
+                    raise DeadlineExceeded(f"No route answered within {timeout_s}s. last_err={last_err}")
+                t0 = time.monotonic()
+                try:
+                    data = self._get_once(host, port, url, params, timeout)
+                    self._board.record_success((host, port), time.monotonic() - t0)
+                    self._succeeded(host, port, key, data)
+                    return data
+
+                except (requests.exceptions.ProxyError,
+                        requests.exceptions.SSLError,
+                        requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout,
+                        UpstreamBlocked, UpstreamBadGateway, ValueError) as e:
+                    # proxy tunnel errors / disconnects / blocked or non-JSON answers
+                    last_err = e
+                    self._board.record_failure((host, port), time.monotonic() - t0)
+                    time.sleep(self._left(self.retry.backoff_on_error_s, deadline))
+
+            time.sleep(self._left(self.retry.sleep_between_ports_s, deadline))
 
         raise ProxyAllFailed(f"All routes failed. last_err={last_err}")
+
+    def _get_json_hedged(
+        self, url: str, params: dict, key, deadline: Optional[float], timeout_s: Optional[float]
+    ) -> dict:
+        """
+        Race routes best-first (the last good route, then by the scoreboard):
+        when the running ones have not answered within the hedge delay, the
+        next-best is launched; a failed route is replaced right away (no
+        ``sleep_between_ports_s``). The first valid JSON wins. Requests already
+        on the wire cannot be interrupted, but losers stop retrying once a
+        winner is in.
+        """
+        won = threading.Event()
+
+        def attempt(route: Tuple[str, int]):
+            host, port = route
+            err: Optional[Exception] = None
+            for i in range(self.retry.max_attempts_per_port):
+                if i:
+                    if won.is_set():
+                        break
+                    time.sleep(self._left(self.retry.backoff_on_error_s, deadline))
+                timeout = self._left(self.retry.timeout_s, deadline)
+                if timeout <= 0:
+                    raise err or RouteSkipped()
+                try:
+                    return route, self._get_once(host, port, url, params, timeout)
+                except (requests.exceptions.RequestException, UpstreamBlocked, UpstreamBadGateway, ValueError) as e:
+                    err = e
+            raise err
+
+        try:
+            (host, port), data = run_hedged(
+                attempt, self._hedged_routes(), self._board, self._executor(), self._hedge, ordered=True
+            )
+        except RouteSkipped:
+            raise DeadlineExceeded(f"No route answered within {timeout_s}s.")
+        except Exception as e:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceeded(f"No route answered within {timeout_s}s. last_err={e}") from e
+            raise ProxyAllFailed(f"All routes failed. last_err={e}") from e
+        finally:
+            won.set()
+        self._succeeded(host, port, key, data)
+        return data
@@ -0,0 +1,142 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (host, port, proxy_url): host/port of the route (proxy endpoint, or upstream host when direct)
+RouteKey = Tuple[Optional[str], Optional[int], Optional[str]]
+
+
+@dataclass
+class _Entry:
+    session: requests.Session
+    adapter: HTTPAdapter
+    created: float
+    last_used: float
+    checkouts: int = 0
+    requests: int = 0
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class SessionPool:
+    """
+    Long-lived keep-alive ``requests.Session`` per route.
+
+    One session (with its own urllib3 connection pools) is kept per
+    (host, port, proxy) and reused across requests, so repeated calls skip TCP,
+    TLS and proxy CONNECT setup. Sessions idle for longer than ``idle_ttl_s`` are
+    closed on the next checkout. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        idle_ttl_s: float = 300.0,
+        trust_env: bool = False,
+    ):
+        self.headers = dict(headers or {})
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_ttl_s = idle_ttl_s
+        self.trust_env = trust_env
+        self._lock = threading.Lock()
+        self._entries: Dict[RouteKey, _Entry] = {}
+        self._evicted = 0
+
+    def _new_entry(self, proxy: Optional[str]) -> _Entry:
+        s = requests.Session()
+        s.trust_env = self.trust_env
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        if proxy:
+            s.proxies.update({"http": proxy, "https": proxy})
+        s.headers.update(self.headers)
+        now = time.monotonic()
+        entry = _Entry(session=s, adapter=adapter, created=now, last_used=now)
+
+        def _count(r, *args, **kwargs):
+            with entry.lock:
+                entry.requests += 1
+            return r
+
+        s.hooks["response"].append(_count)
+        return entry
+
+    def get(self, host: Optional[str] = None, port: Optional[int] = None, proxy: Optional[str] = None) -> requests.Session:
+        key = (host, port, proxy)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._new_entry(proxy)
+                self._entries[key] = entry
+            entry.last_used = now
+            entry.checkouts += 1
+            return entry.session
+
+    def mark_error(self, host: Optional[str] = None, port: Optional[int] = None, proxy: Optional[str] = None) -> None:
+        """Record a failed request on a route (connection errors never reach the response hook)."""
+        with self._lock:
+            entry = self._entries.get((host, port, proxy))
+        if entry is not None:
+            with entry.lock:
+                entry.errors += 1
+
+    def _evict_idle(self, now: float) -> None:
+        stale = [k for k, e in self._entries.items() if now - e.last_used > self.idle_ttl_s]
+        for k in stale:
+            self._entries.pop(k).session.close()
+            self._evicted += 1
+
+    def close(self) -> None:
+        with self._lock:
+            for e in self._entries.values():
+                e.session.close()
+            self._entries.clear()
+
+    @staticmethod
+    def _conn_pools(adapter: HTTPAdapter) -> Iterable:
+        managers = [adapter.poolmanager, *getattr(adapter, "proxy_manager", {}).values()]
+        for m in managers:
+            if m is None:
+                continue
+            for k in m.pools.keys():
+                p = m.pools.get(k)
+                if p is not None:
+                    yield p
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Per-route reuse stats. ``connections_opened`` counts new TCP (or proxy
+        tunnel) connections; ``reuse_ratio`` is the share of requests served on
+        an already-open connection.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+            evicted = self._evicted
+        routes = {}
+        for (host, port, proxy), e in entries:
+            opened = sum(p.num_connections for p in self._conn_pools(e.adapter))
+            with e.lock:
+                reqs, errs = e.requests, e.errors
+            label = f"{host or 'direct'}:{port}" if port is not None else (host or "direct")
+            routes[label] = {
+                "proxied": proxy is not None,
+                "checkouts": e.checkouts,
+                "requests": reqs,
+                "errors": errs,
+                "connections_opened": opened,
+                "reuse_ratio": round(1.0 - opened / reqs, 4) if reqs else None,
+                "age_s": round(now - e.created, 1),
+                "idle_s": round(now - e.last_used, 1),
+            }
+        return {"routes": routes, "evicted": evicted}
@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 import pandas as pd
 
+from ..async_http import AsyncProxyRotator
 from ..http import ProxyRotator
 
 
@@ -24,10 +25,18 @@ class YahooChartProvider:
     def __init__(self, http: ProxyRotator):
         self.http = http
 
-    def fetch_chart(self, symbol: str, interval: str = "1d", range_: str = "10d") -> dict:
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-        params = {"interval": interval, "range": range_}
-        return self.http.get_json(url, params)
+    def fetch_chart(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> dict:
+        url, params = self.chart_request(symbol, interval, range_, self.http.headers_cfg.base_url)
+        return self.http.get_json(url, params, timeout_s=timeout_s)
+
+    @staticmethod
+    def chart_request(
+        symbol: str, interval: str, range_: str, base_url: str = "https://query1.finance.yahoo.com"
+    ) -> Tuple[str, dict]:
+        url = f"{base_url}/v8/finance/chart/{symbol}"
+        return url, {"interval": interval, "range": range_}
 
     def to_dataframe(self, chart_json: dict) -> pd.DataFrame:
         result = chart_json["chart"]["result"][0]
@@ -42,11 +51,36 @@ class YahooChartProvider:
         }, index=pd.to_datetime(ts, unit="s"))
         return df
 
-    def latest_close(self, symbol: str, interval: str = "1d", range_: str = "10d") -> float:
-        cj = self.fetch_chart(symbol, interval=interval, range_=range_)
-        result = cj["chart"]["result"][0]
+    def latest_close(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> float:
+        cj = self.fetch_chart(symbol, interval=interval, range_=range_, timeout_s=timeout_s)
+        return self.last_close(cj, symbol)
+
+    @staticmethod
+    def last_close(chart_json: dict, symbol: str = "") -> float:
+        result = chart_json["chart"]["result"][0]
         closes = result["indicators"]["quote"][0]["close"]
         for v in reversed(closes):
             if v is not None:
                 return float(v)
-        raise ValueError(f"No close for {symbol}")
\ No newline at end of file
+        raise ValueError(f"No close for {symbol}")
+
+
+class AsyncYahooChartProvider(YahooChartProvider):
+    """:class:`YahooChartProvider` over an :class:`AsyncProxyRotator`; fetches are coroutines."""
+
+    def __init__(self, http: AsyncProxyRotator):
+        super().__init__(http)  # type: ignore[arg-type]
+
+    async def fetch_chart(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> dict:
+        url, params = self.chart_request(symbol, interval, range_, self.http.headers_cfg.base_url)
+        return await self.http.get_json(url, params, timeout_s=timeout_s)
+
+    async def latest_close(
+        self, symbol: str, interval: str = "1d", range_: str = "10d", timeout_s: Optional[float] = None
+    ) -> float:
+        cj = await self.fetch_chart(symbol, interval=interval, range_=range_, timeout_s=timeout_s)
+        return self.last_close(cj, symbol)
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..async_http import AsyncProxyRotator
+from ..bulk import BulkResult
+from ..http import ProxyRotator
+
+Chunk = Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class YahooSpark:
+    """Short close series of one symbol from the spark endpoint."""
+    symbol: str
+    timestamps: List[int]
+    closes: List[Optional[float]]
+    previous_close: Optional[float] = None
+
+    def last_close(self) -> float:
+        for v in reversed(self.closes):
+            if v is not None:
+                return float(v)
+        raise ValueError(f"No close for {self.symbol}")
+
+
+class YahooSparkProvider:
+    """
+    Yahoo spark endpoint: latest closes and short series for many symbols in
+    one request (``symbols=a,b,c``; no cookie/crumb). Yahoo caps a request at
+    about 20 symbols, so longer lists are split into ``chunk_size`` chunks,
+    one proxied request each (cached like chart JSON).
+    """
+
+    def __init__(self, http: ProxyRotator, chunk_size: int = 20):
+        self.http = http
+        self.chunk_size = max(1, chunk_size)
+
+    def chunks(self, symbols: Sequence[str]) -> List[Chunk]:
+        uniq = list(dict.fromkeys(symbols))
+        return [tuple(uniq[i:i + self.chunk_size]) for i in range(0, len(uniq), self.chunk_size)]
+
+    @staticmethod
+    def spark_request(symbols: Sequence[str], interval: str, range_: str, base_url: str) -> Tuple[str, dict]:
+        return f"{base_url}/v8/finance/spark", {"symbols": ",".join(symbols), "interval": interval, "range": range_}
+
+    def fetch_spark_chunk(
+        self, symbols: Sequence[str], interval: str = "1d", range_: str = "5d", timeout_s: Optional[float] = None
+    ) -> Dict[str, YahooSpark]:
+        """One request for up to ``chunk_size`` symbols; symbols Yahoo does not know are absent from the result."""
+        url, params = self.spark_request(symbols, interval, range_, self.http.headers_cfg.base_url)
+        return self.parse(self.http.get_json(url, params, timeout_s=timeout_s))
+
+    def fetch_spark(
+        self, symbols: Sequence[str], interval: str = "1d", range_: str = "5d", timeout_s: Optional[float] = None
+    ) -> Dict[str, YahooSpark]:
+        """All ``symbols``, chunk by chunk (``timeout_s`` applies to each request)."""
+        out: Dict[str, YahooSpark] = {}
+        for chunk in self.chunks(symbols):
+            out.update(self.fetch_spark_chunk(chunk, interval=interval, range_=range_, timeout_s=timeout_s))
+        return out
+
+    @staticmethod
+    def parse(spark_json: dict) -> Dict[str, YahooSpark]:
+        """
+        Accepts both shapes Yahoo serves: v8 ``{symbol: {timestamp, close, ...}}``
+        and v7 ``{"spark": {"result": [{"symbol", "response": [chart result]}]}}``.
+        """
+        out: Dict[str, YahooSpark] = {}
+        if "spark" in spark_json:
+            for item in (spark_json["spark"] or {}).get("result") or []:
+                for r in item.get("response") or []:
+                    meta = r.get("meta") or {}
+                    quote = (r.get("indicators") or {}).get("quote") or [{}]
+                    sym = item.get("symbol") or meta.get("symbol")
+                    out[sym] = YahooSpark(
+                        symbol=sym,
+                        timestamps=r.get("timestamp") or [],
+                        closes=quote[0].get("close") or [],
+                        previous_close=meta.get("chartPreviousClose"),
+                    )
+            return out
+        for sym, v in spark_json.items():
+            if not isinstance(v, dict):
+                continue
+            out[sym] = YahooSpark(
+                symbol=v.get("symbol") or sym,
+                timestamps=v.get("timestamp") or [],
+                closes=v.get("close") or [],
+                previous_close=v.get("chartPreviousClose", v.get("previousClose")),
+            )
+        return out
+
+
+class AsyncYahooSparkProvider(YahooSparkProvider):
+    """:class:`YahooSparkProvider` over an :class:`AsyncProxyRotator`; fetches are coroutines."""
+
+    def __init__(self, http: AsyncProxyRotator, chunk_size: int = 20):
+        super().__init__(http, chunk_size)  # type: ignore[arg-type]
+
+    async def fetch_spark_chunk(
+        self, symbols: Sequence[str], interval: str = "1d", range_: str = "5d", timeout_s: Optional[float] = None
+    ) -> Dict[str, YahooSpark]:
+        url, params = self.spark_request(symbols, interval, range_, self.http.headers_cfg.base_url)
+        return self.parse(await self.http.get_json(url, params, timeout_s=timeout_s))
+
+    async def fetch_spark(
+        self, symbols: Sequence[str], interval: str = "1d", range_: str = "5d", timeout_s: Optional[float] = None
+    ) -> Dict[str, YahooSpark]:
+        out: Dict[str, YahooSpark] = {}
+        for chunk in self.chunks(symbols):
+            out.update(await self.fetch_spark_chunk(chunk, interval=interval, range_=range_, timeout_s=timeout_s))
+        return out
+
+
+def collect_closes(
+    chunks: Sequence[Chunk], res: BulkResult[Chunk, Dict[str, YahooSpark]]
+) -> Tuple[BulkResult[str, float], List[str]]:
+    """
+    Per-chunk spark results -> (per-symbol latest closes, symbols to fetch one
+    by one). The symbols of a failed chunk, and those absent from a successful
+    answer or without any close, are returned for the per-symbol chart
+    fallback (a chunk can fail for one bad symbol or one bad route).
+    """
+    out: BulkResult[str, float] = BulkResult()
+    missing: List[str] = []
+    for chunk in chunks:
+        if chunk in res.errors:
+            missing.extend(chunk)
+            continue
+        got = res.values.get(chunk) or {}
+        for s in chunk:
+            try:
+                out.values[s] = got[s].last_close()
+            except (KeyError, ValueError):
+                missing.append(s)
+    return out, missing
@@ -0,0 +1,344 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+Route = Hashable  # usually (host, port); (None, None) = direct
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class RouteSkipped(Exception):
+    """Raised by an attempt that gave up without using its route (e.g. the caller's deadline passed); no verdict is recorded."""
+
+
+@dataclass
+class _RouteHealth:
+    success_ewma: float = 1.0
+    latency_ewma: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    state: str = CLOSED
+    opened_at: float = 0.0
+    open_for_s: float = 0.0
+    probing: bool = False
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=64))
+
+
+class RouteScoreboard:
+    """
+    Health score per proxy route.
+
+    Tracks success-rate and latency EWMAs per (host, port) and orders routes by
+    expected cost (latency / success rate), best first. A route that fails
+    ``failure_threshold`` times in a row opens its circuit and is skipped for
+    ``open_s`` (doubling on every failed probe, up to ``max_open_s``); after that
+    one half-open probe request is let through, and a success closes it again.
+    Thread-safe.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        open_s: float = 30.0,
+        max_open_s: float = 600.0,
+        default_latency_s: float = 3.0,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_s = open_s
+        self.max_open_s = max_open_s
+        self.default_latency_s = default_latency_s
+        self._lock = threading.Lock()
+        self._routes: Dict[Route, _RouteHealth] = {}
+
+    def _h(self, route: Route) -> _RouteHealth:
+        h = self._routes.get(route)
+        if h is None:
+            h = self._routes[route] = _RouteHealth()
+        return h
+
+    def _score(self, h: _RouteHealth) -> float:
+        lat = h.latency_ewma if h.latency_ewma is not None else self.default_latency_s
+        return lat / max(h.success_ewma, 0.05)
+
+    def order(self, routes: Sequence[Route]) -> List[Route]:
+        """
+        Best routes first. Open circuits go last (only tried when everything
+        else failed); a route whose open period elapsed becomes half-open and is
+        offered for a single probe.
+        """
+        now = time.monotonic()
+        ready, half_open, blocked = [], [], []
+        with self._lock:
+            for i, r in enumerate(routes):
+                h = self._h(r)
+                if h.state == OPEN and now - h.opened_at >= h.open_for_s:
+                    h.state = HALF_OPEN
+                if h.state == CLOSED:
+                    ready.append((self._score(h), i, r))
+                elif h.state == HALF_OPEN and not h.probing:
+                    half_open.append((i, r))
+                else:
+                    blocked.append((h.opened_at, i, r))
+        ready.sort()
+        blocked.sort()
+        return [r for _, _, r in ready] + [r for _, r in half_open] + [r for _, _, r in blocked]
+
+    def is_closed(self, route: Route) -> bool:
+        """The route's circuit is closed (not failing)."""
+        with self._lock:
+            return self._h(route).state == CLOSED
+
+    def on_launch(self, route: Route) -> None:
+        with self._lock:
+            h = self._h(route)
+            if h.state == HALF_OPEN:
+                h.probing = True
+
+    def release(self, route: Route) -> None:
+        """Attempt abandoned without a verdict (e.g. a cancelled hedge loser)."""
+        with self._lock:
+            self._h(route).probing = False
+
+    def record_success(self, route: Route, latency_s: float) -> None:
+        a = self.alpha
+        with self._lock:
+            h = self._h(route)
+            h.successes += 1
+            h.consecutive_failures = 0
+            h.success_ewma = (1 - a) * h.success_ewma + a
+            h.latency_ewma = latency_s if h.latency_ewma is None else (1 - a) * h.latency_ewma + a * latency_s
+            h.latencies.append(latency_s)
+            h.state, h.probing, h.open_for_s = CLOSED, False, 0.0
+
+    def record_failure(self, route: Route, latency_s: Optional[float] = None) -> None:
+        a = self.alpha
+        with self._lock:
+            h = self._h(route)
+            h.failures += 1
+            h.consecutive_failures += 1
+            h.success_ewma = (1 - a) * h.success_ewma
+            if latency_s is not None:
+                h.latency_ewma = latency_s if h.latency_ewma is None else (1 - a) * h.latency_ewma + a * latency_s
+            if h.state == HALF_OPEN:
+                # failed probe: reopen with a longer cool-down
+                h.open_for_s = min(max(h.open_for_s * 2, self.open_s), self.max_open_s)
+                h.state, h.opened_at, h.probing = OPEN, time.monotonic(), False
+            elif h.state == CLOSED and h.consecutive_failures >= self.failure_threshold:
+                h.open_for_s = self.open_s
+                h.state, h.opened_at = OPEN, time.monotonic()
+
+    def latency_quantile(self, q: float, min_samples: int = 10) -> Optional[float]:
+        """Quantile of recent successful latencies across all routes (None if too few samples)."""
+        with self._lock:
+            xs = sorted(x for h in self._routes.values() for x in h.latencies)
+        if len(xs) < min_samples:
+            return None
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def attempt_timeout(self, default_s: float, factor: float = 4.0, floor_s: float = 3.0) -> float:
+        """
+        Per-attempt timeout: ``factor`` x p95 of recent successful latencies,
+        clamped to [floor_s, default_s], so a hanging route is abandoned long
+        before the configured worst case.
+        """
+        p95 = self.latency_quantile(0.95)
+        if p95 is None:
+            return default_s
+        return min(max(p95 * factor, floor_s), default_s)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            items = list(self._routes.items())
+        out = {}
+        for r, h in items:
+            if isinstance(r, tuple):
+                label = "direct" if r[0] is None else ":".join(str(x) for x in r)
+            else:
+                label = str(r)
+            out[label] = {
+                "state": h.state,
+                "success_ewma": round(h.success_ewma, 4),
+                "latency_ewma_s": round(h.latency_ewma, 4) if h.latency_ewma is not None else None,
+                "successes": h.successes,
+                "failures": h.failures,
+                "consecutive_failures": h.consecutive_failures,
+            }
+        return out
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    When to fire a second route while the first has not answered yet.
+
+    The hedge delay is the ``quantile`` of recently observed successful
+    latencies, clamped to [min_delay_s, max_delay_s]; ``default_delay_s`` is used
+    until enough samples exist. ``max_parallel`` = 1 disables hedging.
+    """
+    max_parallel: int = 2
+    quantile: float = 0.9
+    default_delay_s: float = 2.0
+    min_delay_s: float = 0.3
+    max_delay_s: float = 8.0
+
+    def delay(self, board: RouteScoreboard) -> float:
+        q = board.latency_quantile(self.quantile)
+        d = self.default_delay_s if q is None else q
+        return min(max(d, self.min_delay_s), self.max_delay_s)
+
+
+def _timed(board: RouteScoreboard, route: Route, attempt: Callable[[Route], Any]) -> Any:
+    t0 = time.monotonic()
+    try:
+        out = attempt(route)
+    except RouteSkipped:
+        board.release(route)
+        raise
+    except BaseException:
+        board.record_failure(route, time.monotonic() - t0)
+        raise
+    board.record_success(route, time.monotonic() - t0)
+    return out
+
+
+def run_hedged(
+    attempt: Callable[[Route], Any],
+    routes: Sequence[Route],
+    board: RouteScoreboard,
+    executor: Executor,
+    hedge: Optional[HedgePolicy] = None,
+    ordered: bool = False,
+) -> Any:
+    """
+    Try ``routes`` (ordered by the scoreboard, or as given with ``ordered``)
+    until ``attempt(route)`` returns.
+
+    A failed attempt immediately launches the next route. With a hedge policy a
+    further route is launched when the running ones have not answered within the
+    hedge delay (up to ``max_parallel`` in flight). The first successful result
+    wins; attempts that have not started yet are cancelled, running stragglers
+    finish in the background and only update the scoreboard.
+    Raises the last error when every route failed.
+    """
+    queue = list(routes) if ordered else board.order(routes)
+    max_parallel = max(1, hedge.max_parallel if hedge else 1)
+    pending = {}
+    last_err: Optional[BaseException] = None
+
+    def launch() -> bool:
+        if not queue:
+            return False
+        r = queue.pop(0)
+        board.on_launch(r)
+        pending[executor.submit(_timed, board, r, attempt)] = r
+        return True
+
+    launch()
+    try:
+        while pending:
+            can_hedge = hedge is not None and len(pending) < max_parallel and queue
+            done, _ = wait(list(pending), timeout=hedge.delay(board) if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()  # hedge
+                continue
+            for f in done:
+                pending.pop(f)
+                try:
+                    return f.result()
+                except Exception as e:
+                    last_err = e
+                    if len(pending) < max_parallel:
+                        launch()  # replace the failed route right away
+        raise last_err if last_err is not None else RuntimeError("no route available")
+    finally:
+        # attempts still queued in a busy executor never start
+        for f, r in pending.items():
+            if f.cancel():
+                board.release(r)
+
+
+async def run_hedged_async(
+    attempt: Callable[[Route], Awaitable[Any]],
+    routes: Sequence[Route],
+    board: RouteScoreboard,
+    hedge: Optional[HedgePolicy] = None,
+    ordered: bool = False,
+    admit: Optional[Callable[[Route], Awaitable[None]]] = None,
+) -> Any:
+    """
+    Coroutine flavour of :func:`run_hedged`; losing attempts are cancelled.
+
+    ``admit(route)`` runs before each attempt and outside its timing (e.g.
+    waiting for a rate limiter token): the wait is not route latency, and an
+    admission error moves on to the next route without a verdict.
+    """
+    queue = list(routes) if ordered else board.order(routes)
+    max_parallel = max(1, hedge.max_parallel if hedge else 1)
+    pending: Dict[asyncio.Task, Route] = {}
+    last_err: Optional[BaseException] = None
+
+    async def timed(r: Route) -> Any:
+        if admit is not None:
+            try:
+                await admit(r)
+            except BaseException:
+                board.release(r)
+                raise
+        t0 = time.monotonic()
+        try:
+            out = await attempt(r)
+        except (asyncio.CancelledError, RouteSkipped):
+            board.release(r)
+            raise
+        except BaseException:
+            board.record_failure(r, time.monotonic() - t0)
+            raise
+        board.record_success(r, time.monotonic() - t0)
+        return out
+
+    def launch() -> bool:
+        if not queue:
+            return False
+        r = queue.pop(0)
+        board.on_launch(r)
+        pending[asyncio.ensure_future(timed(r))] = r
+        return True
+
+    launch()
+    try:
+        while pending:
+            can_hedge = hedge is not None and len(pending) < max_parallel and queue
+            done, _ = await asyncio.wait(
+                list(pending), timeout=hedge.delay(board) if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch()  # hedge
+                continue
+            # look at every finished attempt, so that no exception is left unretrieved
+            # when a success and a failure land in the same round
+            winner, failed = None, 0
+            for t in done:
+                pending.pop(t)
+                e = t.exception()
+                if e is None:
+                    winner = winner or t
+                elif isinstance(e, Exception):
+                    last_err, failed = e, failed + 1
+                elif winner is None:
+                    winner = t  # result() re-raises KeyboardInterrupt, SystemExit, ...
+            if winner is not None:
+                return winner.result()
+            for _ in range(failed):
+                if len(pending) < max_parallel:
+                    launch()  # replace the failed route right away
+        raise last_err if last_err is not None else RuntimeError("no route available")
+    finally:
+        for t in pending:
+            t.cancel()
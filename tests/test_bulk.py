@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from stock_sdk.bulk import BulkResult, run_bulk, run_bulk_async
+from stock_sdk.errors import DeadlineExceeded
+
+# key -> (seconds it takes, result or exception)
+PLAN = {
+    "a": (0.0, 1),
+    "b": (0.0, ValueError("no data for b")),
+    "c": (0.0, 3),
+    "d": (0.0, KeyError("d")),
+}
+
+
+def make_fn(plan, calls):
+    def fn(k, t):
+        calls.append((k, t))
+        delay, res = plan[k]
+        time.sleep(delay)
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    async def afn(k, t):
+        calls.append((k, t))
+        delay, res = plan[k]
+        await asyncio.sleep(delay)
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    return fn, afn
+
+
+def run_sync(plan, keys, workers, **kw):
+    calls = []
+    return run_bulk(make_fn(plan, calls)[0], keys, max_workers=workers, **kw), calls
+
+
+def run_async(plan, keys, workers, **kw):
+    calls = []
+    return asyncio.run(run_bulk_async(make_fn(plan, calls)[1], keys, max_concurrency=workers, **kw)), calls
+
+
+RUNNERS = [pytest.param(run_sync, id="sync"), pytest.param(run_async, id="async")]
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_partial_failure_and_dedupe(run):
+    res, calls = run(PLAN, ["a", "b", "c", "a", "d", "b"], 1)
+    assert res.values == {"a": 1, "c": 3}
+    assert {k: type(e) for k, e in res.errors.items()} == {"b": ValueError, "d": KeyError}
+    assert not res.ok
+    # each distinct key once, in first-seen order
+    assert [k for k, _ in calls] == ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_empty_and_all_ok(run):
+    res, calls = run(PLAN, [], 4)
+    assert res.ok and res.values == {} and calls == []
+    res, _ = run(PLAN, ["c", "a"], 4)
+    assert res.ok and res.values == {"a": 1, "c": 3}
+
+
+def test_raise_first_follows_the_given_order():
+    res = BulkResult(values={"a": 1}, errors={"b": ValueError("b"), "d": KeyError("d")})
+    with pytest.raises(KeyError):
+        res.raise_first(["a", "d", "b"])
+    with pytest.raises(ValueError):
+        res.raise_first(["b", "d"])
+    res.raise_first(["a", "c"])  # no failed key in the order: nothing raised
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_per_key_budget(run):
+    plan = {"fast": (0.0, 1), "slow": (1.0, 2), "late": (0.1, 3)}
+    res, calls = run(plan, ["slow", "fast", "late"], 2, timeout_s=0.3)
+    assert res.values == {"fast": 1, "late": 3}
+    assert isinstance(res.errors["slow"], DeadlineExceeded)
+    # every key gets the full budget, whenever it starts
+    assert sorted(t for _, t in calls) == [0.3, 0.3, 0.3]
+    assert res.elapsed_s < 0.8
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_overall_budget(run):
+    plan = {"a": (0.2, 1), "b": (1.0, 2), "c": (0.0, 3)}
+    res, calls = run(plan, ["a", "b", "c"], 1, timeout_s=0.35, overall=True)
+    assert res.values == {"a": 1}
+    # b started late with what was left and overran it; c never got a turn
+    assert set(res.errors) == {"b", "c"} and all(isinstance(e, DeadlineExceeded) for e in res.errors.values())
+    budgets = dict(calls)
+    assert budgets["a"] == pytest.approx(0.35, abs=0.02)
+    assert 0 < budgets["b"] <= 0.35 - 0.2 + 0.02
+    assert "c" not in budgets
+    assert res.elapsed_s < 0.6
@@ -0,0 +1,139 @@
+import pytest
+
+from stock_sdk import cache as cache_mod
+from stock_sdk.cache import _ENTRY_OVERHEAD, MemoryCache, SQLiteCache, TieredCache, _encode, make_cache
+
+
+class Clock:
+    """Stands in for the ``time`` module inside stock_sdk.cache."""
+
+    def __init__(self, t=1_700_000_000.0):
+        self.t = t
+
+    def time(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(cache_mod, "time", c)
+    return c
+
+
+def size(v):
+    return len(_encode(v)) + _ENTRY_OVERHEAD
+
+
+def test_lru_by_entries(clock):
+    m = MemoryCache(ttl_s=60, max_entries=3)
+    for k in "abc":
+        m.set(k, k.upper())
+    assert m.get("a") == "A"  # a is now the most recently used
+    m.set("d", "D")
+    assert m.get("b") is None
+    assert [m.get(k) for k in "acd"] == ["A", "C", "D"]
+    st = m.stats()
+    assert st["entries"] == 3 and st["evictions"] == 1
+
+
+def test_lru_by_bytes(clock):
+    v = "x" * 100
+    m = MemoryCache(ttl_s=60, max_bytes=3 * size(v))
+    for k in "abc":
+        m.set(k, v)
+    assert m.stats()["bytes"] == 3 * size(v)
+    m.get("a")
+    m.set("d", v)
+    assert m.get("b") is None and m.get("a") == v
+    # one big value pushes out the two least recently used entries
+    m.set("e", "y" * (size(v) + 50))
+    assert m.get("c") is None and m.get("d") is None and m.get("a") == v
+    assert m.stats()["bytes"] <= m.max_bytes
+
+
+def test_oversize_entry_is_not_cached(clock):
+    m = MemoryCache(ttl_s=60, max_bytes=1000)
+    m.set("small", 1)
+    m.set("huge", "z" * 2000)
+    assert m.get("huge") is None and m.get("small") == 1
+    assert m.stats()["sets"] == 1
+
+
+def test_replacing_a_key_keeps_the_byte_count(clock):
+    m = MemoryCache(ttl_s=60)
+    m.set("a", "x" * 10)
+    m.set("a", "x" * 500)
+    st = m.stats()
+    assert st["entries"] == 1 and st["bytes"] == size("x" * 500)
+
+
+def test_ttl_expiry(clock):
+    m = MemoryCache(ttl_s=10)
+    m.set("a", 1)
+    clock.t += 10
+    assert m.get("a") == 1  # exactly ttl_s old is still fresh
+    clock.t += 0.5
+    assert m.get("a") is None
+    st = m.stats()
+    assert (st["hits"], st["misses"], st["expired"], st["entries"], st["bytes"]) == (1, 1, 1, 0, 0)
+
+
+def test_shrink_drops_expired_before_evicting(clock):
+    m = MemoryCache(ttl_s=10, max_entries=2)
+    m.set("old", 1)
+    clock.t += 5
+    m.set("mid", 2)
+    clock.t += 6  # old has expired, mid has not
+    m.set("new", 3)
+    assert m.get("mid") == 2 and m.get("new") == 3
+    st = m.stats()
+    assert st["expired"] == 1 and st["evictions"] == 0
+
+
+def test_sqlite_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / "sub" / "cache.db")
+    a = SQLiteCache(path, ttl_s=60)
+    a.set(("chart", "0700.HK", "1d"), {"close": [1.5, None]})
+    created, value, n = SQLiteCache(path, ttl_s=60).get(("chart", "0700.HK", "1d"))
+    assert created == clock.t and value == {"close": [1.5, None]} and n == len(_encode(value))
+    assert a.get(("chart", "9988.HK", "1d")) is None
+    assert a.stats()["misses"] == 1
+
+
+def test_sqlite_ttl_and_prune(tmp_path, clock):
+    c = SQLiteCache(str(tmp_path / "c.db"), ttl_s=10, prune_every=3)
+    c.set("a", 1)
+    c.set("b", 2)
+    clock.t += 11
+    assert c.get("a") is None  # expired rows are never returned
+    c.set("c", 3)  # third write: prunes a and b
+    assert c.stats()["pruned"] == 2
+    assert c._conn().execute("SELECT k FROM cache").fetchall() == [('"c"',)]
+
+
+def test_tiered_promotes_persistent_hits(tmp_path, clock):
+    path = str(tmp_path / "t.db")
+    writer = make_cache(ttl_s=10, path=path)
+    writer.set("k", [1, 2, 3])
+    clock.t += 4
+    # a fresh process: empty memory, same file
+    reader = TieredCache(MemoryCache(ttl_s=10), SQLiteCache(path, ttl_s=10))
+    assert reader.get("k") == [1, 2, 3]
+    assert reader.persistent.stats()["hits"] == 1
+    assert reader.get("k") == [1, 2, 3]  # now from memory
+    assert reader.persistent.stats()["hits"] == 1 and reader.memory.stats()["hits"] == 1
+    # the promoted entry kept its original age: it expires 10s after it was written
+    clock.t += 6.5
+    assert reader.get("k") is None
+    assert reader.memory.stats()["expired"] == 1
+
+
+def test_tiered_without_persistent_tier(clock):
+    t = make_cache(ttl_s=10)
+    assert t.persistent is None and t.get("k") is None
+    t.set("k", {"a": 1})
+    assert t.get("k") == {"a": 1}
+    assert t.stats()["persistent"] is None
+    t.clear()
+    assert t.get("k") is None
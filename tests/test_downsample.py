@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+import pytest
+
+from server.bar_store import BAR_DTYPE
+from server.downsample import METHOD_LTTB, METHOD_MINMAX, downsample, lttb_indices, minmax_buckets
+
+
+def reference_lttb(x, y, n):
+    """Textbook LTTB (Steinarsson, 2013), one point at a time; NaN points dropped first."""
+    pts = [(i, float(x[i]), float(y[i])) for i in range(len(x)) if not math.isnan(y[i])]
+    N = len(pts)
+    if n >= N or n < 2:
+        return [p[0] for p in pts]
+    if n == 2:
+        return [pts[0][0], pts[-1][0]]
+    every = (N - 2) / (n - 2)
+    out, a = [pts[0][0]], 0
+    for i in range(n - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, N)
+        avg_x = sum(p[1] for p in pts[nlo:nhi]) / (nhi - nlo)
+        avg_y = sum(p[2] for p in pts[nlo:nhi]) / (nhi - nlo)
+        ax, ay = pts[a][1], pts[a][2]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (pts[j][2] - ay) - (ax - pts[j][1]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(pts[best][0])
+        a = best
+    out.append(pts[-1][0])
+    return out
+
+
+def series(N, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(N, dtype=np.float64) * 60 + 1_700_000_000
+    y = 100 + np.cumsum(rng.normal(0, 1, N))
+    return x, y
+
+
+def bars(N, seed=0):
+    rng = np.random.default_rng(seed)
+    arr = np.empty(N, dtype=BAR_DTYPE)
+    arr["ts"] = 1_700_000_000 + np.arange(N) * 86400
+    arr["close"] = 100 + np.cumsum(rng.normal(0, 1, N))
+    arr["open"] = arr["close"] + rng.normal(0, 0.5, N)
+    arr["high"] = np.maximum(arr["open"], arr["close"]) + rng.uniform(0, 1, N)
+    arr["low"] = np.minimum(arr["open"], arr["close"]) - rng.uniform(0, 1, N)
+    arr["volume"] = rng.integers(0, 1000, N)
+    return arr
+
+
+@pytest.mark.parametrize("N", [4, 5, 17, 100, 1001])
+@pytest.mark.parametrize("n", [2, 3, 4, 7, 50, 999])
+def test_lttb_matches_reference(N, n):
+    x, y = series(N, seed=N * 31 + n)
+    got = lttb_indices(x, y, n).tolist()
+    assert got == reference_lttb(x, y, n)
+    assert len(got) == min(n, N) and got[0] == 0 and got[-1] == N - 1
+    assert got == sorted(set(got))
+
+
+def test_lttb_keeps_everything_at_or_below_threshold():
+    x, y = series(10)
+    for n in (10, 11, 500):
+        assert lttb_indices(x, y, n).tolist() == list(range(10))
+
+
+def test_lttb_threshold_2_and_3():
+    x, y = series(50, seed=3)
+    assert lttb_indices(x, y, 2).tolist() == [0, 49]
+    got = lttb_indices(x, y, 3).tolist()
+    # one middle bucket: the point furthest from the first-to-last chord
+    mid = np.abs((x[0] - x[-1]) * (y[1:-1] - y[0]) - (x[0] - x[1:-1]) * (y[-1] - y[0]))
+    assert got == [0, 1 + int(np.argmax(mid)), 49]
+
+
+def test_lttb_skips_nan_gaps():
+    x, y = series(300, seed=4)
+    y[0] = np.nan
+    y[40:70] = np.nan  # a halt
+    y[-1] = np.nan
+    got = lttb_indices(x, y, 25).tolist()
+    assert got == reference_lttb(x, y, 25)
+    assert len(got) == 25 and not np.isnan(y[got]).any()
+    assert got[0] == 1 and got[-1] == 298
+    assert lttb_indices(x, np.full(5, np.nan), 3).tolist() == []
+
+
+def reference_minmax(arr, n):
+    N = len(arr)
+    groups = {}
+    for i in range(N):
+        groups.setdefault(i * n // N, []).append(arr[i])
+    out = []
+    for g in groups.values():
+        hi = [b["high"] for b in g if not math.isnan(b["high"])]
+        lo = [b["low"] for b in g if not math.isnan(b["low"])]
+        out.append(
+            (g[0]["ts"], g[0]["open"], max(hi) if hi else math.nan, min(lo) if lo else math.nan, g[-1]["close"], sum(b["volume"] for b in g))
+        )
+    return out
+
+
+@pytest.mark.parametrize("N,n", [(10, 3), (100, 7), (1000, 100), (1001, 1000), (5, 1)])
+def test_minmax_matches_reference(N, n):
+    arr = bars(N, seed=N + n)
+    got = minmax_buckets(arr, n)
+    assert len(got) == n
+    want = reference_minmax(arr, n)
+    assert [(b["ts"], b["open"], b["high"], b["low"], b["close"], b["volume"]) for b in got] == want
+
+
+def test_minmax_nan_gaps():
+    arr = bars(40, seed=9)
+    arr["high"][3:7] = np.nan
+    arr["low"][3:7] = np.nan
+    arr["high"][20:30] = np.nan  # a whole bucket
+    arr["low"][20:30] = np.nan
+    got = minmax_buckets(arr, 4)
+    want = reference_minmax(arr, 4)
+    assert np.allclose(got["high"], [w[2] for w in want], equal_nan=True)
+    assert np.allclose(got["low"], [w[3] for w in want], equal_nan=True)
+    assert not np.isnan(got["high"][0]) and np.isnan(got["high"][2])
+
+
+def test_downsample_small_input_and_threshold_floor():
+    arr = bars(20)
+    assert downsample(arr, 20, METHOD_LTTB) is arr
+    assert downsample(arr, 50, METHOD_MINMAX) is arr
+    assert downsample(arr, 0) is arr
+    # lttb never goes below 3 points (first, one pick, last)
+    assert len(downsample(arr, 2, METHOD_LTTB)) == 3
+    assert len(downsample(arr, 2, METHOD_MINMAX)) == 2
+    with pytest.raises(ValueError):
+        downsample(arr, 5, "median")
@@ -0,0 +1,90 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from server.bar_store import BAR_DTYPE
+from server.kline_codec import (
+    FORMAT_BINARY,
+    FORMAT_COLUMNS,
+    FORMAT_ROWS,
+    MEDIA_BINARY,
+    MEDIA_COLUMNS,
+    encode_binary,
+    encode_columns,
+    negotiate_format,
+    rows_to_bars,
+)
+
+_HEADER = struct.Struct("<4sII")
+
+
+def decode_binary(buf):
+    """Reference reader for the ``encode_binary`` layout (what a client does)."""
+    magic, n, _ = _HEADER.unpack_from(buf, 0)
+    if magic != b"KLB1":
+        raise ValueError("not a kline binary payload")
+    off = _HEADER.size
+    out = {}
+    for k, dt in (("t", "<i8"), ("o", "<f8"), ("c", "<f8"), ("l", "<f8"), ("h", "<f8"), ("v", "<i8")):
+        out[k] = np.frombuffer(buf, dtype=dt, count=n, offset=off)
+        off += 8 * n
+    assert off == len(buf)
+    return out
+
+
+ROWS = [
+    [1_700_000_000_000, 10.0, 10.5, 9.8, 10.7, 1200],
+    [1_700_000_060_000, 10.5, 10.4, 10.2, 10.6, 0],
+    [1_700_000_120_000, 10.4, 11.0, 10.4, 11.1, 98765],
+]
+
+
+def test_binary_round_trip():
+    arr = rows_to_bars(ROWS)
+    cols = decode_binary(encode_binary(arr))
+    assert cols["t"].tolist() == [r[0] for r in ROWS]
+    for i, k in enumerate("oclhv", start=1):
+        assert cols[k].tolist() == [r[i] for r in ROWS]
+
+
+def test_binary_empty_and_nan_volume():
+    assert all(len(v) == 0 for v in decode_binary(encode_binary(rows_to_bars([]))).values())
+    arr = rows_to_bars(ROWS)
+    arr["volume"][1] = np.nan
+    assert decode_binary(encode_binary(arr))["v"].tolist() == [1200, 0, 98765]
+
+
+def test_columns_match_rows():
+    arr = rows_to_bars(ROWS)
+    doc = json.loads(encode_columns(arr, {"symbol": "0700.HK"}))
+    assert doc["symbol"] == "0700.HK" and doc["n"] == 3
+    assert [list(r) for r in zip(*(doc["columns"][k] for k in "toclhv"))] == ROWS
+
+
+def test_rows_to_bars_dtype():
+    arr = rows_to_bars(ROWS)
+    assert arr.dtype == BAR_DTYPE
+    assert arr["ts"].tolist() == [r[0] // 1000 for r in ROWS]
+
+
+@pytest.mark.parametrize(
+    "fmt,accept,want",
+    [
+        (None, None, FORMAT_ROWS),
+        ("json", MEDIA_BINARY, FORMAT_ROWS),
+        ("binary", None, FORMAT_BINARY),
+        (None, MEDIA_BINARY, FORMAT_BINARY),
+        (None, "application/octet-stream", FORMAT_BINARY),
+        (None, MEDIA_COLUMNS, FORMAT_COLUMNS),
+        (None, "text/html", FORMAT_ROWS),
+    ],
+)
+def test_negotiate_format(fmt, accept, want):
+    assert negotiate_format(fmt, accept) == want
+
+
+def test_negotiate_format_rejects_unknown():
+    with pytest.raises(ValueError):
+        negotiate_format("xml", None)
@@ -0,0 +1,40 @@
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from server.metrics import HTTP_REQUEST_SECONDS, MetricsMiddleware
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/t/plain/{x}")
+    def plain(x: str):
+        return {"x": x}
+
+    @app.get("/t/sse")
+    def sse():
+        return StreamingResponse(iter(["data: 1\n\n", "data: 2\n\n"]), media_type="text/event-stream")
+
+    @app.websocket("/t/ws")
+    async def ws(sock: WebSocket):
+        await sock.accept()
+        await sock.send_text("hi")
+        await sock.close()
+
+    return app
+
+
+def routes_seen():
+    return {line.split('route="')[1].split('"')[0] for line in HTTP_REQUEST_SECONDS.samples() if 'route="/t/' in line}
+
+
+def test_streams_are_not_request_latencies():
+    c = TestClient(make_app())
+    assert c.get("/t/plain/1").json() == {"x": "1"}
+    assert c.get("/t/plain/2").status_code == 200
+    assert c.get("/t/sse").text == "data: 1\n\ndata: 2\n\n"
+    with c.websocket_connect("/t/ws") as s:
+        assert s.receive_text() == "hi"
+    assert routes_seen() == {"/t/plain/{x}"}
@@ -0,0 +1,145 @@
+import asyncio
+import random
+
+import numpy as np
+
+from server.minute_feed import MinuteFeed, MinuteRing
+from server.tencent_finance import decode_minute_payload, hk_day_epoch
+
+CODE = "hk00700"
+
+
+def minute_rows(n, seed=0, start_min=9 * 60):
+    """n consecutive minutes of "HHMM price cumVol cumAmount" rows."""
+    rnd = random.Random(seed)
+    rows, price, cum = [], 380.0, 0
+    for i in range(n):
+        m = start_min + i
+        price = round(price + rnd.uniform(-0.6, 0.6), 2)
+        cum += rnd.randint(0, 5000)
+        rows.append(f"{m // 60:02d}{m % 60:02d} {price:.2f} {cum} {cum * price:.1f}")
+    return rows
+
+
+def payload(rows, date="20261016"):
+    return {"data": {CODE: {"data": {"date": date, "data": list(rows)}}}}
+
+
+def expected(rows, capacity, date="20261016"):
+    return decode_minute_payload(payload(rows, date), CODE)[-capacity:]
+
+
+def assert_same(a, b):
+    assert a.dtype == b.dtype
+    assert a.tolist() == b.tolist()
+
+
+def test_incremental_growth_overflows_capacity():
+    rows = minute_rows(600, seed=1)
+    ring = MinuteRing(512)
+    rnd = random.Random(2)
+    n = 0
+    while n < len(rows):
+        n = min(len(rows), n + rnd.randint(1, 40))
+        ring.apply(payload(rows[:n]), CODE)
+        assert len(ring) == min(n, 512)
+        assert_same(ring.bars(), expected(rows[:n], 512))
+    # the ring kept only the newest 512 minutes, oldest first
+    ts = ring.bars()["ts"]
+    assert (np.diff(ts) == 60).all() and ts[-1] == hk_day_epoch("20261016") + (9 * 60 + 599) * 60
+
+
+def test_amended_last_minute():
+    rows = minute_rows(520, seed=3)
+    ring = MinuteRing(512)
+    ring.apply(payload(rows[:300]), CODE)
+    # the forming minute is re-sent with a new price and a higher cumulative volume
+    hhmm, _, cum, _ = rows[299].split()
+    amended = rows[:299] + [f"{hhmm} 399.99 {int(cum) + 777} 0"]
+    assert ring.apply(payload(amended), CODE) == 1
+    assert_same(ring.bars(), expected(amended, 512))
+    assert ring.bars()["close"][-1] == 399.99
+    # amendment plus new minutes, across the capacity boundary
+    grown = amended + rows[300:]
+    ring.apply(payload(grown), CODE)
+    assert_same(ring.bars(), expected(grown, 512))
+    # amending the last minute after overflow touches only the newest slot
+    hhmm, _, cum, _ = grown[-1].split()
+    again = grown[:-1] + [f"{hhmm} 1.23 {int(cum) + 1} 0"]
+    ring.apply(payload(again), CODE)
+    assert_same(ring.bars(), expected(again, 512))
+
+
+def test_slow_path_rows():
+    rows = minute_rows(40, seed=4)
+    rows[10] = "0910 - 123 0"  # unparsable price: the bulk decoder bails out, the row is skipped
+    ring = MinuteRing(512)
+    ring.apply(payload(rows[:20]), CODE)
+    ring.apply(payload(rows), CODE)
+    assert_same(ring.bars(), expected(rows, 512))
+
+
+def test_slow_path_skips_impossible_minutes():
+    rows = minute_rows(40, seed=10)
+    rows[12] = "0975 381.00 999999 0"  # minute 75 does not exist
+    rows[25] = "0930 - 123 0"  # forces the per-row decoder
+    ring = MinuteRing(512)
+    ring.apply(payload(rows[:13]), CODE)  # the bad minute is the newest row
+    assert_same(ring.bars(), expected(rows[:13], 512))
+    ring.apply(payload(rows), CODE)
+    assert_same(ring.bars(), expected(rows, 512))
+    assert len(ring) == 38
+
+
+def test_new_trading_day_resets():
+    ring = MinuteRing(512)
+    day1 = minute_rows(530, seed=5)
+    ring.apply(payload(day1, "20261015"), CODE)
+    assert ring.date == "20261015" and len(ring) == 512
+    day2 = minute_rows(3, seed=6)
+    ring.apply(payload(day2, "20261016"), CODE)
+    assert ring.date == "20261016" and len(ring) == 3
+    assert_same(ring.bars(), expected(day2, 512, "20261016"))
+    assert ring.bars()["ts"][0] == hk_day_epoch("20261016") + 9 * 3600
+
+
+def test_shorter_payload_resets():
+    rows = minute_rows(50, seed=7)
+    ring = MinuteRing(512)
+    ring.apply(payload(rows), CODE)
+    ring.apply(payload(rows[:20]), CODE)
+    assert_same(ring.bars(), expected(rows[:20], 512))
+
+
+def test_bars_since():
+    rows = minute_rows(600, seed=8)
+    ring = MinuteRing(512)
+    ring.apply(payload(rows), CODE)
+    all_bars = ring.bars()
+    t = int(all_bars["ts"][-5])
+    assert_same(ring.bars(t), all_bars[-5:])
+    assert_same(ring.bars(t + 1), all_bars[-4:])
+    assert len(ring.bars(0)) == 512 and len(ring.bars(t + 3600)) == 0
+
+
+def test_feed_refresh_and_memory():
+    rows = minute_rows(30, seed=9)
+    calls = []
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        return CODE, payload(rows[: 10 * len(calls)])
+
+    feed = MinuteFeed(refresh_s=60)
+
+    async def go():
+        a = await feed.bars("0700.HK", fetch)
+        b = await feed.bars("0700.HK", fetch)  # fresh enough: answered from memory
+        feed.refresh_s = 0
+        c = await feed.bars("0700.HK", fetch)
+        return a, b, c
+
+    a, b, c = asyncio.run(go())
+    assert (len(a), len(b), len(c)) == (10, 10, 20)
+    st = feed.stats()
+    assert (st["fetches"], st["memory"]) == (2, 1)
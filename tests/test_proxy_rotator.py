@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+import requests
+
+from stock_sdk import http as http_mod
+from stock_sdk.async_http import AsyncProxyRotator
+from stock_sdk.config import DecodoAuth, ProxyPool, RetryPolicy, YahooChartConfig
+from stock_sdk.errors import DeadlineExceeded
+from stock_sdk.http import ProxyRotator
+
+R1, R2, R3 = ("p", 1), ("p", 2), ("p", 3)
+
+
+def rotator(cls=ProxyRotator, **retry):
+    retry.setdefault("sleep_between_ports_s", 0)
+    retry.setdefault("backoff_on_error_s", 0)
+    return cls(DecodoAuth("u", "pw"), [ProxyPool("p", [1, 2, 3])], RetryPolicy(**retry), YahooChartConfig())
+
+
+def test_hedged_routes_put_last_good_first():
+    rot = rotator(hedge_max_parallel=2)
+    rot._board.record_success(R1, 0.1)
+    rot._board.record_success(R2, 0.5)
+    rot._board.record_success(R3, 2.0)
+    assert rot._hedged_routes() == [R1, R2, R3]
+    rot._last_good = R3
+    assert rot._hedged_routes() == [R3, R1, R2]
+    rot.remember_last_good = False
+    assert rot._hedged_routes() == [R1, R2, R3]
+    # a last good route whose circuit opened since keeps its scoreboard place
+    rot.remember_last_good = True
+    for _ in range(rot._board.failure_threshold):
+        rot._board.record_failure(R3)
+    assert rot._hedged_routes() == [R1, R2, R3]
+
+
+@pytest.mark.parametrize("cls", [ProxyRotator, AsyncProxyRotator])
+def test_hedged_get_json_starts_with_last_good(cls):
+    rot = rotator(cls, hedge_max_parallel=2, hedge_delay_s=5)
+    rot._board.record_success(R1, 0.1)
+    rot._last_good = R2
+    calls = []
+
+    def get_once(host, port, url, params, timeout):
+        calls.append((host, port))
+        return {"ok": port}
+
+    async def aget_once(*a):
+        return get_once(*a)
+
+    rot._get_once = get_once if cls is ProxyRotator else aget_once
+    out = rot.get_json("https://example.invalid/x", {"a": 1})
+    if cls is AsyncProxyRotator:
+        out = asyncio.run(out)
+    assert out == {"ok": 2} and calls == [R2]
+
+
+class SteppingClock:
+    """Advances on every read, so the deadline can pass between two checks."""
+
+    def __init__(self, step):
+        self.t, self.step = 1000.0, step
+
+    def __call__(self):
+        self.t += self.step
+        return self.t
+
+
+@pytest.mark.parametrize("hedge", [1, 2])
+def test_no_request_with_zero_timeout(monkeypatch, hedge):
+    rot = rotator(hedge_max_parallel=hedge, max_attempts_per_port=3)
+    timeouts = []
+
+    def get_once(host, port, url, params, timeout):
+        timeouts.append(timeout)
+        raise requests.exceptions.ConnectionError("down")
+
+    rot._get_once = get_once
+    monkeypatch.setattr(http_mod.time, "monotonic", SteppingClock(0.3))
+    with pytest.raises(DeadlineExceeded):
+        rot.get_json("https://example.invalid/x", {}, timeout_s=1.0)
+    assert timeouts and all(t > 0 for t in timeouts)
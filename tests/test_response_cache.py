@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from fastapi import Request
+from fastapi.responses import Response
+
+from server import response_cache as rc_mod
+from server.response_cache import ResponseCache
+
+
+def request(inm=None):
+    headers = [(b"if-none-match", inm.encode())] if inm else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(rc_mod.time, "time", c)
+    return c
+
+
+def counter(body=b"x"):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return Response(body + str(len(calls)).encode(), media_type="text/plain")
+
+    return compute, calls
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_hit_after_miss(clock):
+    cache = ResponseCache()
+    compute, calls = counter()
+
+    async def go():
+        a = await cache.respond(request(), "k", 5, compute)
+        b = await cache.respond(request(), "k", 5, compute)
+        return a, b
+
+    a, b = run(go())
+    assert (a.headers["x-cache"], b.headers["x-cache"]) == ("MISS", "HIT")
+    assert a.body == b.body == b"x1" and len(calls) == 1
+    assert "max-age=5" in a.headers["cache-control"]
+
+
+def test_errors_are_not_cached(clock):
+    cache = ResponseCache()
+
+    async def compute():
+        return {"error": "boom"}
+
+    async def go():
+        return [await cache.respond(request(), "k", 5, compute) for _ in range(2)]
+
+    assert run(go()) == [{"error": "boom"}] * 2
+    assert cache.stats()["entries"] == 0 and cache.stats()["uncacheable"] == 2
+
+
+def test_lru_eviction_by_count(clock):
+    cache = ResponseCache(max_entries=3)
+    compute, _ = counter()
+
+    async def go():
+        for k in "abc":
+            await cache.respond(request(), k, 60, compute)
+        await cache.respond(request(), "a", 60, compute)  # a is now most recent
+        await cache.respond(request(), "d", 60, compute)
+
+    run(go())
+    assert list(cache._entries) == ["c", "a", "d"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_bytes(clock):
+    body = b"y" * 1000
+    one = ResponseCache()._entry(Response(body + b"1"), 60).nbytes
+    cache = ResponseCache(max_bytes=2 * one + one // 2)
+    compute, _ = counter(body)
+
+    async def go():
+        for k in "abc":
+            await cache.respond(request(), k, 60, compute)
+
+    run(go())
+    st = cache.stats()
+    assert list(cache._entries) == ["b", "c"]
+    assert st["evictions"] == 1 and st["bytes"] <= cache.max_bytes
+
+
+def test_stale_while_revalidate(clock):
+    cache = ResponseCache(stale_factor=10, stale_cap_s=10)
+    compute, calls = counter()
+
+    async def go():
+        await cache.respond(request(), "k", 5, compute)
+        clock.now += 6  # past the TTL, inside the stale window
+        stale = await cache.respond(request(), "k", 5, compute)
+        again = await cache.respond(request(), "k", 5, compute)  # refresh already scheduled
+        await asyncio.gather(*cache._tasks)
+        fresh = await cache.respond(request(), "k", 5, compute)
+        return stale, again, fresh
+
+    stale, again, fresh = run(go())
+    assert stale.headers["x-cache"] == "STALE" and stale.body == b"x1"
+    assert again.headers["x-cache"] == "STALE"
+    assert fresh.headers["x-cache"] == "HIT" and fresh.body == b"x2"
+    assert len(calls) == 2 and cache.stats()["refreshes"] == 1
+
+
+def test_stale_window_is_capped(clock):
+    cache = ResponseCache(stale_factor=10, stale_cap_s=10)
+    compute, calls = counter()
+
+    async def go():
+        await cache.respond(request(), "k", 300, compute)
+        e = cache._entries["k"]
+        clock.now += 300 + 10 + 1  # 300 * 10 would still be stale; the cap is 10s past the TTL
+        late = await cache.respond(request(), "k", 300, compute)
+        return e, late
+
+    e, late = run(go())
+    assert e.stale_s == 10
+    assert late.headers["x-cache"] == "MISS" and late.body == b"x2"
+    assert "stale-while-revalidate=10" in late.headers["cache-control"]
+    # short TTLs keep the proportional window
+    assert ResponseCache(stale_factor=10, stale_cap_s=10)._entry(Response(b"z"), 0.5).stale_s == 5
+
+
+def test_etag_not_modified(clock):
+    cache = ResponseCache()
+    compute, _ = counter()
+
+    async def go():
+        first = await cache.respond(request(), "k", 5, compute)
+        etag = first.headers["etag"]
+        nm = await cache.respond(request(f'"nope", {etag}'), "k", 5, compute)
+        other = await cache.respond(request('"nope"'), "k", 5, compute)
+        return etag, nm, other
+
+    etag, nm, other = run(go())
+    assert nm.status_code == 304 and nm.body == b"" and nm.headers["etag"] == etag
+    assert other.status_code == 200 and other.body == b"x1"
+    assert cache.stats()["not_modified"] == 1
@@ -0,0 +1,130 @@
+import random
+
+import numpy as np
+import pytest
+
+from server.bar_store import BAR_DTYPE
+from server.rolling_extremes import ExtremesIndex, _SparseTable, parse_window
+
+DAY = 86400
+T0 = 1_700_000_000
+
+
+def bars(n, seed=0, t0=T0):
+    rng = np.random.default_rng(seed)
+    arr = np.empty(n, dtype=BAR_DTYPE)
+    # trading days with gaps (weekends / holidays)
+    arr["ts"] = t0 + np.cumsum(rng.integers(1, 4, n)) * DAY
+    close = 100 + np.cumsum(rng.normal(0, 2, n))
+    arr["open"] = close
+    arr["close"] = close
+    arr["high"] = close + rng.uniform(0, 3, n)
+    arr["low"] = close - rng.uniform(0, 3, n)
+    arr["volume"] = rng.integers(0, 10_000, n)
+    return arr
+
+
+def brute(arr, kind, n, now):
+    if kind == "bars":
+        sel = arr[max(0, len(arr) - n):]
+    else:
+        sel = arr[arr["ts"] >= now - n * DAY]
+    if not len(sel):
+        return None, None
+    return float(sel["high"].max()), float(sel["low"].min())
+
+
+def check(idx, arr):
+    assert idx.ts == arr["ts"].tolist()
+    now = float(arr["ts"][-1]) + DAY // 2
+    for n in (1, 2, 3, 5, 20, 63, len(arr), len(arr) + 7):
+        assert idx.window("bars", n) == brute(arr, "bars", n, now)
+    for w in ("1d", "5d", "2w", "1m", "6m", "1y", "5y"):
+        kind, n = parse_window(w)
+        assert idx.window(kind, n, now) == brute(arr, kind, n, now)
+
+
+@pytest.mark.parametrize("op", [max, min])
+def test_sparse_table_matches_brute_force(op):
+    rnd = random.Random(7)
+    st, ref = _SparseTable(op), []
+    for _ in range(3):
+        for _ in range(rnd.randint(20, 70)):
+            v = rnd.uniform(-50, 50)
+            st.append(v)
+            ref.append(v)
+        assert len(st) == len(ref)
+        for i in range(len(ref)):
+            for j in range(i, len(ref)):
+                assert st.query(i, j) == op(ref[i:j + 1])
+        k = rnd.randint(0, len(ref))
+        st.truncate(k)
+        del ref[k:]
+        assert len(st) == k
+
+
+def test_sparse_table_truncate_to_empty():
+    st = _SparseTable(max)
+    for v in range(9):
+        st.append(float(v))
+    st.truncate(0)
+    assert len(st) == 0 and st.levels == [[]]
+    st.append(3.0)
+    assert st.query(0, 0) == 3.0
+
+
+def test_sync_appends_incrementally():
+    full = bars(300, seed=1)
+    idx = ExtremesIndex()
+    for n in (1, 2, 17, 64, 65, 200, 300):
+        idx.sync(full[:n])
+        check(idx, full[:n])
+
+
+def test_sync_amended_last_bar():
+    arr = bars(120, seed=2)
+    idx = ExtremesIndex()
+    idx.sync(arr)
+    for high, low in ((1e6, -1e6), (arr["high"][-1] + 0.5, arr["low"][-1]), (arr["close"][-1], arr["close"][-1])):
+        amended = arr.copy()
+        amended["high"][-1] = high
+        amended["low"][-1] = low
+        idx.sync(amended)
+        check(idx, amended)
+    # amended last bar plus new bars in the same sync
+    grown = bars(130, seed=2)
+    grown["high"][119] += 40
+    idx.sync(grown)
+    check(idx, grown)
+
+
+def test_sync_truncation_and_new_head():
+    arr = bars(200, seed=3)
+    idx = ExtremesIndex()
+    idx.sync(arr)
+    # shorter array: rebuilt, nothing of the dropped tail survives
+    idx.sync(arr[:150])
+    check(idx, arr[:150])
+    # window rolled forward: different first bar
+    idx.sync(arr[40:])
+    check(idx, arr[40:])
+    # same head, but the last stored bar was replaced by one with another timestamp
+    other = arr[40:].copy()
+    other["ts"][-1] += 1
+    other["high"][-1] += 25
+    idx.sync(other)
+    check(idx, other)
+    # unrelated series
+    fresh = bars(80, seed=4, t0=T0 + 5000 * DAY)
+    idx.sync(fresh)
+    check(idx, fresh)
+
+
+def test_empty_and_out_of_range_windows():
+    idx = ExtremesIndex()
+    assert idx.window("bars", 5) == (None, None)
+    arr = bars(10, seed=5)
+    idx.sync(arr)
+    assert idx.window("days", 1, float(arr["ts"][-1]) + 10 * DAY) == (None, None)
+    idx.sync(arr[:0])
+    assert idx.window("bars", 5) == (None, None)
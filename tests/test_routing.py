@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from stock_sdk.routing import HedgePolicy, RouteScoreboard, run_hedged_async
+
+A, B, C, D = ("a", 1), ("b", 2), ("c", 3), ("d", 4)
+
+
+class LedgerBoard(RouteScoreboard):
+    """Records launches and how each one was settled."""
+
+    def __init__(self):
+        super().__init__()
+        self.launched, self.settled = [], []
+
+    def on_launch(self, route):
+        self.launched.append(route)
+        super().on_launch(route)
+
+    def release(self, route):
+        self.settled.append(route)
+        super().release(route)
+
+    def record_success(self, route, latency_s):
+        self.settled.append(route)
+        super().record_success(route, latency_s)
+
+    def record_failure(self, route, latency_s=None):
+        self.settled.append(route)
+        super().record_failure(route, latency_s)
+
+
+@pytest.mark.parametrize("winner", [A, B, C])
+def test_same_round_failures_and_winner(winner):
+    async def go():
+        gate = asyncio.Event()
+        hedge = HedgePolicy(max_parallel=3, default_delay_s=0.001, min_delay_s=0.001)
+        board = LedgerBoard()
+
+        async def attempt(r):
+            await gate.wait()  # A, B and C all finish in the same round
+            if r != winner:
+                raise RuntimeError(f"{r} down")
+            return r
+
+        asyncio.get_running_loop().call_later(0.02, gate.set)
+        out = await run_hedged_async(attempt, [A, B, C, D], board, hedge, ordered=True)
+        await asyncio.sleep(0)
+        return out, board
+
+    out, board = asyncio.run(go())
+    assert out == winner
+    # the failures beside the winner start no replacement (D would be cancelled unstarted
+    # and keep a half-open probe slot forever)
+    assert board.launched == [A, B, C]
+    assert sorted(board.settled) == [A, B, C]
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from server.singleflight import SingleFlight
+
+
+def test_leader_cancel_does_not_reach_followers():
+    async def go():
+        sf = SingleFlight()
+        release = asyncio.Event()
+        runs = []
+
+        async def fetch():
+            runs.append(1)
+            await release.wait()
+            return "bars"
+
+        leader = asyncio.ensure_future(sf.do_async(("yahoo_chart", "0700.HK"), fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(sf.do_async(("yahoo_chart", "0700.HK"), fetch))
+        await asyncio.sleep(0)
+        leader.cancel()  # client disconnect
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "bars"
+        return sf.stats(), runs
+
+    stats, runs = asyncio.run(go())
+    assert runs == [1]
+    assert stats["executions"] == 1 and stats["coalesced"] == 1 and stats["errors"] == 0 and stats["inflight"] == 0
+
+
+def test_errors_are_shared_and_counted_once():
+    async def go():
+        sf = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("all proxies failed")
+
+        out = await asyncio.gather(*(sf.do_async(("tencent_quote", "00700"), fetch) for _ in range(3)), return_exceptions=True)
+        return sf.stats(), out
+
+    stats, out = asyncio.run(go())
+    assert all(isinstance(e, RuntimeError) for e in out)
+    assert stats["executions"] == 1 and stats["coalesced"] == 2 and stats["errors"] == 1 and stats["inflight"] == 0
+
+
+def test_lone_cancelled_caller_leaves_no_entry():
+    async def go():
+        sf = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        t = asyncio.ensure_future(sf.do_async(("k",), fetch))
+        await asyncio.sleep(0)
+        t.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await t
+        await asyncio.sleep(0.05)
+        return sf.stats()
+
+    stats = asyncio.run(go())
+    assert stats["inflight"] == 0 and stats["errors"] == 1
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from server.upstream_async import AsyncUpstream
+from server.upstream_scheduler import UpstreamScheduler
+
+A, B, C = ("a", 1), ("b", 2), ("c", 3)
+
+
+def wait_s(sched, name):
+    return sched._limiter(name).bucket.wait_s(time.monotonic())
+
+
+def test_ready_routes_puts_throttled_last():
+    sched = UpstreamScheduler(route_rate=1, route_burst=4)
+    assert sched.ready_routes("yahoo", [A, B, C]) == [A, B, C]
+    sched.pause(sched.route_name("yahoo", A), 5)
+    assert sched.ready_routes("yahoo", [A, B, C]) == [B, C, A]
+    sched.pause(sched.route_name("yahoo", C), 5)
+    assert sched.ready_routes("yahoo", [C, B, A]) == [B, C, A]
+    sched.pause(sched.route_name("yahoo", B), 5)
+    # nothing has capacity: every route is still offered, in the given order
+    assert sched.ready_routes("yahoo", [C, A, B]) == [C, A, B]
+
+
+def upstream(sched, status_a, headers_a=None, **kw):
+    hits = []
+
+    def handler(request):
+        host = request.url.params["via"]
+        hits.append(host)
+        if host == "a":
+            return httpx.Response(status_a, headers=headers_a or {}, text="slow down")
+        return httpx.Response(200, json={"via": host})
+
+    up = AsyncUpstream([A, B, C], lambda h, p: f"http://{h}:{p}", {}, scheduler=sched, **kw)
+
+    def client(host, port):
+        async def tag(request):
+            request.url = request.url.copy_merge_params({"via": host})
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler), event_hooks={"request": [tag]})
+
+    up._yahoo_client = client
+    return up, hits
+
+
+@pytest.mark.parametrize("headers,pause", [({}, 7.0), ({"Retry-After": "2"}, 2.0), ({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}, 7.0)])
+def test_429_pauses_route(headers, pause):
+    sched = UpstreamScheduler(route_rate=1, route_burst=4)
+    up, hits = upstream(sched, 429, headers, pause_429_s=7.0)
+    out = asyncio.run(up.get_json_with_failover("https://example.invalid/x", {}))
+    assert out == {"via": "b"} and hits == ["a", "b"]
+    assert wait_s(sched, "yahoo@a:1") == pytest.approx(pause, abs=0.1)
+    assert wait_s(sched, "yahoo@b:2") == 0.0
+
+
+def test_throttled_route_tried_last():
+    sched = UpstreamScheduler(route_rate=1, route_burst=4)
+    up, hits = upstream(sched, 200)
+    sched.pause("yahoo@a:1", 30)
+    sched.pause("yahoo@b:2", 30)
+    assert asyncio.run(up.get_json_with_failover("https://example.invalid/x", {})) == {"via": "c"}
+    assert hits == ["c"]
+
+
+def test_route_rejection_is_no_verdict():
+    sched = UpstreamScheduler(route_rate=1, route_burst=4)
+    up, hits = upstream(sched, 200)
+    for r in (A, B, C):
+        sched.pause(sched.route_name("yahoo", r), 60)  # longer than any priority's wait budget
+    for _ in range(up.board.failure_threshold + 1):
+        with pytest.raises(RuntimeError, match="exceeds"):
+            asyncio.run(up.get_json_with_failover("https://example.invalid/x", {}))
+    assert hits == []
+    assert all(up.board.is_closed(r) for r in (A, B, C))
+    assert all(v["failures"] == 0 for v in up.board.snapshot().values())
+
+
+def test_token_wait_is_not_route_latency():
+    sched = UpstreamScheduler(route_rate=1, route_burst=4)
+    up, hits = upstream(sched, 200)
+    up.routes = [B]
+    sched.pause("yahoo@b:2", 0.3)
+    t0 = time.monotonic()
+    assert asyncio.run(up.get_json_with_failover("https://example.invalid/x", {})) == {"via": "b"}
+    assert time.monotonic() - t0 >= 0.25
+    assert up.board.snapshot()["b:2"]["latency_ewma_s"] < 0.1
+
+
+def test_tencent_errors_are_counted():
+    def handler(request):
+        if request.url.params.get("code") == "hk00700":
+            raise httpx.ConnectError("reset by peer", request=request)
+        return httpx.Response(200, json={"data": {}})
+
+    up = AsyncUpstream([A], lambda h, p: f"http://{h}:{p}", {})
+    up._tencent = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def go():
+        with pytest.raises(httpx.ConnectError):
+            await up.fetch_minute_payload("0700.HK")
+        await up.fetch_minute_payload("0005.HK")
+
+    asyncio.run(go())
+    c = up.stats()["routes"]["tencent"]
+    assert c["requests"] == 2 and c["errors"] == 1
@@ -0,0 +1,229 @@
+"""hk_latest_closes_bulk against a local fake Yahoo (also acting as the forward proxy)."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from stock_sdk import AsyncStockClient, DeadlineExceeded, StockClient
+from stock_sdk.config import DecodoAuth, ProxyPool, RetryPolicy, SDKConfig, YahooChartConfig
+
+T0 = 1_700_000_000
+# spark omits these; the chart fallback answers 8888 and fails 9999
+NOT_IN_SPARK = ("8888.HK", "9999.HK")
+# a spark chunk containing this symbol fails as a whole
+BREAKS_SPARK = "7777.HK"
+
+
+def code(sym):
+    return int(sym.split(".")[0])
+
+
+def spark_close(sym):
+    return code(sym) + 0.25
+
+
+def chart_close(sym):
+    return code(sym) + 0.75
+
+
+class FakeYahoo(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set per server
+
+    def log_message(self, *a):
+        pass
+
+    def _send(self, status, obj, ctype="application/json"):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        st = self.server.state
+        u = urlsplit(self.path)  # absolute-form when reached as a proxy
+        q = parse_qs(u.query)
+        if u.path.endswith("/finance/spark"):
+            syms = q["symbols"][0].split(",")
+            with st["lock"]:
+                st["spark"].append(syms)
+            time.sleep(st["spark_delay"])
+            if BREAKS_SPARK in syms:
+                return self._send(502, {"error": "bad gateway"}, "text/plain")
+            return self._send(200, spark_payload([s for s in syms if s not in NOT_IN_SPARK], st["shape"]))
+        if "/finance/chart/" in u.path:
+            sym = u.path.rsplit("/", 1)[1]
+            with st["lock"]:
+                st["chart"].append(sym)
+            if sym == "9999.HK":
+                return self._send(500, {"error": "boom"}, "text/plain")
+            return self._send(200, chart_payload(sym))
+        self._send(404, {}, "text/html")
+
+
+def spark_payload(syms, shape):
+    def series(s):
+        # the last slot is still empty (no trade yet), like Yahoo during pre-open
+        return [T0, T0 + 86400, T0 + 2 * 86400], [code(s) + 0.1, spark_close(s), None]
+
+    if shape == "v8":
+        out = {}
+        for s in syms:
+            ts, closes = series(s)
+            out[s] = {"symbol": s, "timestamp": ts, "close": closes, "chartPreviousClose": 1.0}
+        return out
+    result = []
+    for s in syms:
+        ts, closes = series(s)
+        result.append(
+            {
+                "symbol": s,
+                "response": [
+                    {"meta": {"symbol": s, "chartPreviousClose": 1.0}, "timestamp": ts, "indicators": {"quote": [{"close": closes}]}}
+                ],
+            }
+        )
+    return {"spark": {"result": result, "error": None}}
+
+
+def chart_payload(sym):
+    n = 5
+    closes = [code(sym) + 0.5] * (n - 1) + [chart_close(sym)]
+    quote = {"open": closes, "high": closes, "low": closes, "close": closes, "volume": [100] * n}
+    return {
+        "chart": {
+            "result": [{"meta": {"symbol": sym}, "timestamp": [T0 + i * 86400 for i in range(n)], "indicators": {"quote": [quote]}}],
+            "error": None,
+        }
+    }
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    # the client must go through the fake as a proxy, never around it
+    for k in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "all_proxy", "no_proxy"):
+        monkeypatch.delenv(k, raising=False)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeYahoo)
+    srv.daemon_threads = True
+    srv.state = {"lock": threading.Lock(), "spark": [], "chart": [], "shape": "v8", "spark_delay": 0.0}
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def config(srv, chunk_size=3):
+    host, port = srv.server_address
+    return SDKConfig(
+        decodo=DecodoAuth("user", "pw"),
+        proxy_pools=[ProxyPool(host, [port])],
+        retry=RetryPolicy(timeout_s=5, sleep_between_ports_s=0, backoff_on_error_s=0),
+        yahoo=YahooChartConfig(base_url=f"http://{host}:{port}", spark_chunk_size=chunk_size),
+    )
+
+
+def run_sync(srv, symbols, **kw):
+    return StockClient(config(srv)).hk_latest_closes_bulk(symbols, **kw)
+
+
+def run_async(srv, symbols, **kw):
+    async def go():
+        async with AsyncStockClient(config(srv)) as c:
+            return await c.hk_latest_closes_bulk(symbols, **kw)
+
+    return asyncio.run(go())
+
+
+RUNNERS = [pytest.param(run_sync, id="sync"), pytest.param(run_async, id="async")]
+SHAPES = ["v7", "v8"]
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+@pytest.mark.parametrize("shape", SHAPES)
+def test_chunks_and_both_shapes(fake, run, shape):
+    fake.state["shape"] = shape
+    symbols = [f"{i:04d}.HK" for i in range(1, 9)] + ["0003.HK"]  # duplicate is fetched once
+    res = run(fake, symbols)
+    assert res.errors == {}
+    assert res.values == {s: spark_close(s) for s in symbols}
+    assert sorted(fake.state["spark"]) == sorted([["0001.HK", "0002.HK", "0003.HK"], ["0004.HK", "0005.HK", "0006.HK"], ["0007.HK", "0008.HK"]])
+    assert fake.state["chart"] == []
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+@pytest.mark.parametrize("shape", SHAPES)
+def test_chart_fallback_for_missing_symbols(fake, run, shape):
+    fake.state["shape"] = shape
+    symbols = ["0001.HK", "8888.HK", "0002.HK", "9999.HK"]
+    res = run(fake, symbols)
+    assert res.values == {"0001.HK": spark_close("0001.HK"), "0002.HK": spark_close("0002.HK"), "8888.HK": chart_close("8888.HK")}
+    assert set(res.errors) == {"9999.HK"}
+    assert set(fake.state["chart"]) == {"8888.HK", "9999.HK"}
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_failed_chunk_falls_back_per_symbol(fake, run):
+    symbols = ["0001.HK", "0002.HK", "0003.HK", "0004.HK", BREAKS_SPARK, "0005.HK"]
+    res = run(fake, symbols)
+    assert res.errors == {}
+    # the good chunk came from spark, the failed chunk's symbols one by one from chart
+    assert res.values == {
+        "0001.HK": spark_close("0001.HK"),
+        "0002.HK": spark_close("0002.HK"),
+        "0003.HK": spark_close("0003.HK"),
+        "0004.HK": chart_close("0004.HK"),
+        BREAKS_SPARK: chart_close(BREAKS_SPARK),
+        "0005.HK": chart_close("0005.HK"),
+    }
+    assert sorted(fake.state["chart"]) == ["0004.HK", "0005.HK", BREAKS_SPARK]
+
+
+@pytest.mark.parametrize("run", RUNNERS)
+def test_fallback_gets_only_the_remaining_budget(fake, run):
+    fake.state["spark_delay"] = 0.6
+    res = run(fake, ["0001.HK", "0002.HK", "0003.HK", "0004.HK"], timeout_s=0.3)
+    assert res.values == {}
+    assert set(res.errors) == {"0001.HK", "0002.HK", "0003.HK", "0004.HK"}
+    assert all(isinstance(e, DeadlineExceeded) for e in res.errors.values())
+    # spark already used the whole budget: no chart request was started
+    assert fake.state["chart"] == []
+    assert res.elapsed_s < 0.6
+
+
+def test_fallback_timeout_is_what_is_left(fake):
+    fake.state["spark_delay"] = 0.3
+    client = StockClient(config(fake))
+    budgets = []
+    real = client.hk_latest_close
+
+    def spy(symbol, timeout_s=None):
+        budgets.append(timeout_s)
+        return real(symbol, timeout_s=timeout_s)
+
+    client.hk_latest_close = spy
+    res = client.hk_latest_closes_bulk(["0001.HK", "8888.HK"], timeout_s=2.0)
+    assert res.values["8888.HK"] == chart_close("8888.HK")
+    assert len(budgets) == 1 and 0 < budgets[0] <= 2.0 - 0.3
+
+
+def test_queued_chunks_share_the_deadline(fake):
+    fake.state["spark_delay"] = 0.2
+    client = StockClient(config(fake))
+    budgets = []
+    real = client.hk_spark.fetch_spark_chunk
+
+    def spy(chunk, timeout_s=None):
+        budgets.append(timeout_s)
+        return real(chunk, timeout_s=timeout_s)
+
+    client.hk_spark.fetch_spark_chunk = spy
+    res = client.hk_latest_closes_bulk([f"{i:04d}.HK" for i in range(1, 7)], max_workers=1, timeout_s=2.0)
+    assert res.ok and len(budgets) == 2
+    # the second chunk waited for the worker: it gets what is left, not a fresh 2s
+    assert budgets[0] <= 2.0 and 0 < budgets[1] <= 2.0 - 0.2
@@ -0,0 +1,26 @@
+import { useEffect, useRef } from "react";
+
+// 订阅服务端行情推送（SSE）：首条为快照，之后只推送变化字段
+export function useQuoteStream(symbols, onUpdate) {
+  const cbRef = useRef(onUpdate);
+  useEffect(() => {
+    cbRef.current = onUpdate;
+  }, [onUpdate]);
+
+  const key = (symbols || []).filter(Boolean).join(",");
+  useEffect(() => {
+    if (!key || typeof EventSource === "undefined") return;
+    const u = new URL("/api/stream/quotes", window.location.origin);
+    u.searchParams.set("symbols", key);
+    const es = new EventSource(u.toString());
+    es.onmessage = (ev) => {
+      try {
+        const msg = JSON.parse(ev.data);
+        if (msg?.symbol) cbRef.current?.(msg);
+      } catch {
+        // ignore
+      }
+    };
+    return () => es.close();
+  }, [key]);
+}
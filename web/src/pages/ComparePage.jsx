@@ -23,50 +23,37 @@ export default function ComparePage() {
   const [sortBy, setSortBy] = useState('order'); // 'order' or 'rate'
   const [selectedIndex, setSelectedIndex] = useState(null); // for rates calculation
 
-  // Load kline data
+  // Load compare matrix（一次 /api/compare：服务端对齐时间轴并算好累计收益）
   useEffect(() => {
     if (selectedStocks.length === 0) return;
     setLoading(true);
-    const promises = selectedStocks.map(stock => {
-      const params = {
-        symbol: stock.symbol,
-        tf: chartType === 'minute' ? '1m' : '1d',
-      };
-      if (chartType === 'minute') {
-        params.range = '1d';
+    const params = {
+      symbols: selectedStocks.map(stock => stock.symbol).join(','),
+      tf: chartType === 'minute' ? '1m' : '1d',
+      max_points: 800,
+    };
+    if (chartType === 'minute') {
+      params.range = '1d';
+    } else {
+      if (rangeType === 'custom' && customStart && customEnd) {
+        params.start = Math.floor(new Date(customStart).getTime() / 1000);
+        params.end = Math.floor(new Date(customEnd).getTime() / 1000);
       } else {
-        if (rangeType === 'custom' && customStart && customEnd) {
-          params.start = Math.floor(new Date(customStart).getTime() / 1000);
-          params.end = Math.floor(new Date(customEnd).getTime() / 1000);
-        } else {
-          params.range = rangeType;
-        }
+        params.range = rangeType;
       }
-      return apiGet('/api/kline', params).then(data => ({ symbol: stock.symbol, data }));
-    });
-    Promise.all(promises).then(results => {
-      const newData = {};
-      results.forEach(({ symbol, data }) => {
-        newData[symbol] = data.bars;
-      });
-      setKlineData(newData);
+    }
+    apiGet('/api/compare', params).then(data => {
+      setKlineData(data.t ? data : {});
       setLoading(false);
     }).catch(() => setLoading(false));
   }, [selectedStocks, chartType, rangeType, customStart, customEnd]); // eslint-disable-line react-hooks/exhaustive-deps  
 
-  // Load summary data
+  // Load summary data（一次 /api/summaries 拿齐所有股票）
   useEffect(() => {
     if (selectedStocks.length === 0) return;
-    const promises = selectedStocks.map(stock =>
-      apiGet('/api/summary', { symbol: stock.symbol }).then(data => ({ symbol: stock.symbol, data }))
-    );
-    Promise.all(promises).then(results => {
-      const newData = {};
-      results.forEach(({ symbol, data }) => {
-        newData[symbol] = data;
-      });
-      setSummaryData(newData);
-    }).catch(() => {});
+    apiGet('/api/summaries', { symbols: selectedStocks.map(stock => stock.symbol).join(',') })
+      .then(data => setSummaryData(data.items || {}))
+      .catch(() => {});
   }, [selectedStocks]);
 
   // Save to localStorage
@@ -122,13 +109,12 @@ export default function ComparePage() {
   // Calculate rates
   const rates = useMemo(() => {
     if (!selectedStocks.length) return [];
+    const t = klineData.t || [];
     return selectedStocks.map(stock => {
-      const bars = klineData[stock.symbol];
-      if (!bars || bars.length === 0) return { symbol: stock.symbol, rate: 0 };
-      const index = selectedIndex !== null ? selectedIndex : bars.length - 1;
-      const current = bars[index][2]; // close
-      const first = bars[0][1]; // open of first bar
-      const rate = first !== 0 ? (current - first) / first : 0;
+      const pct = (klineData.pct || {})[stock.symbol];
+      if (!pct || t.length === 0) return { symbol: stock.symbol, rate: 0 };
+      const index = selectedIndex !== null ? selectedIndex : t.length - 1;
+      const rate = (pct[index] ?? 0) / 100;
       return { symbol: stock.symbol, rate: Math.max(-1, Math.min(1, rate)) };
     });
   }, [selectedStocks, klineData, selectedIndex]);
@@ -143,22 +129,11 @@ export default function ComparePage() {
 
   // ECharts option
   const option = useMemo(() => {
+    const t = klineData.t || [];
     const series = selectedStocks.map((stock, idx) => {
-      const bars = klineData[stock.symbol] || [];
-      let data;
-      if (yAxisType === 'percentage') {
-        if (chartType === 'minute') {
-          // 当日涨跌幅：相对于第一根K线的开盘
-          const firstOpen = bars.length > 0 ? bars[0][1] : 1;
-          data = bars.map(bar => [bar[0], ((bar[2] - firstOpen) / firstOpen) * 100]);
-        } else {
-          // 基于第一天的涨跌幅
-          const firstClose = bars.length > 0 ? bars[0][2] : 1;
-          data = bars.map(bar => [bar[0], ((bar[2] - firstClose) / firstClose) * 100]);
-        }
-      } else {
-        data = bars.map(bar => [bar[0], bar[2]]); // close
-      }
+      // 收益率由服务端计算（分钟图以首根开盘为基准，日线以首日收盘为基准）
+      const values = ((yAxisType === 'percentage' ? klineData.pct : klineData.close) || {})[stock.symbol] || [];
+      const data = t.map((ts, i) => [ts, values[i]]);
       return {
         name: stock.symbol,
         type: 'line',
@@ -173,7 +148,7 @@ export default function ComparePage() {
         trigger: 'axis',
         formatter: (params) => {
           const param = params[0];
-          return `${param.seriesName}: ${param.value[1].toFixed(2)}${yAxisType === 'percentage' ? '%' : ''}`;
+          return `${param.seriesName}: ${param.value[1] == null ? '-' : param.value[1].toFixed(2)}${yAxisType === 'percentage' ? '%' : ''}`;
         },
       },
       legend: { data: selectedStocks.map(s => s.symbol) },
@@ -182,7 +157,7 @@ export default function ComparePage() {
       series,
       dataZoom: [{ type: 'inside' }, { type: 'slider' }],
     };
-  }, [selectedStocks, klineData, yAxisType, chartType]);
+  }, [selectedStocks, klineData, yAxisType]);
 
   // Handle chart events
   const onChartEvents = {
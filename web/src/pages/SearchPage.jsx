@@ -99,6 +99,18 @@ export default function SearchPage({ onAddWatch }) {
     }
   }
 
+  // 1m 自动刷新：只拉最后一根（可能被修正）及之后的新K线，再拼回已有数据
+  async function pollKline(sym, tf0, range0) {
+    const key = `kline_${sym}_${tf0}_${range0}`;
+    const prev = cacheRef.current[key]?.data || [];
+    if (prev.length === 0) return loadKline(sym, tf0, range0);
+    const since = prev[prev.length - 1][0];
+    const data = await apiGet("/api/kline", { symbol: sym, tf: tf0, range: range0, since });
+    const bars = [...prev.filter((b) => b[0] < since), ...(data.bars || [])];
+    setKBars(bars);
+    cacheRef.current[key] = { data: bars, timestamp: Date.now() };
+  }
+
   async function refreshNow() {
     if (!symbol) return;
     await Promise.all([loadSummary(symbol), loadKline(symbol, tf, range)]);
@@ -205,7 +217,7 @@ export default function SearchPage({ onAddWatch }) {
   useEffect(() => {
     if (!symbol || tf !== "1m") return;
     const t = setInterval(() => {
-      Promise.all([loadKline(symbol, tf, range), loadSummary(symbol)]).catch(() => {});
+      Promise.all([pollKline(symbol, tf, range), loadSummary(symbol)]).catch(() => {});
     }, 10000); // 每10秒刷新一次
     return () => clearInterval(t);
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -2,6 +2,7 @@ import React, { useEffect, useMemo, useRef, useState } from "react";
 import WatchlistHeader from "../components/Watchlist/WatchlistHeader";
 import WatchlistCard from "../components/Watchlist/WatchlistCard";
 import { useDebouncedValue } from "../hooks/useDebouncedValue";
+import { useQuoteStream } from "../hooks/useQuoteStream";
 import { apiGet } from "../services/api";
 import { getValue, setValue } from "../utils/storage";
 import { normalizeQuery, rankHKItem } from "../utils/search";
@@ -55,23 +56,20 @@ export default function WatchlistPage({ watchItems, setWatchItems }) {
   const dq = useDebouncedValue(q, 250);
   const [searchErr, setSearchErr] = useState("");
 
-  // 自动：监控列表里股票定时刷新 summary（20s）
-  useEffect(() => {
-    if (!watchItems || watchItems.length === 0) return;
-    const t = setInterval(() => {
-      watchItems.forEach((it) => {
-        if (!it?.symbol) return;
-        refreshOne(it.symbol, { summaryOnly: true }).catch(() => {});
-      });
-    }, 20000);
-    return () => clearInterval(t);
-    // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [watchItems]);
+  // 自动：价格由服务端推送（/api/stream/quotes），只合并变化字段，保留 summary 里的高低点
+  useQuoteStream(
+    (watchItems || []).map((it) => it?.symbol),
+    (msg) => setSummaryMap((m) => ({ ...m, [msg.symbol]: { ...(m[msg.symbol] || {}), ...msg } }))
+  );
 
   // 初始：加载 watchItems 的 summary
   useEffect(() => {
     if (!watchItems || watchItems.length === 0) return;
-    watchItems.forEach((it) => it?.symbol && refreshOne(it.symbol, { summaryOnly: true }).catch(() => {}));
+    const symbols = watchItems.map((it) => it?.symbol).filter(Boolean);
+    if (symbols.length === 0) return;
+    apiGet("/api/summaries", { symbols: symbols.join(",") })
+      .then((data) => setSummaryMap((m) => ({ ...m, ...(data.items || {}) })))
+      .catch(() => {});
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [watchItems?.length]);
 